@@ -0,0 +1,101 @@
+# Benchmark for the timesheet filler against the offline webtime mock.
+# For each size (entries per day) a synthetic month is written to Excel, the filler runs
+# headless against the mock page, and the wall time and number of WebDriver round-trips
+# are reported. Each run gets a fresh browser, so the mock starts empty every time.
+#
+#   python benchmark_filler.py                                # 1, 5 and 20 entries per day, month mode
+#   python benchmark_filler.py --modes month,day,fields --latency 50 --json results.json
+
+import os
+import json
+import time
+import argparse
+import datetime
+import calendar
+import tempfile
+import contextlib
+import pandas as pd
+from timesheet_filler import automate_timesheet, FILL_MODES
+from mock_webtime_server import start_mock_server, mock_timesheet_url
+
+DEFAULT_SIZES = (1, 5, 20)
+WORKDAY_MINUTES = 12 * 60 # Synthetic entries are spread over 07:00-19:00
+
+def make_synthetic_month(excel_path, year, month, entries_per_day):
+    """Write a month with `entries_per_day` non-overlapping entries on every day; returns the entry count."""
+    slot = WORKDAY_MINUTES // entries_per_day
+    rows = []
+    for day in range(1, calendar.monthrange(year, month)[1] + 1):
+        for i in range(entries_per_day):
+            start = 7 * 60 + i * slot
+            end = start + max(slot - 5, 5)
+            rows.append([year, month, day, f"{start // 60:02d}:{start % 60:02d}", f"{end // 60:02d}:{end % 60:02d}",
+                         round((end - start) / 60, 2), f"Synthetic task {day}.{i + 1}"])
+    pd.DataFrame(rows, columns=["שנה", "חודש", "יום", "זמן התחלה", "זמן סיום", "שעות", "מה"]).to_excel(excel_path, index=False)
+    return len(rows)
+
+def run_benchmark(sizes=DEFAULT_SIZES, modes=('month',), year=None, month=None, latency=0, lazy_notes=False,
+                  wait_strategy='observer', work_dir=None, job_value=None, job_name=None):
+    """Run the filler once per (size, mode) pair against the mock and return one result dict per run."""
+    today = datetime.date.today()
+    year, month = year or today.year, month or today.month
+    work_dir = work_dir or tempfile.mkdtemp(prefix='timesheet_bench_')
+    server = start_mock_server()
+    url = mock_timesheet_url(server, f"{year:04d}-{month:02d}", latency, lazy_notes)
+    results = []
+    try:
+        for size in sizes:
+            excel_path = os.path.join(work_dir, f"synthetic_{size}_per_day.xlsx")
+            entries = make_synthetic_month(excel_path, year, month, size)
+            for mode in modes:
+                log_path = os.path.join(work_dir, f"run_{size}_per_day_{mode}.log")
+                started = time.perf_counter()
+                with open(log_path, 'w', encoding='utf-8') as log_file, contextlib.redirect_stdout(log_file):
+                    result = automate_timesheet(excel_path, 'bench@example.com', 'bench', headless=True, close_browser=True,
+                                                fill_mode=mode, wait_strategy=wait_strategy, timesheet_url=url,
+                                                job_value=job_value, job_name=job_name,
+                                                trace_path=os.path.join(work_dir, 'trace.jsonl'))
+                seconds = time.perf_counter() - started
+                results.append({'entries_per_day': size, 'mode': mode, 'entries': entries, 'seconds': round(seconds, 2),
+                                'webdriver_calls': result['webdriver_calls'], 'entries_written': result['entries_written'],
+                                'ok': result['ok'], 'error': result['error'], 'log': log_path})
+                print(f"  {size:>3}/day {mode:<7} {seconds:8.2f}s {result['webdriver_calls']:>7} calls"
+                      f"{'' if result['ok'] else '  FAILED: ' + str(result['error'])}")
+    finally:
+        server.shutdown()
+    return results
+
+def print_results(results):
+    print("\n--- Filler Benchmark ---")
+    print(f"{'Per day':>7} {'Mode':<7} {'Entries':>8} {'Written':>8} {'Wall s':>8} {'ms/entry':>9} {'WD calls':>9} {'Calls/entry':>12}")
+    for r in results:
+        per_entry = max(r['entries'], 1)
+        print(f"{r['entries_per_day']:>7} {r['mode']:<7} {r['entries']:>8} {r['entries_written']:>8} {r['seconds']:>8.2f} "
+              f"{r['seconds'] * 1000 / per_entry:>9.1f} {r['webdriver_calls']:>9} {r['webdriver_calls'] / per_entry:>12.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the timesheet filler against the offline webtime mock.')
+    parser.add_argument('--sizes', type=str, default=','.join(str(s) for s in DEFAULT_SIZES), help='Comma-separated entries-per-day values.')
+    parser.add_argument('--modes', type=str, default='month', help=f"Comma-separated fill modes ({', '.join(FILL_MODES)}).")
+    parser.add_argument('--month', type=str, help='Synthetic month as YYYY-MM (default: current month).')
+    parser.add_argument('--latency', type=int, default=0, help='Simulated page latency in ms for adds, popups and the table load.')
+    parser.add_argument('--lazy-notes', action='store_true', help='Mock creates notes textareas only when their popup opens.')
+    parser.add_argument('--wait-strategy', choices=('observer', 'poll'), default='observer', help='Wait strategy passed to the filler.')
+    parser.add_argument('--work-dir', type=str, help='Directory for the synthetic Excel files, logs and trace (default: a temp dir).')
+    parser.add_argument('--json', type=str, metavar='FILE', help='Also write the results to FILE as JSON.')
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    unknown_modes = [mode for mode in modes if mode not in FILL_MODES]
+    if unknown_modes:
+        parser.error(f"Unknown fill mode(s): {', '.join(unknown_modes)}")
+    year, month = (int(part) for part in args.month.split('-')) if args.month else (None, None)
+
+    print("Running filler benchmark against the offline mock...")
+    results = run_benchmark(sizes=[int(s) for s in args.sizes.split(',')], modes=modes, year=year, month=month,
+                            latency=args.latency, lazy_notes=args.lazy_notes, wait_strategy=args.wait_strategy,
+                            work_dir=args.work_dir)
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,97 @@
+# Startup-time benchmark for the entry points.
+# Every scenario runs in a fresh interpreter several times. The report gives the median wall
+# time (including interpreter startup), the time spent in the scenario itself, and which heavy
+# packages the scenario loaded. Opening the GUI or printing the filler's --help should not
+# load selenium or the Google client.
+#
+#   python benchmark_startup.py                       # all scenarios, 5 runs each
+#   python benchmark_startup.py --scenarios gui,filler-help --repeat 10 --json startup.json
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+HEAVY_MODULES = ('pandas', 'numpy', 'openpyxl', 'pyarrow', 'selenium', 'webdriver_manager',
+                 'googleapiclient', 'google_auth_oauthlib', 'ttkbootstrap')
+
+RESULT_MARKER = '@@startup-benchmark@@'
+
+# Code run in the child: `setup`, then `action` timed, then a marker line with the results.
+CHILD_TEMPLATE = """
+import sys, json, time, runpy
+{setup}
+started = time.perf_counter()
+error = None
+try:
+    {action}
+except SystemExit:
+    pass
+except Exception as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+seconds = time.perf_counter() - started
+loaded = sorted(name for name in {heavy!r} if name in sys.modules)
+print("\\n{marker}" + json.dumps({{'seconds': seconds, 'loaded': loaded, 'error': error}}))
+"""
+
+SCENARIOS = {
+    # The window is built but mainloop() returns at once, so this is the time until the GUI is shown.
+    'gui': ("import tkinter; tkinter.Misc.mainloop = lambda self, n=0: None",
+            "runpy.run_path('timesheet_gui.py', run_name='__main__')"),
+    'filler-help': ("sys.argv = ['timesheet_filler.py', '--help']",
+                    "runpy.run_path('timesheet_filler.py', run_name='__main__')"),
+    'filler-import': ("", "import timesheet_filler"),
+    'calendar-cli-import': ("", "import update_calendar"),
+    'store-import': ("", "import timesheet_store"),
+}
+
+def run_scenario(name, repeat=5, cwd=None):
+    setup, action = SCENARIOS[name]
+    code = CHILD_TEMPLATE.format(setup=setup, action=action, heavy=HEAVY_MODULES, marker=RESULT_MARKER)
+    walls, inner, loaded, error = [], [], [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        completed = subprocess.run([sys.executable, '-c', code], cwd=cwd or os.path.dirname(os.path.abspath(__file__)),
+                                   capture_output=True, text=True, encoding='utf-8', errors='replace')
+        walls.append(time.perf_counter() - started)
+        lines = [line for line in completed.stdout.splitlines() if line.startswith(RESULT_MARKER)]
+        if not lines:
+            error = (completed.stderr.strip().splitlines() or ['no result'])[-1]
+            break
+        result = json.loads(lines[-1][len(RESULT_MARKER):])
+        inner.append(result['seconds'])
+        loaded, error = result['loaded'], result['error']
+        if error:
+            break
+    return {'scenario': name, 'runs': len(inner), 'wall_seconds': statistics.median(walls),
+            'scenario_seconds': statistics.median(inner) if inner else None, 'loaded': loaded, 'error': error}
+
+def print_results(results):
+    print("\n--- Startup Benchmark ---")
+    print(f"{'Scenario':<20} {'Wall s':>8} {'Own s':>8}  Heavy modules loaded")
+    for r in results:
+        own = f"{r['scenario_seconds']:>8.3f}" if r['scenario_seconds'] is not None else f"{'-':>8}"
+        print(f"{r['scenario']:<20} {r['wall_seconds']:>8.3f} {own}  {', '.join(r['loaded']) or '(none)'}"
+              f"{'  FAILED: ' + r['error'] if r['error'] else ''}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measure how long the entry points take to start and what they import.')
+    parser.add_argument('--scenarios', type=str, default=','.join(SCENARIOS), help=f"Comma-separated scenarios ({', '.join(SCENARIOS)}).")
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreter runs per scenario (the median is reported).')
+    parser.add_argument('--json', type=str, metavar='FILE', help='Also write the results to FILE as JSON.')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenario(s): {', '.join(unknown)}")
+
+    results = [run_scenario(name, repeat=args.repeat) for name in names]
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
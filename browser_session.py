@@ -0,0 +1,100 @@
+# Reusable browser sessions for the timesheet filler.
+# With reuse enabled, the ChromeDriver path resolved by webdriver-manager is cached,
+# Chrome runs with a persistent profile (so the webtime login cookie survives between
+# runs) and a remote-debugging port, and later runs attach to that browser if it is
+# still open instead of launching a new one.
+# Selenium is imported when a driver is created, so importing this module (e.g. for the
+# CLI defaults) stays cheap.
+
+import os
+import json
+import urllib.request
+
+DEFAULT_SESSION_DIR = os.path.join(os.path.expanduser('~'), '.timesheet_automation')
+DEFAULT_DEBUG_PORT = 9222
+SESSION_FILE_NAME = 'session.json'
+PROFILE_DIR_NAME = 'chrome-profile'
+
+def load_session_state(session_dir):
+    path = os.path.join(session_dir, SESSION_FILE_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_session_state(session_dir, state):
+    os.makedirs(session_dir, exist_ok=True)
+    with open(os.path.join(session_dir, SESSION_FILE_NAME), 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+
+def resolve_driver_path(session_dir, refresh=False):
+    """Return the ChromeDriver path, asking webdriver-manager only when nothing valid is cached."""
+    state = load_session_state(session_dir)
+    cached_path = state.get('driver_path')
+    if cached_path and os.path.exists(cached_path) and not refresh:
+        return cached_path
+    from webdriver_manager.chrome import ChromeDriverManager
+    driver_path = ChromeDriverManager().install()
+    state['driver_path'] = driver_path
+    save_session_state(session_dir, state)
+    return driver_path
+
+def is_debugger_listening(debug_port, timeout=0.5):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{debug_port}/json/version", timeout=timeout) as response:
+            return response.status == 200
+    except OSError:
+        return False
+
+def _attach_options(debug_port):
+    from selenium.webdriver.chrome.options import Options
+    options = Options()
+    options.add_experimental_option("debuggerAddress", f"127.0.0.1:{debug_port}")
+    return options
+
+def _launch_options(headless, session_dir, debug_port):
+    from selenium.webdriver.chrome.options import Options
+    options = Options()
+    options.add_experimental_option("detach", True) # Keep the browser open after the filler exits
+    if headless:
+        options.add_argument("--headless")
+    options.add_argument(f"--user-data-dir={os.path.join(session_dir, PROFILE_DIR_NAME)}")
+    options.add_argument(f"--remote-debugging-port={debug_port}")
+    return options
+
+def create_driver(headless=False, reuse_session=False, session_dir=None, debug_port=DEFAULT_DEBUG_PORT):
+    """Create the Chrome WebDriver. Returns (driver, attached), where attached means an existing browser was reused."""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    from selenium.common.exceptions import WebDriverException
+    if not reuse_session:
+        from webdriver_manager.chrome import ChromeDriverManager
+        options = Options()
+        options.add_experimental_option("detach", True) # This is the key to keeping the browser open
+        if headless:
+            options.add_argument("--headless")
+        service = Service(ChromeDriverManager().install())
+        return webdriver.Chrome(service=service, options=options), False
+
+    session_dir = session_dir or DEFAULT_SESSION_DIR
+    driver_path = resolve_driver_path(session_dir)
+
+    if is_debugger_listening(debug_port):
+        try:
+            driver = webdriver.Chrome(service=Service(driver_path), options=_attach_options(debug_port))
+            print(f"Attached to running browser on port {debug_port}.")
+            return driver, True
+        except WebDriverException as e:
+            print(f"Could not attach to browser on port {debug_port} ({e.msg}); starting a new one.")
+
+    try:
+        driver = webdriver.Chrome(service=Service(driver_path), options=_launch_options(headless, session_dir, debug_port))
+    except WebDriverException:
+        # The cached driver may no longer match the installed Chrome; resolve it again once.
+        driver_path = resolve_driver_path(session_dir, refresh=True)
+        driver = webdriver.Chrome(service=Service(driver_path), options=_launch_options(headless, session_dir, debug_port))
+    return driver, False
@@ -0,0 +1,109 @@
+# On-disk cache of Google Calendar events for incremental imports.
+# Events are stored in SQLite keyed by (calendar id, event id) together with their etag,
+# and each calendar keeps the nextSyncToken of its last sync and the window it covers.
+# A re-import then asks Google only for what changed since the token and reads the
+# requested range from the cache.
+
+import json
+import sqlite3
+import datetime
+
+DEFAULT_CACHE_PATH = 'calendar_cache.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    calendar_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    etag TEXT,
+    start_key TEXT,
+    end_key TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (calendar_id, event_id)
+);
+CREATE INDEX IF NOT EXISTS events_by_start ON events (calendar_id, start_key);
+CREATE TABLE IF NOT EXISTS sync_state (
+    calendar_id TEXT PRIMARY KEY,
+    sync_token TEXT,
+    synced_from TEXT,
+    synced_to TEXT
+);
+"""
+
+def time_key(value):
+    """Comparable UTC key 'YYYY-MM-DDTHH:MM:SS' for a datetime or an event start/end dict."""
+    if isinstance(value, dict):
+        if value.get('dateTime'):
+            value = datetime.datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+        elif value.get('date'): # All-day event
+            return value['date'] + 'T00:00:00'
+        else:
+            return None
+    if value.tzinfo:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec='seconds')
+
+class CalendarCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        # Calendars imported in parallel each use their own connection; wait for each other's writes
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.executescript(SCHEMA)
+
+    def sync_state(self, calendar_id):
+        """(sync_token, synced_from, synced_to) of the calendar's last sync, or Nones if never synced."""
+        row = self.connection.execute(
+            "SELECT sync_token, synced_from, synced_to FROM sync_state WHERE calendar_id = ?", (calendar_id,)).fetchone()
+        return row if row else (None, None, None)
+
+    def save_sync_state(self, calendar_id, sync_token, synced_from, synced_to):
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sync_state (calendar_id, sync_token, synced_from, synced_to) VALUES (?, ?, ?, ?)",
+                (calendar_id, sync_token, synced_from, synced_to))
+
+    def reset(self, calendar_id):
+        """Drop every cached event and the sync token of a calendar (before a full sync)."""
+        with self.connection:
+            self.connection.execute("DELETE FROM events WHERE calendar_id = ?", (calendar_id,))
+            self.connection.execute("DELETE FROM sync_state WHERE calendar_id = ?", (calendar_id,))
+
+    def apply(self, calendar_id, events, keep_cancelled_exceptions=False):
+        """Store new/changed events and delete cancelled ones. Returns how many cached events changed.
+
+        With keep_cancelled_exceptions, cancelled occurrences of recurring events are stored
+        too, so a local expansion of the series knows to leave them out.
+        """
+        changed = 0
+        with self.connection:
+            for event in events:
+                if event.get('status') == 'cancelled' and not (keep_cancelled_exceptions and event.get('recurringEventId')):
+                    cursor = self.connection.execute(
+                        "DELETE FROM events WHERE calendar_id = ? AND event_id = ?", (calendar_id, event['id']))
+                    changed += cursor.rowcount
+                    continue
+                row = self.connection.execute(
+                    "SELECT etag FROM events WHERE calendar_id = ? AND event_id = ?", (calendar_id, event['id'])).fetchone()
+                if row and row[0] == event.get('etag'):
+                    continue
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO events (calendar_id, event_id, etag, start_key, end_key, data) VALUES (?, ?, ?, ?, ?, ?)",
+                    (calendar_id, event['id'], event.get('etag'),
+                     time_key(event.get('start') or event.get('originalStartTime') or {}), time_key(event.get('end') or {}),
+                     json.dumps(event, ensure_ascii=False)))
+                changed += 1
+        return changed
+
+    def events_between(self, calendar_id, time_min, time_max):
+        """Cached events overlapping [time_min, time_max] (keys from time_key), ordered by start time."""
+        rows = self.connection.execute(
+            "SELECT data FROM events WHERE calendar_id = ? AND start_key <= ? AND end_key > ? ORDER BY start_key",
+            (calendar_id, time_max, time_min))
+        return [json.loads(data) for (data,) in rows]
+
+    def all_events(self, calendar_id):
+        """Every cached event of a calendar, ordered by start time."""
+        rows = self.connection.execute("SELECT data FROM events WHERE calendar_id = ? ORDER BY start_key", (calendar_id,))
+        return [json.loads(data) for (data,) in rows]
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,98 @@
+# Local expansion of recurring Google Calendar events.
+# With singleEvents=True Google sends every occurrence of a recurring meeting as a full event,
+# so a daily stand-up over a year is hundreds of near-identical resources. Instead the
+# import can ask for the recurring masters (with their RRULE/EXDATE/RDATE lines) plus the
+# exceptions (moved, edited or cancelled occurrences), and build the occurrences here.
+# They come out with the same fields, ids and start/end as Google's own instances, so the
+# rest of the import does not know the difference.
+
+import re
+import datetime
+from dateutil import rrule, tz
+from calendar_cache import time_key
+
+_DATE_UNTIL = re.compile(r'UNTIL=(\d{8})(?=;|$)', re.MULTILINE) # The RRULE may be followed by EXDATE/RDATE lines
+
+def _parse_time(value, zone):
+    """(datetime or date, is_all_day) of an event start/end dict."""
+    if value.get('dateTime'):
+        parsed = datetime.datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+        return (parsed.astimezone(zone) if zone else parsed), False
+    return datetime.date.fromisoformat(value['date']), True
+
+def _rule_set(recurrence, dtstart, zone):
+    lines = '\n'.join(recurrence)
+    if zone is not None:
+        # With a timed start, dateutil needs UNTIL in UTC; a date-only UNTIL means the end of that day.
+        def to_utc(match):
+            day = datetime.datetime.strptime(match.group(1), '%Y%m%d').replace(hour=23, minute=59, second=59, tzinfo=zone)
+            return 'UNTIL=' + day.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        lines = _DATE_UNTIL.sub(to_utc, lines)
+    return rrule.rrulestr(lines, dtstart=dtstart, forceset=True)
+
+def _instance(master, start, duration, all_day, zone_name):
+    """One occurrence of master starting at start, shaped like the instances Google returns."""
+    instance = {key: value for key, value in master.items() if key != 'recurrence'}
+    end = start + duration
+    if all_day:
+        instance['start'] = {'date': start.isoformat()}
+        instance['end'] = {'date': end.isoformat()}
+        suffix = start.strftime('%Y%m%d')
+    else:
+        instance['start'] = {'dateTime': start.isoformat(), 'timeZone': zone_name}
+        instance['end'] = {'dateTime': end.isoformat(), 'timeZone': zone_name}
+        suffix = start.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    instance['id'] = f"{master['id']}_{suffix}"
+    instance['recurringEventId'] = master['id']
+    instance['originalStartTime'] = dict(instance['start'])
+    return instance
+
+def expand_master(master, time_min, time_max):
+    """The occurrences of a recurring master that overlap [time_min, time_max] (aware UTC datetimes)."""
+    zone_name = master['start'].get('timeZone')
+    zone = tz.gettz(zone_name) if zone_name else None
+    start, all_day = _parse_time(master['start'], zone)
+    end, _ = _parse_time(master['end'], zone)
+    if not all_day and zone is None:
+        zone = start.tzinfo # No time zone name: keep the fixed offset of the first occurrence
+    duration = end - start
+    if all_day:
+        rules = _rule_set(master['recurrence'], datetime.datetime.combine(start, datetime.time.min), None)
+        window_min = datetime.datetime.combine(time_min.date(), datetime.time.min) - duration
+        window_max = datetime.datetime.combine(time_max.date(), datetime.time.min)
+        starts = [occurrence.date() for occurrence in rules.between(window_min, window_max, inc=True)]
+    else:
+        rules = _rule_set(master['recurrence'], start, zone)
+        starts = rules.between(time_min - duration, time_max, inc=True)
+    return [_instance(master, occurrence, duration, all_day, zone_name) for occurrence in starts]
+
+def expand_recurring_events(items, time_min, time_max):
+    """Turn the result of an events().list with singleEvents=False into single events.
+
+    items holds one-off events, recurring masters and exceptions; time_min/time_max are aware
+    datetimes. Occurrences are generated from each master, then replaced by their modified
+    exception or dropped if it was cancelled. Returns the events overlapping the window,
+    ordered by start time.
+    """
+    masters, exceptions, events = [], {}, []
+    for item in items:
+        if item.get('recurringEventId'):
+            exceptions[(item['recurringEventId'], time_key(item.get('originalStartTime') or {}))] = item
+        elif item.get('status') == 'cancelled':
+            continue
+        elif item.get('recurrence'):
+            masters.append(item)
+        else:
+            events.append(item)
+    for master in masters:
+        for instance in expand_master(master, time_min, time_max):
+            exception = exceptions.pop((master['id'], time_key(instance['start'])), None)
+            events.append(exception if exception is not None else instance)
+    # Exceptions left over were moved from an occurrence outside the window
+    events.extend(exceptions.values())
+
+    key_min, key_max = time_key(time_min), time_key(time_max)
+    events = [event for event in events if event.get('status') != 'cancelled' and event.get('start')
+              and time_key(event['start']) <= key_max and time_key(event['end']) > key_min]
+    events.sort(key=lambda event: time_key(event['start']))
+    return events
@@ -9,4 +9,23 @@ password = "your_code_here"
 # The absolute path to your Excel file.
 # Example for Windows: r"C:\Users\YourUser\Documents\timesheet.xlsx"
 # Example for macOS/Linux: "/Users/YourUser/Documents/timesheet.xlsx"
-excel_file_path = r"C:\your_path\your_file.xlsx"
\ No newline at end of file
+excel_file_path = r"C:\your_path\your_file.xlsx"
+# The Google calendars to import events from. Several calendars are fetched in parallel and
+# a meeting that appears on more than one of them is imported once.
+# Use None to import every calendar shown in your Google Calendar.
+# Example: calendar_ids = ['primary', 'team@example.com']
+calendar_ids = ['primary']
+
+# Set to True to download each recurring meeting once and work out its occurrences locally,
+# instead of Google sending every occurrence. Much less to download for long date ranges.
+local_recurrence = False
+
+# How calendar events that overlap existing entries are settled during an import:
+# 'keep_existing', 'prefer_calendar', 'keep_both', 'longest_wins', or 'ask' to review them.
+# Conflicts left to 'ask' are shown together in one review window at the end of the import.
+conflict_policy = 'ask'
+
+# Rules that override conflict_policy when a pattern (a regular expression, not case sensitive)
+# matches the summary of either event. The first matching rule is used.
+# Example: conflict_rules = [(r'lunch|break', 'keep_existing'), (r'^Sprint', 'prefer_calendar')]
+conflict_rules = []
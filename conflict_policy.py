@@ -0,0 +1,62 @@
+# Automatic resolution of calendar import conflicts.
+# A calendar event that overlaps an entry already in the timesheet is a conflict. The import
+# collects them and settles what it can with a policy: a default plus rules matched against
+# the summaries of the two events (first match wins). The conflicts left undecided are shown
+# to the user together, in one review, at the end of the import.
+#
+#   keep_existing    keep the timesheet entry and skip the calendar event
+#   prefer_calendar  replace the timesheet entry with the calendar event
+#   keep_both        keep both
+#   longest_wins     keep the longer of the two (the timesheet entry on a tie)
+#   ask              leave it for the review
+#
+# In config.py:
+#   conflict_policy = 'ask'
+#   conflict_rules = [(r'lunch|break', 'keep_existing'), (r'^Sprint', 'prefer_calendar')]
+
+import re
+
+KEEP_EXISTING = 'keep_existing'
+PREFER_CALENDAR = 'prefer_calendar'
+KEEP_BOTH = 'keep_both'
+LONGEST_WINS = 'longest_wins'
+ASK = 'ask'
+POLICIES = (KEEP_EXISTING, PREFER_CALENDAR, KEEP_BOTH, LONGEST_WINS, ASK)
+
+# What to keep of a (calendar event, timesheet entry) pair, in the merge's format
+KEEP_EXISTING_ACTION = ('existing',)
+KEEP_NEW_ACTION = ('new',)
+KEEP_BOTH_ACTION = ('new', 'existing')
+KEEP_NEITHER_ACTION = ()
+_ACTIONS = {KEEP_EXISTING: KEEP_EXISTING_ACTION, PREFER_CALENDAR: KEEP_NEW_ACTION, KEEP_BOTH: KEEP_BOTH_ACTION}
+
+def _check_policy(policy):
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown conflict policy '{policy}'. Use one of: {', '.join(POLICIES)}.")
+    return policy
+
+class ConflictPolicy:
+    def __init__(self, default=ASK, rules=()):
+        self.default = _check_policy(default)
+        self.rules = [(re.compile(pattern, re.IGNORECASE), _check_policy(policy)) for pattern, policy in rules]
+
+    def policy_for(self, new_event, existing_event):
+        """The policy of the first rule matching either summary, else the default."""
+        summaries = (str(new_event.get('summary') or ''), str(existing_event.get('summary') or ''))
+        for pattern, policy in self.rules:
+            if any(pattern.search(summary) for summary in summaries):
+                return policy
+        return self.default
+
+    def decide(self, new_event, existing_event):
+        """The action for a conflict, or None to leave it for the review."""
+        policy = self.policy_for(new_event, existing_event)
+        if policy == LONGEST_WINS:
+            new_length = new_event['end_dt'] - new_event['start_dt']
+            existing_length = existing_event['end_dt'] - existing_event['start_dt']
+            return KEEP_NEW_ACTION if new_length > existing_length else KEEP_EXISTING_ACTION
+        return _ACTIONS.get(policy)
+
+def policy_from_config(config):
+    """The policy set by conflict_policy / conflict_rules in config.py (ask about everything if unset)."""
+    return ConflictPolicy(getattr(config, 'conflict_policy', ASK), getattr(config, 'conflict_rules', ()))
@@ -0,0 +1,96 @@
+# Per-entry journal for resumable filler runs.
+# Each Excel entry is appended as a JSON line (date, entry index, row_no, status and the
+# values written) as soon as it is committed to the page. With --resume, entries the
+# journal recorded as written are checked against the page, which is read once per run.
+# Entries whose row still holds the same values are skipped, so a run that died on day 25
+# does not redo days 1-24.
+
+import os
+import json
+import datetime
+from timesheet_reconcile import web_row_matches
+
+# written   - the entry's values were set on its row
+# failed    - the entry could not be written (no row, timeout, missing fields)
+# confirmed - the row already held the entry's values when the run started
+JOURNAL_STATUSES = ('written', 'failed', 'confirmed')
+
+def default_journal_path(excel_file_path):
+    """Journal kept next to the Excel file: timesheet.xlsx -> timesheet.fill_journal.jsonl."""
+    return os.path.splitext(excel_file_path)[0] + '.fill_journal.jsonl'
+
+def load_journal(path):
+    """Latest record per (date, entry index). A missing file or a line cut short by a crash is ignored."""
+    records = {}
+    if not path or not os.path.exists(path):
+        return records
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            records[(record['date'], record['index'])] = record
+    return records
+
+def _same_values(record, entry):
+    return (record.get('start_time'), record.get('end_time'), record.get('notes')) == \
+           (entry['start_time'], entry['end_time'], entry['notes'])
+
+def split_confirmed(entries_by_date, web_rows_by_date, records, job_value=None):
+    """Separate entries the journal wrote and the page still shows from the ones left to do.
+
+    Returns (entries_by_date, web_rows_by_date, confirmed) where the first two no longer contain
+    the confirmed entries or their rows, and confirmed is a list of 'unchanged' plan actions.
+    """
+    remaining_entries = {}
+    remaining_web_rows = {date: list(rows) for date, rows in web_rows_by_date.items()}
+    confirmed = []
+    for date, entries in entries_by_date.items():
+        web_rows = remaining_web_rows.setdefault(date, [])
+        remaining_entries[date] = []
+        for entry in entries:
+            record = records.get((date, entry['index']))
+            web_row = None
+            if record and record['status'] in ('written', 'confirmed') and _same_values(record, entry):
+                web_row = next((w for w in web_rows if w['row'] == record['row']), None)
+            if web_row and web_row_matches(entry, web_row, job_value):
+                web_rows.remove(web_row)
+                confirmed.append({'date': date, 'action': 'unchanged', 'entry': entry, 'row': web_row['row'], 'web': web_row})
+            else:
+                remaining_entries[date].append(entry)
+    return remaining_entries, remaining_web_rows, confirmed
+
+class FillJournal:
+    """Append-only JSON-lines journal; every record is flushed so it survives a crash."""
+
+    def __init__(self, path, append=False):
+        self.path = path
+        self.run_id = datetime.datetime.now().strftime('%Y%m%dT%H%M%S')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def record(self, entry, row, status, reason=None):
+        record = {'run': self.run_id, 'time': datetime.datetime.now().isoformat(timespec='seconds'),
+                  'date': entry['date'], 'index': entry['index'], 'row': row, 'status': status,
+                  'start_time': entry['start_time'], 'end_time': entry['end_time'], 'notes': entry['notes']}
+        if reason:
+            record['reason'] = reason
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+class NullJournal:
+    """Stand-in for dry runs, which must not leave a journal behind."""
+
+    def record(self, entry, row, status, reason=None):
+        pass
+
+    def close(self):
+        pass
+
+NULL_JOURNAL = NullJournal()
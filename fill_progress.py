@@ -0,0 +1,72 @@
+# Progress reporting and cooperative cancellation for a fill run.
+# automate_timesheet reports the current phase and how many dates/entries are done through a
+# callback, with an ETA based on the time per entry (or per date, see start) so far. A caller running it in a
+# worker thread (the GUI) can stop it by setting a threading.Event; the run checks it
+# between dates and raises FillCancelled, leaving the browser and journal consistent.
+
+import time
+
+class FillCancelled(Exception):
+    pass
+
+class FillProgress:
+    def __init__(self, callback=None, cancel_event=None):
+        self.callback = callback
+        self.cancel_event = cancel_event
+        self.phase = 'starting'
+        self.dates_total = self.entries_total = 0
+        self.dates_done = self.entries_done = 0
+        self.started = time.perf_counter()
+        self.fill_started = None
+        self.by_dates = False
+
+    def set_phase(self, phase):
+        self.phase = phase
+        self._report()
+
+    def start(self, dates_total, entries_total, by_dates=False):
+        """Called once the plan is known; the ETA is measured from here.
+
+        With `by_dates` the bar and ETA follow the dates done, for runs that prepare the rows
+        date by date and write all entries at the end (the 'month' fill mode).
+        """
+        self.dates_total, self.entries_total = dates_total, entries_total
+        self.by_dates = by_dates
+        self.fill_started = time.perf_counter()
+        self.set_phase('filling')
+
+    def advance(self, dates=0, entries=0):
+        self.dates_done += dates
+        self.entries_done += entries
+        self._report()
+
+    def check_cancelled(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise FillCancelled(f"Cancelled during {self.phase}")
+
+    def _steps(self):
+        """(done, total) of what the bar follows: entries, or dates with `by_dates`."""
+        if self.by_dates:
+            return self.dates_done, self.dates_total
+        return self.entries_done, self.entries_total
+
+    def fraction(self):
+        done, total = self._steps()
+        return min(done / total, 1.0) if total else 0.0
+
+    def eta(self):
+        """Estimated seconds left, or None until at least one step is done."""
+        done, total = self._steps()
+        if self.fill_started is None or not done:
+            return None
+        per_step = (time.perf_counter() - self.fill_started) / done
+        return per_step * max(total - done, 0)
+
+    def snapshot(self):
+        return {'phase': self.phase, 'dates_done': self.dates_done, 'dates_total': self.dates_total,
+                'entries_done': self.entries_done, 'entries_total': self.entries_total, 'fraction': self.fraction(),
+                'elapsed': time.perf_counter() - self.started, 'eta': self.eta()}
+
+    def _report(self):
+        if self.callback:
+            self.callback(self.snapshot())
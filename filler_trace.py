@@ -0,0 +1,96 @@
+# Per-phase timing for the timesheet filler.
+# A Tracer records a span for each phase (driver init, login, table load, row discovery,
+# add row, field fill, notes popup, job assignment) with its duration and the number of
+# WebDriver commands issued while it was open. Spans can be written as JSON lines so runs
+# can be compared across site changes, and a summary table is printed at the end of a run.
+
+import json
+import time
+import datetime
+import contextlib
+
+class Span:
+    def __init__(self, name, span_id, parent_id, attrs):
+        self.name = name
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        """Attach extra fields (e.g. counts known only at the end of the phase) to the span."""
+        self.attrs.update(attrs)
+
+class Tracer:
+    def __init__(self, path=None):
+        self.path = path
+        self.run_id = datetime.datetime.now().strftime('%Y%m%dT%H%M%S')
+        self.spans = []
+        self.webdriver_calls = 0
+        self.calls_by_command = {}
+        self._stack = []
+        self._next_id = 1
+        self._file = open(path, 'a', encoding='utf-8') if path else None
+
+    def attach(self, driver):
+        """Count every WebDriver command sent through this driver (elements route through it too)."""
+        original_execute = driver.execute
+        def counting_execute(driver_command, params=None):
+            self.webdriver_calls += 1
+            self.calls_by_command[driver_command] = self.calls_by_command.get(driver_command, 0) + 1
+            return original_execute(driver_command, params)
+        driver.execute = counting_execute
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        span = Span(name, self._next_id, self._stack[-1].span_id if self._stack else None, attrs)
+        self._next_id += 1
+        started_at = datetime.datetime.now().isoformat(timespec='milliseconds')
+        started = time.perf_counter()
+        calls_before = self.webdriver_calls
+        self._stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            self._stack.pop()
+            record = {'run': self.run_id, 'span': name, 'id': span.span_id, 'parent': span.parent_id,
+                      'start': started_at, 'seconds': round(time.perf_counter() - started, 4),
+                      'webdriver_calls': self.webdriver_calls - calls_before}
+            record.update(span.attrs)
+            self.spans.append(record)
+            if self._file:
+                self._file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+                self._file.flush()
+
+    def summary_lines(self):
+        """One line per span name: count, total/avg/max seconds and WebDriver calls."""
+        by_name = {}
+        for record in self.spans:
+            by_name.setdefault(record['span'], []).append(record)
+        lines = [f"{'Phase':<18} {'Count':>6} {'Total s':>9} {'Avg s':>8} {'Max s':>8} {'WD calls':>9}"]
+        for name, records in sorted(by_name.items(), key=lambda item: -sum(r['seconds'] for r in item[1])):
+            durations = [r['seconds'] for r in records]
+            calls = sum(r['webdriver_calls'] for r in records)
+            lines.append(f"{name:<18} {len(records):>6} {sum(durations):>9.2f} {sum(durations) / len(durations):>8.3f} "
+                         f"{max(durations):>8.3f} {calls:>9}")
+        lines.append(f"Total WebDriver calls: {self.webdriver_calls}")
+        return lines
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+class NullTracer:
+    """Stand-in used when a caller does not pass a tracer."""
+
+    def attach(self, driver):
+        pass
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        yield Span(name, None, None, attrs)
+
+NULL_TRACER = NullTracer()
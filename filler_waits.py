@@ -0,0 +1,186 @@
+# Event-driven waits for the timesheet filler.
+# Conditions are evaluated inside the browser. In 'observer' mode a MutationObserver
+# resolves the wait as soon as the DOM changes to match, so there is no dead sleep time;
+# in 'poll' mode the same condition is checked from Python every poll_interval seconds.
+# Selenium is imported inside the waits, so WAIT_STRATEGIES can be read without loading it.
+
+import time
+
+WAIT_STRATEGIES = ('observer', 'poll')
+
+# checkCondition(kind, target, expected) -> {met: bool, element: Element|null}
+#   present / visible / clickable / hidden: target is a CSS selector
+#   row_count: target is a YYYY-MM-DD date, expected is the minimum number of rows
+CONDITION_SCRIPT = """
+function isVisible(el) {
+    if (!el || !el.isConnected) { return false; }
+    if (el.tagName === 'OPTION') { el = el.closest('select') || el; }
+    var style = window.getComputedStyle(el);
+    if (style.visibility === 'hidden' || style.display === 'none') { return false; }
+    return el.offsetWidth > 0 || el.offsetHeight > 0 || el.getClientRects().length > 0;
+}
+function rowCount(date) {
+    var rows = [];
+    var dayInputs = document.querySelectorAll("#tableDyn1 input[id^='day_']");
+    for (var i = 0; i < dayInputs.length; i++) {
+        if (dayInputs[i].value !== date) { continue; }
+        var row = dayInputs[i].closest('tr[row_no]');
+        if (row && rows.indexOf(row) === -1) { rows.push(row); }
+    }
+    return rows.length;
+}
+function firstVisible(target, enabled) {
+    // A selector list ('#a, #b') matches when any of its elements qualifies, not just the first in the page
+    var els = document.querySelectorAll(target);
+    for (var i = 0; i < els.length; i++) {
+        if (isVisible(els[i]) && !(enabled && els[i].disabled)) { return els[i]; }
+    }
+    return null;
+}
+function checkCondition(kind, target, expected) {
+    if (kind === 'row_count') { return {met: rowCount(target) >= expected, element: null}; }
+    if (kind === 'present') { var el = document.querySelector(target); return {met: !!el, element: el}; }
+    if (kind === 'visible') { var shown = firstVisible(target, false); return {met: !!shown, element: shown}; }
+    if (kind === 'clickable') { var enabled = firstVisible(target, true); return {met: !!enabled, element: enabled}; }
+    if (kind === 'hidden') { return {met: !firstVisible(target, false), element: null}; }
+    throw new Error('Unknown wait condition: ' + kind);
+}
+"""
+
+CHECK_SCRIPT = CONDITION_SCRIPT + """
+return checkCondition(arguments[0], arguments[1], arguments[2]);
+"""
+
+# Resolves through the async-script callback when the condition becomes true.
+# The interval re-check covers changes that do not produce a DOM mutation
+# (e.g. CSS transitions finishing).
+OBSERVER_SCRIPT = CONDITION_SCRIPT + """
+var kind = arguments[0], target = arguments[1], expected = arguments[2];
+var timeoutMs = arguments[3], recheckMs = arguments[4];
+var done = arguments[arguments.length - 1];
+var first = checkCondition(kind, target, expected);
+if (first.met) { done(first); return; }
+var finished = false, observer = null, timer = null, recheck = null;
+function finish(result) {
+    if (finished) { return; }
+    finished = true;
+    if (observer) { observer.disconnect(); }
+    clearTimeout(timer);
+    clearInterval(recheck);
+    done(result);
+}
+function evaluate() {
+    var result = checkCondition(kind, target, expected);
+    if (result.met) { finish(result); }
+}
+observer = new MutationObserver(evaluate);
+observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true,
+                                            attributeFilter: ['style', 'class', 'hidden', 'disabled']});
+recheck = setInterval(evaluate, recheckMs);
+timer = setTimeout(function () { finish(checkCondition(kind, target, expected)); }, timeoutMs);
+"""
+
+def by_id(element_id):
+    """CSS selector for an element id (safe for ids that start with a digit)."""
+    return f'[id="{element_id}"]'
+
+class BrowserWaiter:
+    """Waits for DOM conditions in the browser and records how long each wait took."""
+
+    def __init__(self, driver, strategy='observer', poll_interval=0.1, default_timeout=10):
+        if strategy not in WAIT_STRATEGIES:
+            raise ValueError(f"Unknown wait strategy '{strategy}'. Choose one of: {', '.join(WAIT_STRATEGIES)}")
+        self.driver = driver
+        self.strategy = strategy
+        self.poll_interval = poll_interval
+        self.default_timeout = default_timeout
+        self.timings = []
+        self._script_timeout = None
+
+    def wait_for(self, kind, target, expected=None, timeout=None, label=None, across_navigation=False):
+        """Block until the condition holds and return the matched element (or True).
+
+        Raises selenium's TimeoutException when the condition is not met in time.
+        Use across_navigation=True for waits that span a page load (e.g. after login),
+        since in-page observers are discarded when the document unloads.
+        """
+        from selenium.common.exceptions import TimeoutException
+        timeout = self.default_timeout if timeout is None else timeout
+        label = label or kind
+        started = time.perf_counter()
+        result = None
+        try:
+            if self.strategy == 'observer' and not across_navigation:
+                result = self._observe(kind, target, expected, timeout)
+            if result is None:
+                # 'poll' strategy, a navigation wait, or an observer cut short by a page load
+                remaining = timeout - (time.perf_counter() - started)
+                if remaining > 0:
+                    result = self._poll(kind, target, expected, remaining)
+            if not result or not result.get('met'):
+                raise TimeoutException(f"Timed out after {timeout}s waiting for {kind} '{target}'")
+        except TimeoutException:
+            self._record(label, started, False)
+            raise
+        self._record(label, started, True)
+        return result.get('element') or True
+
+    def present(self, selector, **kwargs):
+        return self.wait_for('present', selector, **kwargs)
+
+    def visible(self, selector, **kwargs):
+        return self.wait_for('visible', selector, **kwargs)
+
+    def clickable(self, selector, **kwargs):
+        return self.wait_for('clickable', selector, **kwargs)
+
+    def hidden(self, selector, **kwargs):
+        return self.wait_for('hidden', selector, **kwargs)
+
+    def row_count(self, date, count, **kwargs):
+        return self.wait_for('row_count', date, expected=count, **kwargs)
+
+    def _observe(self, kind, target, expected, timeout):
+        # Returns None when the page navigated away mid-wait so the caller can fall back to polling.
+        from selenium.common.exceptions import TimeoutException, WebDriverException
+        if self._script_timeout is None or self._script_timeout < timeout + 5:
+            self._script_timeout = timeout + 5
+            self.driver.set_script_timeout(self._script_timeout)
+        try:
+            return self.driver.execute_async_script(
+                OBSERVER_SCRIPT, kind, target, expected, int(timeout * 1000), max(int(self.poll_interval * 1000), 50)
+            )
+        except TimeoutException:
+            raise
+        except WebDriverException:
+            return None
+
+    def _poll(self, kind, target, expected, timeout):
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.common.exceptions import TimeoutException, WebDriverException
+        def check(driver):
+            try:
+                result = driver.execute_script(CHECK_SCRIPT, kind, target, expected)
+            except WebDriverException:
+                return False
+            return result if result and result.get('met') else False
+        try:
+            return WebDriverWait(self.driver, timeout, poll_frequency=self.poll_interval).until(check)
+        except TimeoutException:
+            return None
+
+    def _record(self, label, started, ok):
+        self.timings.append({'wait': label, 'seconds': round(time.perf_counter() - started, 4), 'ok': ok})
+
+    def summary_lines(self):
+        """One line per wait label: count, total, average and max duration, timeouts."""
+        by_label = {}
+        for timing in self.timings:
+            by_label.setdefault(timing['wait'], []).append(timing)
+        lines = []
+        for label, timings in sorted(by_label.items(), key=lambda item: -sum(t['seconds'] for t in item[1])):
+            durations = [t['seconds'] for t in timings]
+            timeouts = sum(1 for t in timings if not t['ok'])
+            lines.append(f"{label:<24} count={len(durations):<5} total={sum(durations):8.2f}s "
+                         f"avg={sum(durations) / len(durations):6.3f}s max={max(durations):6.3f}s timeouts={timeouts}")
+        return lines
@@ -1,25 +1,76 @@
 import os
+import copy
+import heapq
+import queue
+import itertools
+import shutil
+import bisect
 import datetime
+import tempfile
+import zipfile
+import threading
+from xml.etree import ElementTree
+from concurrent.futures import ThreadPoolExecutor
 import openpyxl
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from google.auth.exceptions import RefreshError
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+import pandas as pd
+# The Google client libraries are imported by the functions that sign in and build HTTP
+# connections, so the merge code can be used (and tested) without them.
+from calendar_cache import CalendarCache, DEFAULT_CACHE_PATH, time_key
+from calendar_recurrence import expand_recurring_events
+from conflict_policy import ConflictPolicy
+from timesheet_times import time_to_minutes, minutes_to_hhmm, duration_minutes
+from timesheet_store import ExcelStore, SHEET_COLUMNS
 
 # If modifying these SCOPES, delete the file token.json.
 SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
-
-def get_calendar_service():
+TOKEN_PATH = 'token.json'
+CREDENTIALS_PATH = 'credentials.json'
+
+# The access token is refreshed ahead of an import when it has less than this left
+TOKEN_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+HTTP_TIMEOUT = 60
+
+# Only the event fields the merge and the cache read (status, attendees' self/responseStatus,
+# start, end, summary, plus id/etag for the cache and iCalUID to spot the same meeting on
+# several calendars), instead of full event resources.
+EVENT_FIELDS = 'id,etag,iCalUID,status,summary,start,end,attendees(self,responseStatus)'
+LIST_FIELDS = f'nextPageToken,nextSyncToken,items({EVENT_FIELDS})'
+# With local_recurrence, recurring masters and their exceptions are fetched instead of every
+# occurrence, and expanded by calendar_recurrence.
+RECURRING_LIST_FIELDS = f'nextPageToken,nextSyncToken,items({EVENT_FIELDS},recurrence,recurringEventId,originalStartTime)'
+# Cache key suffix for the masters/exceptions of a calendar, kept apart from its single events
+RECURRING_CACHE_SUFFIX = '#recurring'
+
+# Calendars fetched at the same time when importing from several calendars
+DEFAULT_CALENDAR_WORKERS = 4
+
+# Services built in this process, by token path: (service, credentials)
+_services = {}
+_services_lock = threading.Lock()
+# httplib2 connections are not thread-safe, so worker threads each get their own
+_thread_http = threading.local()
+
+def _expires_soon(creds):
+    # google-auth keeps expiry as a naive UTC datetime
+    return creds.expiry is not None and creds.expiry - datetime.datetime.utcnow() < TOKEN_REFRESH_MARGIN
+
+def _save_credentials(creds, token_path):
+    with open(token_path, 'w') as token:
+        token.write(creds.to_json())
+
+def _load_credentials(token_path, credentials_path):
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from google.auth.transport.requests import Request
+    from google.auth.exceptions import RefreshError
     creds = None
-    token_path = 'token.json'
-    credentials_path = 'credentials.json'
-
     if os.path.exists(token_path):
         creds = Credentials.from_authorized_user_file(token_path, SCOPES)
 
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
+    if not creds or not creds.valid or _expires_soon(creds):
+        if creds and creds.refresh_token:
             try:
                 creds.refresh(Request())
             except RefreshError:
@@ -31,24 +82,176 @@ def get_calendar_service():
         else:
             flow = InstalledAppFlow.from_client_secrets_file(credentials_path, SCOPES)
             creds = flow.run_local_server(port=0)
-        
-        with open(token_path, 'w') as token:
-            token.write(creds.to_json())
-
-    return build('calendar', 'v3', credentials=creds)
-
-def get_calendar_events(service, start_date, end_date):
-    start_time = datetime.datetime.combine(start_date, datetime.time.min).isoformat() + 'Z'
-    end_time = datetime.datetime.combine(end_date, datetime.time.max).isoformat() + 'Z'
-    
-    events_result = service.events().list(
-        calendarId='primary',
-        timeMin=start_time,
-        timeMax=end_time,
-        singleEvents=True,
-        orderBy='startTime'
-    ).execute()
-    return events_result.get('items', [])
+        _save_credentials(creds, token_path)
+    return creds
+
+def get_calendar_service(token_path=TOKEN_PATH, credentials_path=CREDENTIALS_PATH):
+    """Calendar API client, built once per process and reused by later imports.
+
+    The API description is the copy bundled with googleapiclient (no discovery download),
+    requests share one HTTP connection pool, and the token is refreshed a few minutes
+    before it expires.
+    """
+    from google.auth.transport.requests import Request
+    from google.auth.exceptions import RefreshError
+    from googleapiclient.discovery import build
+    with _services_lock:
+        if token_path in _services:
+            service, creds = _services[token_path]
+            if creds.valid and not _expires_soon(creds):
+                return service
+            if creds.refresh_token:
+                try:
+                    creds.refresh(Request())
+                    _save_credentials(creds, token_path)
+                    return service
+                except RefreshError:
+                    del _services[token_path] # Sign in again below
+
+        creds = _load_credentials(token_path, credentials_path)
+        service = build('calendar', 'v3', http=_authorized_http(creds), static_discovery=True, cache_discovery=False)
+        _services[token_path] = (service, creds)
+        return service
+
+def _authorized_http(creds):
+    import httplib2
+    from google_auth_httplib2 import AuthorizedHttp
+    return AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+
+def _worker_http(service):
+    """An authorized HTTP connection for the current thread, for services built by get_calendar_service."""
+    creds = next((creds for built, creds in _services.values() if built is service), None)
+    if creds is None:
+        return None # Not one of ours: use the service's own connection
+    if getattr(_thread_http, 'creds', None) is not creds:
+        _thread_http.creds = creds
+        _thread_http.http = _authorized_http(creds)
+    return _thread_http.http
+
+def _iter_pages(service, fields=LIST_FIELDS, http=None, **params):
+    """Run events().list page by page, yielding (items, nextSyncToken) as each page arrives.
+
+    Only the last page carries the sync token.
+    """
+    page_token = None
+    while True:
+        response = service.events().list(pageToken=page_token, maxResults=2500, fields=fields, **params).execute(http=http)
+        page_token = response.get('nextPageToken')
+        yield response.get('items', []), response.get('nextSyncToken')
+        if not page_token:
+            return
+
+def _list_all_pages(service, fields=LIST_FIELDS, http=None, **params):
+    """Run events().list across every page. Returns (items, nextSyncToken)."""
+    items, next_sync_token = [], None
+    for page, next_sync_token in _iter_pages(service, fields=fields, http=http, **params):
+        items.extend(page)
+    return items, next_sync_token
+
+def sync_calendar_cache(service, cache, calendar_id, start_date, end_date, http=None, local_recurrence=False, on_page=None):
+    """Bring the cached events of a calendar up to date for the given date range.
+
+    If the range is inside the window of the last sync, only the changes since the stored
+    syncToken are fetched. Otherwise (or when Google expired the token) the calendar is
+    fully re-synced for the range. Returns ('incremental' or 'full', number of changed events).
+
+    With local_recurrence the cache holds recurring masters and exceptions (under the calendar
+    id plus RECURRING_CACHE_SUFFIX) instead of every occurrence. During a full sync, on_page is
+    called with the items of each page as it arrives.
+    """
+    cache_id = calendar_id + RECURRING_CACHE_SUFFIX if local_recurrence else calendar_id
+    fields = RECURRING_LIST_FIELDS if local_recurrence else LIST_FIELDS
+    sync_token, synced_from, synced_to = cache.sync_state(cache_id)
+    if sync_token and synced_from <= start_date.isoformat() and end_date.isoformat() <= synced_to:
+        try:
+            items, next_sync_token = _list_all_pages(service, fields=fields, http=http, calendarId=calendar_id,
+                                                     singleEvents=not local_recurrence, syncToken=sync_token)
+            changed = cache.apply(cache_id, items, keep_cancelled_exceptions=local_recurrence)
+            cache.save_sync_state(cache_id, next_sync_token, synced_from, synced_to)
+            return 'incremental', changed
+        except Exception as e:
+            # An HttpError with 410 Gone: the sync token expired, fall back to a full sync
+            if getattr(getattr(e, 'resp', None), 'status', None) != 410:
+                raise
+
+    cache.reset(cache_id)
+    changed, next_sync_token = 0, None
+    for items, next_sync_token in _iter_pages(
+            service, fields=fields, http=http, calendarId=calendar_id, singleEvents=not local_recurrence,
+            timeMin=datetime.datetime.combine(start_date, datetime.time.min).isoformat() + 'Z',
+            timeMax=datetime.datetime.combine(end_date, datetime.time.max).isoformat() + 'Z'):
+        changed += cache.apply(cache_id, items, keep_cancelled_exceptions=local_recurrence)
+        if on_page:
+            on_page(items)
+    cache.save_sync_state(cache_id, next_sync_token, start_date.isoformat(), end_date.isoformat())
+    return 'full', changed
+
+def stream_calendar_events(service, start_date, end_date, emit, calendar_id='primary', cache_path=DEFAULT_CACHE_PATH,
+                           http=None, local_recurrence=False):
+    """Pass the events between start_date and end_date to emit, in batches, as they become available.
+
+    Pages downloaded from Google (without a cache, or on a full sync) are passed on as each one
+    arrives, so the caller can work on them while the next page downloads. Events read from the
+    cache after an incremental sync, or expanded from recurring masters, come as one batch.
+    Cancelled events are left out. Only without a cache or local_recurrence are the pages in
+    start order (orderBy=startTime); otherwise each batch is in no particular order.
+    """
+    start_time = datetime.datetime.combine(start_date, datetime.time.min)
+    end_time = datetime.datetime.combine(end_date, datetime.time.max)
+
+    def emit_page(items):
+        items = [item for item in items if item.get('status') != 'cancelled']
+        if items:
+            emit(items)
+
+    if not cache_path:
+        if local_recurrence:
+            items, _ = _list_all_pages(service, fields=RECURRING_LIST_FIELDS, http=http, calendarId=calendar_id,
+                                       timeMin=start_time.isoformat() + 'Z', timeMax=end_time.isoformat() + 'Z', singleEvents=False)
+            emit_page(_expand_in_range(items, start_time, end_time))
+            return
+        for items, _ in _iter_pages(service, http=http, calendarId=calendar_id, timeMin=start_time.isoformat() + 'Z',
+                                    timeMax=end_time.isoformat() + 'Z', singleEvents=True, orderBy='startTime'):
+            emit_page(items)
+        return
+
+    cache = CalendarCache(cache_path)
+    try:
+        mode, _ = sync_calendar_cache(service, cache, calendar_id, start_date, end_date, http=http,
+                                      local_recurrence=local_recurrence, on_page=None if local_recurrence else emit_page)
+        if local_recurrence:
+            emit_page(_expand_in_range(cache.all_events(calendar_id + RECURRING_CACHE_SUFFIX), start_time, end_time))
+        elif mode != 'full': # A full sync's pages were already passed on
+            emit_page(cache.events_between(calendar_id, time_key(start_time), time_key(end_time)))
+    finally:
+        cache.close()
+
+def _expand_in_range(items, start_time, end_time):
+    """Single events from masters/exceptions, for the naive UTC range used by the queries."""
+    return expand_recurring_events(items, start_time.replace(tzinfo=datetime.timezone.utc),
+                                   end_time.replace(tzinfo=datetime.timezone.utc))
+
+def list_calendar_ids(service, http=None):
+    """Ids of the calendars shown in the user's Google Calendar (selected and not hidden), primary first.
+
+    The primary calendar is returned as 'primary' so it shares its cache with single-calendar imports.
+    """
+    calendar_ids = []
+    page_token = None
+    while True:
+        response = service.calendarList().list(pageToken=page_token, minAccessRole='reader',
+                                               fields='nextPageToken,items(id,primary,selected,hidden)').execute(http=http)
+        for entry in response.get('items', []):
+            if entry.get('primary'):
+                calendar_ids.insert(0, 'primary')
+            elif entry.get('selected') and not entry.get('hidden'):
+                calendar_ids.append(entry['id'])
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return calendar_ids
+
+def _event_order_key(event):
+    return time_key(event.get('start', {})) or ''
 
 def calculate_hours(start_dt, end_dt):
     duration = end_dt - start_dt
@@ -57,198 +260,504 @@ def calculate_hours(start_dt, end_dt):
 def are_overlapping(event1_start, event1_end, event2_start, event2_end):
     return max(event1_start, event2_start) < min(event1_end, event2_end)
 
-def update_excel_with_calendar_events(excel_path, events, conflict_resolution_callback):
-    change_log = []
-    workbook = None
-    sheet = None
-
-    if os.path.exists(excel_path):
+class EventIndex:
+    """Events grouped by date with each date's events kept sorted by start time, plus a
+    multiset of (date, start, end, summary) keys, so duplicate and overlap checks do not
+    scan the whole sheet for every calendar event."""
+
+    def __init__(self, events=()):
+        self._by_date = {}      # (year, month, day) -> sorted [(start_dt, seq, event)]
+        self._max_duration = {} # (year, month, day) -> longest event on that date
+        self._keys = {}         # duplicate key -> count
+        self._positions = {}    # id(event) -> (date key, (start_dt, seq))
+        self._seq = 0
+        for event in events:
+            self.add(event)
+
+    @staticmethod
+    def _date_key(event):
+        return (event['year'], event['month'], event['day'])
+
+    @staticmethod
+    def _duplicate_key(event):
+        return (event['year'], event['month'], event['day'], event['start_time'], event['end_time'], event['summary'])
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, event):
+        return id(event) in self._positions
+
+    def add(self, event):
+        self._seq += 1
+        date_key = self._date_key(event)
+        bisect.insort(self._by_date.setdefault(date_key, []), (event['start_dt'], self._seq, event))
+        duration = max(event['end_dt'] - event['start_dt'], datetime.timedelta(0))
+        self._max_duration[date_key] = max(self._max_duration.get(date_key, duration), duration)
+        duplicate_key = self._duplicate_key(event)
+        self._keys[duplicate_key] = self._keys.get(duplicate_key, 0) + 1
+        self._positions[id(event)] = (date_key, (event['start_dt'], self._seq))
+
+    def remove(self, event):
+        position = self._positions.pop(id(event), None)
+        if position is None:
+            return
+        date_key, sort_key = position
+        events = self._by_date[date_key]
+        del events[bisect.bisect_left(events, sort_key)]
+        duplicate_key = self._duplicate_key(event)
+        self._keys[duplicate_key] -= 1
+        if not self._keys[duplicate_key]:
+            del self._keys[duplicate_key]
+
+    def has_duplicate(self, event):
+        return self._duplicate_key(event) in self._keys
+
+    def overlapping(self, event):
+        """Events on the same date whose time range overlaps the event, in the order they were
+        added (sheet rows first, then calendar events as merged), as a scan of the sheet finds them."""
+        events = self._by_date.get(self._date_key(event))
+        if not events:
+            return []
+        # Only events starting before this one ends, and no earlier than the date's longest
+        # duration before it starts, can overlap it.
+        low = bisect.bisect_left(events, (event['start_dt'] - self._max_duration[self._date_key(event)],))
+        high = bisect.bisect_left(events, (event['end_dt'],))
+        matches = [(seq, other) for start_dt, seq, other in events[low:high]
+                   if are_overlapping(event['start_dt'], event['end_dt'], other['start_dt'], other['end_dt'])]
+        return [other for _, other in sorted(matches, key=lambda match: match[0])]
+
+    def sorted_events(self):
+        """All events ordered by date, then start time (ties keep insertion order)."""
+        return [event for date_key in sorted(self._by_date) for _, _, event in self._by_date[date_key]]
+
+def _read_sheet_rows(excel_path):
+    """(header, rows) of the first sheet, streamed in read-only mode; completely empty rows are skipped."""
+    workbook = openpyxl.load_workbook(excel_path, read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        existing_rows = []
+        for values in rows:
+            if all(value is None or str(value).strip() == '' for value in values):
+                continue # Skip completely empty rows
+            existing_rows.append((list(values) + [None] * 7)[:7])
+        return list(header) if header else None, existing_rows
+    finally:
+        workbook.close()
+
+_CELL_STYLES = ('font', 'fill', 'border', 'alignment', 'number_format', 'protection')
+
+def _styled_cell(sheet, value, template=None):
+    """A write-only cell with the value, styled like template (a cell read in read-only mode)."""
+    cell = WriteOnlyCell(sheet, value=value)
+    if template is not None and template.has_style:
+        for name in _CELL_STYLES:
+            setattr(cell, name, copy.copy(getattr(template, name)))
+    return cell
+
+def _column_widths(excel_path, worksheet_path):
+    """{column letter: width} from the <cols> element of a sheet, read without parsing its rows."""
+    widths = {}
+    with zipfile.ZipFile(excel_path) as archive, archive.open(worksheet_path) as xml:
+        for _, element in ElementTree.iterparse(xml, events=('start',)):
+            tag = element.tag.rsplit('}', 1)[-1]
+            if tag == 'sheetData':
+                break # <cols> comes before the rows
+            if tag == 'col' and element.get('width'):
+                for index in range(int(element.get('min')), min(int(element.get('max')), 16384) + 1):
+                    widths[get_column_letter(index)] = float(element.get('width'))
+    return widths
+
+def _write_sheet_rows(excel_path, header, rows):
+    """Write the sheet through a write-only workbook into a temporary file, then swap it in atomically.
+
+    The source is streamed in read-only mode: its sheets, column widths, header row and the styles
+    of the first data row are carried over, and the other sheets are copied cell by cell, so memory
+    does not grow with the size of the sheet. The new file keeps the original's permissions.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    if not os.path.exists(excel_path):
+        sheet = workbook.create_sheet()
+        sheet.append(header)
+        for row in rows:
+            sheet.append(row)
+        workbook.save(excel_path)
+        return
+    source = openpyxl.load_workbook(excel_path, read_only=True)
+    try:
+        for source_sheet in source.worksheets:
+            sheet = workbook.create_sheet(source_sheet.title)
+            for column, width in _column_widths(excel_path, source_sheet._worksheet_path).items():
+                sheet.column_dimensions[column].width = width
+            source_rows = source_sheet.iter_rows()
+            if source_sheet is not source.active:
+                for source_row in source_rows:
+                    sheet.append([_styled_cell(sheet, cell.value, cell) for cell in source_row])
+                continue
+            header_cells = list(next(source_rows, ()))
+            if header_cells:
+                sheet.append([_styled_cell(sheet, cell.value, cell) for cell in header_cells])
+            else:
+                sheet.append(header)
+            # New rows take the styles of the first data row (e.g. the hours' number format)
+            templates = list(next(source_rows, ()))
+            for row in rows:
+                sheet.append([_styled_cell(sheet, value, templates[column] if column < len(templates) else None)
+                              for column, value in enumerate(row)])
+        workbook.active = source.index(source.active)
+    finally:
+        source.close()
+    directory = os.path.dirname(os.path.abspath(excel_path))
+    handle, temp_path = tempfile.mkstemp(suffix='.xlsx', prefix='.calendar_merge_', dir=directory)
+    os.close(handle)
+    try:
+        workbook.save(temp_path)
+        shutil.copymode(excel_path, temp_path)
+        os.replace(temp_path, excel_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def _load_existing_rows(store):
+    """(header, rows, change_log) of a store's current entries; header is None unless it is an existing Excel file."""
+    if not isinstance(store, ExcelStore):
+        return None, store.read().astype(object).where(lambda df: df.notna(), None).values.tolist(), []
+    if not os.path.exists(store.path):
+        return None, [], ["Created new Excel file with header."]
+    try:
+        header, existing_rows = _read_sheet_rows(store.path)
+    except Exception as e:
+        raise Exception(f"Error loading existing Excel file '{store.path}': {e}. Please check the file for corruption or ensure it's not open in another program.")
+    return header, existing_rows, []
+
+def _save_merged_rows(store, header, rows):
+    if not isinstance(store, ExcelStore):
+        store.replace(pd.DataFrame(rows, columns=SHEET_COLUMNS))
+        return
+    # The sheet is rewritten in one streaming pass; the original file is only replaced once the new one is complete
+    try:
+        _write_sheet_rows(store.path, header or list(SHEET_COLUMNS), rows)
+    except PermissionError as e:
+        raise Exception(f"Could not save '{store.path}': {e}. Please close the file if it's open in another program.")
+
+def import_calendar_events(service, store, start_date, end_date, review_conflicts, calendar_ids=('primary',),
+                           cache_path=DEFAULT_CACHE_PATH, local_recurrence=False, max_workers=DEFAULT_CALENDAR_WORKERS,
+                           conflict_policy=None):
+    """Download calendar events and merge them into a store as one pipeline.
+
+    The existing entries are loaded in a worker thread while the calendars download in others
+    (at most max_workers at a time; calendar_ids=None imports every calendar listed by
+    list_calendar_ids). Each page is parsed and filtered (cancelled, not accepted, all-day) in
+    its download thread as it arrives. The pages of all calendars are heap-merged by start time,
+    and an event is merged as soon as no calendar can still send an earlier one: right away for
+    pages Google sends in start order, at the end of the calendar otherwise. A meeting that
+    appears on several calendars (same iCalUID and start) is kept once, from the first calendar
+    in calendar_ids. The store is left alone when no events are found. Conflicts the policy does
+    not settle are reviewed in one go at the end (see CalendarMerge).
+    Returns (change_log, number of events received).
+    """
+    if calendar_ids is None:
+        calendar_ids = list_calendar_ids(service, http=_worker_http(service))
+    calendar_ids = list(dict.fromkeys(calendar_ids)) # Drop repeated ids, keep the order
+    in_start_order = not cache_path and not local_recurrence # See stream_calendar_events
+    batches = queue.Queue()
+    heap, arrival = [], itertools.count()
+    latest = [None] * len(calendar_ids)  # Latest start sent by each calendar whose pages are in start order
+    finished = [False] * len(calendar_ids)
+    change_log, pending, seen = [], [], set()
+    merge = None
+
+    def fetch(index, calendar_id):
+        def emit(items):
+            # (start key, dedup key, (entry, message)) in start order; parsing happens here, off the merge thread
+            parsed = [(_event_order_key(item), (item.get('iCalUID') or item.get('id'), _event_order_key(item)),
+                       parse_calendar_event(item)) for item in items]
+            batches.put((index, sorted(parsed, key=lambda event: event[0])))
         try:
-            workbook = openpyxl.load_workbook(excel_path)
-            sheet = workbook.active
-        except Exception as e:
-            error_message = f"Error loading existing Excel file '{excel_path}': {e}. Please check the file for corruption or ensure it's not open in another program."
-            change_log.append(error_message)
-            raise Exception(error_message) # Re-raise the exception to stop execution
-    else:
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
-        sheet.append(['שנה', 'חודש', 'יום', 'זמן התחלה', 'זמן סיום', 'שעות', 'מה'])
-        change_log.append("Created new Excel file with header.")
-
-    all_events_to_write = []
-    # Read existing data from the sheet into all_events_to_write
-    for row_idx in range(2, sheet.max_row + 1):
-        # Check if the row is completely empty (all cells are None or empty string)
-        if all(sheet.cell(row=row_idx, column=col).value is None or str(sheet.cell(row=row_idx, column=col).value).strip() == '' for col in range(1, sheet.max_column + 1)):
-            continue # Skip completely empty rows
+            stream_calendar_events(service, start_date, end_date, emit, calendar_id=calendar_id, cache_path=cache_path,
+                                   http=_worker_http(service), local_recurrence=local_recurrence)
+        finally:
+            batches.put((index, None)) # This calendar is done
+
+    def can_release(key, index):
+        # No unfinished calendar may still send an event that sorts before (key, index)
+        return all(finished[other] or (latest[other] is not None and (key, index) <= (latest[other], other))
+                   for other in range(len(calendar_ids)))
+
+    # One thread loads the sheet; the others download calendars
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(calendar_ids))) + 1) as executor:
+        loading = executor.submit(_load_existing_rows, store)
+        loading.add_done_callback(lambda _: batches.put((None, None))) # Wake the loop to start merging
+        fetches = [executor.submit(fetch, index, calendar_id) for index, calendar_id in enumerate(calendar_ids)]
+        while not all(finished):
+            index, batch = batches.get()
+            if index is None:
+                pass # The sheet is loaded
+            elif batch is None:
+                finished[index] = True
+            else:
+                for key, dedup_key, parsed in batch:
+                    heapq.heappush(heap, (key, index, next(arrival), dedup_key, parsed))
+                if in_start_order and batch:
+                    latest[index] = batch[-1][0]
+            while heap and can_release(heap[0][0], heap[0][1]):
+                _, _, _, dedup_key, (entry, message) = heapq.heappop(heap)
+                if dedup_key in seen:
+                    continue
+                seen.add(dedup_key)
+                if message:
+                    change_log.append(message)
+                if entry is not None:
+                    pending.append(entry)
+            if merge is None and loading.done():
+                header, existing_rows, load_log = loading.result()
+                change_log[:0] = load_log
+                merge = CalendarMerge(existing_rows, review_conflicts, change_log, conflict_policy)
+            if merge is not None:
+                for entry in pending:
+                    merge.add(entry)
+                pending = []
+        for future in fetches:
+            future.result() # Re-raise a failed download
+
+        if not seen:
+            return [], 0 # Nothing to merge: the store is not touched
+        if merge is None:
+            header, existing_rows, load_log = loading.result()
+            change_log[:0] = load_log
+            merge = CalendarMerge(existing_rows, review_conflicts, change_log, conflict_policy)
+            for entry in pending:
+                merge.add(entry)
+    _save_merged_rows(store, header, merge.rows())
+    return change_log, len(seen)
+
+def _existing_entries(existing_rows):
+    """The sheet rows (lists of the 7 sheet values) as entries for the merge; rows with invalid dates or times are left out."""
+    entries = []
+    # Time cells may be strings, datetime.time objects or Excel day fractions
+    start_minutes = time_to_minutes([row[3] for row in existing_rows])
+    end_minutes = time_to_minutes([row[4] for row in existing_rows])
+    durations = duration_minutes(start_minutes, end_minutes)
+    start_times = minutes_to_hhmm(start_minutes)
+    end_times = minutes_to_hhmm(end_minutes)
+    for row, start_minute, duration, start_time, end_time in zip(existing_rows, start_minutes, durations, start_times, end_times):
+        year, month, day, _, _, hours, summary = row
+        if start_time is None or end_time is None:
+            continue # Skip rows with invalid times
         try:
-            # ### START FIX ###
-            # The original code failed if the Excel file contained time objects instead of strings.
-            # This updated block robustly parses existing data to handle both cases.
-            year = sheet.cell(row=row_idx, column=1).value
-            month = sheet.cell(row=row_idx, column=2).value
-            day = sheet.cell(row=row_idx, column=3).value
-            start_time_val = sheet.cell(row=row_idx, column=4).value
-            end_time_val = sheet.cell(row=row_idx, column=5).value
-            hours = sheet.cell(row=row_idx, column=6).value
-            summary = sheet.cell(row=row_idx, column=7).value
-
             # Reconstruct datetime objects for conflict checking
             date = datetime.date(int(year), int(month), int(day))
-
-            # Robustly parse time values, which might be strings or datetime.time objects from openpyxl
-            start_t = start_time_val if isinstance(start_time_val, datetime.time) else datetime.datetime.strptime(str(start_time_val), '%H:%M').time()
-            end_t = end_time_val if isinstance(end_time_val, datetime.time) else datetime.datetime.strptime(str(end_time_val), '%H:%M').time()
-
-            start_dt = datetime.datetime.combine(date, start_t)
-            end_dt = datetime.datetime.combine(date, end_t)
-
-            all_events_to_write.append({
-                'year': year,
-                'month': month,
-                'day': day,
-                'start_time': start_t.strftime('%H:%M'),
-                'end_time': end_t.strftime('%H:%M'),
-                'hours': hours,
-                'summary': summary,
-                'start_dt': start_dt,
-                'end_dt': end_dt
-            })
-            # ### END FIX ###
         except (ValueError, TypeError):
             # Skip rows with invalid data
             continue
-
-    # Process and filter new Google Calendar events
-    accepted_new_calendar_events = []
-    for event in events:
-        if event.get('status') == 'cancelled':
-            continue
-
-        # Check attendee response status
-        attendees = event.get('attendees', [])
-        user_accepted = False
-        if attendees: 
-            for attendee in attendees:
-                if attendee.get('self') and attendee.get('responseStatus') == 'accepted':
-                    user_accepted = True
-                    break
-        else: 
-            user_accepted = True
-        
-        if not user_accepted:
-            change_log.append(f"Skipped event '{event.get('summary', 'No Title')}' due to non-accepted response status.")
-            continue
-
-        start = event['start'].get('dateTime')
-        end = event['end'].get('dateTime')
-        summary = event.get('summary', 'No Title')
-
-        # Skip all-day events (events without a dateTime)
-        if not start or not end:
-            change_log.append(f"Skipped all-day event '{summary}'.")
-            continue
-
-        # Parse timezone-aware datetime from Google Calendar
-        event_start_dt_aware = datetime.datetime.fromisoformat(start.replace('Z', '+00:00'))
-        event_end_dt_aware = datetime.datetime.fromisoformat(end.replace('Z', '+00:00'))
-
-        # Convert to local timezone and then make them naive for comparison with Excel data
-        event_start_dt = event_start_dt_aware.astimezone().replace(tzinfo=None)
-        event_end_dt = event_end_dt_aware.astimezone().replace(tzinfo=None)
-
-        date = event_start_dt.date()
-        start_time_str = event_start_dt.strftime('%H:%M')
-        end_time_str = event_end_dt.strftime('%H:%M')
-        hours = calculate_hours(event_start_dt, event_end_dt)
-
-        new_event_data = {
-            'year': date.year,
-            'month': date.month,
-            'day': date.day,
-            'start_time': start_time_str,
-            'end_time': end_time_str,
+        start_dt = datetime.datetime.combine(date, datetime.time.min) + datetime.timedelta(minutes=int(start_minute))
+        entries.append({
+            'year': year,
+            'month': month,
+            'day': day,
+            'start_time': start_time,
+            'end_time': end_time,
             'hours': hours,
             'summary': summary,
-            'start_dt': event_start_dt,
-            'end_dt': event_end_dt
-        }
-        accepted_new_calendar_events.append(new_event_data)
-
-    # Integrate new calendar events into all_events_to_write, handling conflicts
-    for new_event_data in accepted_new_calendar_events:
-        is_duplicate = False
-        for existing_event in all_events_to_write: # Check against current data
-            if (existing_event['year'] == new_event_data['year'] and
-                existing_event['month'] == new_event_data['month'] and
-                existing_event['day'] == new_event_data['day'] and
-                existing_event['start_time'] == new_event_data['start_time'] and
-                existing_event['end_time'] == new_event_data['end_time'] and
-                existing_event['summary'] == new_event_data['summary']):
-                is_duplicate = True
+            'start_dt': start_dt,
+            'end_dt': start_dt + datetime.timedelta(minutes=int(duration)), # Past midnight for overnight entries
+            'source': 'sheet'
+        })
+    return entries
+
+def parse_calendar_event(event):
+    """(entry, message) for a Google Calendar event: the entry to merge, or None with the reason it is skipped."""
+    if event.get('status') == 'cancelled':
+        return None, None
+
+    # Check attendee response status
+    attendees = event.get('attendees', [])
+    user_accepted = False
+    if attendees: 
+        for attendee in attendees:
+            if attendee.get('self') and attendee.get('responseStatus') == 'accepted':
+                user_accepted = True
                 break
-        
-        if is_duplicate:
-            change_log.append(f"Skipped duplicate event '{new_event_data['summary']}' on {new_event_data['day']}/{new_event_data['month']}/{new_event_data['year']}.")
-            continue
-
-        conflicting_existing_events = []
-        for existing_event in all_events_to_write:
-            if (existing_event['year'] == new_event_data['year'] and
-               existing_event['month'] == new_event_data['month'] and
-               existing_event['day'] == new_event_data['day'] and
-               are_overlapping(new_event_data['start_dt'], new_event_data['end_dt'],
-                               existing_event['start_dt'], existing_event['end_dt'])):
-                conflicting_existing_events.append(existing_event)
+    else: 
+        user_accepted = True
+    
+    if not user_accepted:
+        return None, f"Skipped event '{event.get('summary', 'No Title')}' due to non-accepted response status."
+
+    start = event['start'].get('dateTime')
+    end = event['end'].get('dateTime')
+    summary = event.get('summary', 'No Title')
+
+    # Skip all-day events (events without a dateTime)
+    if not start or not end:
+        return None, f"Skipped all-day event '{summary}'."
+
+    # Parse timezone-aware datetime from Google Calendar
+    event_start_dt_aware = datetime.datetime.fromisoformat(start.replace('Z', '+00:00'))
+    event_end_dt_aware = datetime.datetime.fromisoformat(end.replace('Z', '+00:00'))
+
+    # Convert to local timezone and then make them naive for comparison with Excel data
+    event_start_dt = event_start_dt_aware.astimezone().replace(tzinfo=None)
+    event_end_dt = event_end_dt_aware.astimezone().replace(tzinfo=None)
+
+    date = event_start_dt.date()
+    start_time_str = event_start_dt.strftime('%H:%M')
+    end_time_str = event_end_dt.strftime('%H:%M')
+    hours = calculate_hours(event_start_dt, event_end_dt)
+
+    new_event_data = {
+        'year': date.year,
+        'month': date.month,
+        'day': date.day,
+        'start_time': start_time_str,
+        'end_time': end_time_str,
+        'hours': hours,
+        'summary': summary,
+        'start_dt': event_start_dt,
+        'end_dt': event_end_dt,
+        'source': 'calendar' # Conflicts can also be with an earlier calendar event
+    }
+    return new_event_data, None
+
+class CalendarMerge:
+    """Merges calendar entries into the existing sheet rows one at a time, so entries can be
+    added as they arrive. The index answers duplicate and overlap checks per date instead of
+    scanning every row.
+
+    Conflicts are settled by conflict_policy where it can. An entry with a conflict the policy
+    leaves open is held back, together with every later entry on its date (dates never affect
+    each other), and finish() merges them in their original order. Every pair that can come up
+    then is sent to review_conflicts in a single call: it gets a list of (new entry, other entry)
+    pairs and returns one action per pair, a tuple naming which of the two to keep ('new',
+    'existing', both, or neither). Answers for pairs that an earlier answer made moot (the
+    other entry was dropped) are not used. Exact duplicates are skipped, so they are not
+    reviewed; in the rare case the entry they duplicate is dropped in the review, their own
+    conflicts are asked about in a follow-up call.
+    """
+
+    def __init__(self, existing_rows, review_conflicts, change_log=None, conflict_policy=None):
+        self.review_conflicts = review_conflicts
+        self.conflict_policy = conflict_policy or ConflictPolicy()
+        self.change_log = change_log if change_log is not None else []
+        self.index = EventIndex(_existing_entries(existing_rows))
+        self.deferred = []         # Entries held back for the review, in the order they came
+        self.deferred_dates = set() # Dates with a held-back entry
+
+    def add(self, new_event_data):
+        """Merge one entry from parse_calendar_event, handling conflicts."""
+        if EventIndex._date_key(new_event_data) in self.deferred_dates:
+            # An earlier entry on this date waits for the review, so this one's conflicts are not known yet
+            self.deferred.append(new_event_data)
+            return
+        self._merge(new_event_data)
+
+    def _merge(self, new_event_data, answers=None):
+        """Merge an entry against the current index; without answers, an open conflict holds it back."""
+        if self.index.has_duplicate(new_event_data):
+            self.change_log.append(f"Skipped duplicate event '{new_event_data['summary']}' on {new_event_data['day']}/{new_event_data['month']}/{new_event_data['year']}.")
+            return
+
+        conflicting_existing_events = self.index.overlapping(new_event_data)
 
         if conflicting_existing_events:
-            should_add_new_event = True
-            events_to_remove_from_all_events = [] # Collect events to remove from the master list
-
-            for existing_event_in_conflict in conflicting_existing_events:
-                action = conflict_resolution_callback(new_event_data, existing_event_in_conflict)
-                
-                if 'new' in action and 'existing' in action:
-                    change_log.append(f"User chose to keep both new event '{new_event_data['summary']}' and existing event '{existing_event_in_conflict['summary']}' on {new_event_data['day']}/{new_event_data['month']}/{new_event_data['year']}.")
-                    # No change to all_events_to_write for existing_event_in_conflict as it's kept
-                elif 'new' in action:
-                    # User chose to keep the new event and discard existing.
-                    events_to_remove_from_all_events.append(existing_event_in_conflict)
-                    change_log.append(f"User chose to replace existing event '{existing_event_in_conflict['summary']}' with new event '{new_event_data['summary']}' on {new_event_data['day']}/{new_event_data['month']}/{new_event_data['year']}.")
-                elif 'existing' in action:
-                    # User chose to keep existing and not add new.
-                    should_add_new_event = False
-                    change_log.append(f"User chose to keep existing event '{existing_event_in_conflict['summary']}' and skip new event '{new_event_data['summary']}' on {new_event_data['day']}/{new_event_data['month']}/{new_event_data['year']}.")
-                    break # If user chooses to keep existing and skip new, no need to check other conflicts for this new event.
-                else: # action is () - user chose neither
-                    should_add_new_event = False
-                    events_to_remove_from_all_events.append(existing_event_in_conflict) # Remove existing if neither is chosen
-                    change_log.append(f"User chose to skip new event '{new_event_data['summary']}' and remove existing '{existing_event_in_conflict['summary']}' due to conflict on {new_event_data['day']}/{new_event_data['month']}/{new_event_data['year']}.")
-                    break # If user chooses to skip, no need to check other conflicts for this new event.
-
-            # Remove events marked for removal from the master list
-            for event_to_remove in events_to_remove_from_all_events:
-                if event_to_remove in all_events_to_write:
-                    all_events_to_write.remove(event_to_remove)
-
-            if should_add_new_event:
-                all_events_to_write.append(new_event_data)
+            actions = [self.conflict_policy.decide(new_event_data, existing) for existing in conflicting_existing_events]
+            choosers = ["Policy" if action is not None else "User" for action in actions]
+            if None in actions:
+                if answers is None:
+                    self.deferred_dates.add(EventIndex._date_key(new_event_data))
+                    self.deferred.append(new_event_data)
+                    return
+                # A pair can be missing only for an entry left out of the review as a duplicate whose twin
+                # was dropped meanwhile; it is asked about on its own.
+                missing = [(new_event_data, existing) for existing, action in zip(conflicting_existing_events, actions)
+                           if action is None and (id(new_event_data), id(existing)) not in answers]
+                if missing:
+                    answers.update(((id(new), id(existing)), action)
+                                   for (new, existing), action in zip(missing, self.review_conflicts(missing)))
+                actions = [action if action is not None else answers[(id(new_event_data), id(existing))]
+                           for existing, action in zip(conflicting_existing_events, actions)]
+            self._resolve(new_event_data, conflicting_existing_events, actions, choosers)
         else:
             # No conflicts, just append the new event to the master list
-            all_events_to_write.append(new_event_data)
-            change_log.append(f"Added event '{new_event_data['summary']}' on {new_event_data['day']}/{new_event_data['month']}/{new_event_data['year']} at {new_event_data['start_time']}-{new_event_data['end_time']}. Duration: {new_event_data['hours']} hours.")
-
-    # Clear the sheet (except header) and rewrite with the consolidated data
-    for row_idx in range(sheet.max_row, 1, -1):
-        sheet.delete_rows(row_idx)
- 
-    all_events_to_write.sort(key=lambda x: (x['year'], x['month'], x['day'], x['start_dt']))
-
-    for event_data in all_events_to_write:
-        sheet.append([event_data['year'], event_data['month'], event_data['day'],
-                      event_data['start_time'], event_data['end_time'],
-                      event_data['hours'], event_data['summary']])
-
-    workbook.save(excel_path)
-    return change_log
\ No newline at end of file
+            self.index.add(new_event_data)
+            self.change_log.append(f"Added event '{new_event_data['summary']}' on {new_event_data['day']}/{new_event_data['month']}/{new_event_data['year']} at {new_event_data['start_time']}-{new_event_data['end_time']}. Duration: {new_event_data['hours']} hours.")
+
+    def _resolve(self, new_event_data, conflicting_existing_events, actions, choosers):
+        should_add_new_event = True
+        events_to_remove_from_all_events = [] # Collect events to remove from the master list
+
+        for existing_event_in_conflict, action, chooser in zip(conflicting_existing_events, actions, choosers):
+            if 'new' in action and 'existing' in action:
+                self.change_log.append(f"{chooser} chose to keep both new event '{new_event_data['summary']}' and existing event '{existing_event_in_conflict['summary']}' on {new_event_data['day']}/{new_event_data['month']}/{new_event_data['year']}.")
+                # No change to the index for existing_event_in_conflict as it's kept
+            elif 'new' in action:
+                # Keep the new event and discard existing.
+                events_to_remove_from_all_events.append(existing_event_in_conflict)
+                self.change_log.append(f"{chooser} chose to replace existing event '{existing_event_in_conflict['summary']}' with new event '{new_event_data['summary']}' on {new_event_data['day']}/{new_event_data['month']}/{new_event_data['year']}.")
+            elif 'existing' in action:
+                # Keep existing and don't add new.
+                should_add_new_event = False
+                self.change_log.append(f"{chooser} chose to keep existing event '{existing_event_in_conflict['summary']}' and skip new event '{new_event_data['summary']}' on {new_event_data['day']}/{new_event_data['month']}/{new_event_data['year']}.")
+                break # When keeping existing and skipping new, no need to check other conflicts for this new event.
+            else: # action is () - neither
+                should_add_new_event = False
+                events_to_remove_from_all_events.append(existing_event_in_conflict) # Remove existing if neither is chosen
+                self.change_log.append(f"{chooser} chose to skip new event '{new_event_data['summary']}' and remove existing '{existing_event_in_conflict['summary']}' due to conflict on {new_event_data['day']}/{new_event_data['month']}/{new_event_data['year']}.")
+                break # When skipping, no need to check other conflicts for this new event.
+
+        # Remove events marked for removal from the master list
+        for event_to_remove in events_to_remove_from_all_events:
+            self.index.remove(event_to_remove)
+
+        if should_add_new_event:
+            self.index.add(new_event_data)
+
+    def finish(self):
+        """Review the conflicts the policy left open in one call, then merge the held-back entries in order."""
+        deferred, self.deferred, self.deferred_dates = self.deferred, [], set()
+        # The entries on a held-back date have not changed since, so each held-back entry can only
+        # meet those and the held-back entries before it. Exact duplicates of either are skipped when
+        # merged, so there is nothing to ask about them.
+        earlier = EventIndex()
+        review = []
+        for new_event_data in deferred:
+            if self.index.has_duplicate(new_event_data) or earlier.has_duplicate(new_event_data):
+                continue
+            for existing in self.index.overlapping(new_event_data) + earlier.overlapping(new_event_data):
+                if self.conflict_policy.decide(new_event_data, existing) is None:
+                    review.append((new_event_data, existing))
+            earlier.add(new_event_data)
+        answers = {}
+        if review:
+            answers = {(id(new_event_data), id(existing)): action
+                       for (new_event_data, existing), action in zip(review, self.review_conflicts(review))}
+        for new_event_data in deferred:
+            self._merge(new_event_data, answers)
+
+    def rows(self):
+        """The merged rows, sorted by date and start time (after the review of open conflicts)."""
+        self.finish()
+        return [[event_data['year'], event_data['month'], event_data['day'],
+                 event_data['start_time'], event_data['end_time'],
+                 event_data['hours'], event_data['summary']] for event_data in self.index.sorted_events()]
+
+def merge_calendar_events(existing_rows, events, review_conflicts, conflict_policy=None):
+    """Merge calendar events into the existing sheet rows (lists of the 7 sheet values).
+
+    Conflicts are settled as described in CalendarMerge. Returns (rows, change_log) with the
+    rows sorted by date and start time.
+    """
+    change_log = []
+    new_entries = []
+    for event in events:
+        entry, message = parse_calendar_event(event)
+        if message:
+            change_log.append(message)
+        if entry is not None:
+            new_entries.append(entry)
+    merge = CalendarMerge(existing_rows, review_conflicts, change_log, conflict_policy)
+    for entry in new_entries:
+        merge.add(entry)
+    return merge.rows(), change_log
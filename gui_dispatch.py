@@ -0,0 +1,107 @@
+# Thread-safe bridge between the GUI's worker threads and the Tk main loop.
+# Tk widgets may only be touched from the thread running mainloop(). Workers put log lines
+# and callables on a queue instead, and the main loop drains it every few milliseconds with
+# root.after: consecutive log lines with the same tag become a single Text insert, the log
+# is capped at a fixed number of lines, and dialogs a worker needs are shown on the main
+# thread while the worker waits for the answer.
+
+import time
+import queue
+import threading
+import tkinter as tk
+
+DEFAULT_MAX_LINES = 5000
+DEFAULT_INTERVAL_MS = 50
+DEFAULT_TIME_BUDGET = 0.02 # Seconds of work per drain, so the window stays responsive
+
+_TEXT, _CLEAR, _CALL = range(3)
+
+class UiDispatcher:
+    def __init__(self, root, text_widget, max_lines=DEFAULT_MAX_LINES, interval_ms=DEFAULT_INTERVAL_MS, time_budget=DEFAULT_TIME_BUDGET):
+        self.root = root
+        self.text_widget = text_widget
+        self.max_lines = max_lines
+        self.interval_ms = interval_ms
+        self.time_budget = time_budget
+        self.queue = queue.Queue()
+
+    def start(self):
+        self.root.after(self.interval_ms, self._drain)
+
+    def log(self, text, tag=None):
+        """Append text to the output log (from any thread)."""
+        self.queue.put((_TEXT, text, tag))
+
+    def clear(self):
+        """Empty the output log (from any thread); lines logged before the call are dropped too."""
+        self.queue.put((_CLEAR, None, None))
+
+    def call(self, func, *args, **kwargs):
+        """Run func on the Tk thread without waiting for it."""
+        self.queue.put((_CALL, (func, args, kwargs), None))
+
+    def call_and_wait(self, func, *args, **kwargs):
+        """Run func on the Tk thread and return its result, e.g. to show a dialog from a worker."""
+        if threading.current_thread() is threading.main_thread():
+            return func(*args, **kwargs)
+        done = threading.Event()
+        outcome = {}
+        def run():
+            try:
+                outcome['result'] = func(*args, **kwargs)
+            except BaseException as e:
+                outcome['error'] = e
+            finally:
+                done.set()
+        self.call(run)
+        done.wait()
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['result']
+
+    def _drain(self):
+        # Scheduled first: a dialog shown by a call runs a nested event loop, and the log
+        # has to keep flowing while it is open.
+        self.root.after(self.interval_ms, self._drain)
+        deadline = time.perf_counter() + self.time_budget
+        pending_text, pending_tag, wrote = [], None, False
+        while time.perf_counter() < deadline:
+            try:
+                kind, payload, tag = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == _TEXT:
+                if pending_text and tag != pending_tag:
+                    self._insert(pending_text, pending_tag)
+                    pending_text = []
+                pending_tag = tag
+                pending_text.append(payload)
+                wrote = True
+                continue
+            # Flush the text logged before a clear or a call, so the order is kept
+            if pending_text:
+                self._insert(pending_text, pending_tag)
+                pending_text = []
+            if kind == _CLEAR:
+                self.text_widget.delete('1.0', tk.END)
+            else:
+                func, args, kwargs = payload
+                func(*args, **kwargs)
+        if pending_text:
+            self._insert(pending_text, pending_tag)
+        if wrote:
+            self._trim()
+            self.text_widget.see(tk.END)
+
+    def _insert(self, chunks, tag):
+        text = ''.join(chunks)
+        if tag:
+            self.text_widget.insert(tk.END, text, tag)
+        else:
+            self.text_widget.insert(tk.END, text)
+
+    def _trim(self):
+        # Line number of the last character = number of lines in the log
+        excess = int(self.text_widget.index('end-1c').split('.')[0]) - self.max_lines
+        if excess > 0:
+            self.text_widget.delete('1.0', f'{excess + 1}.0')
@@ -0,0 +1,55 @@
+# Local HTTP server for the offline webtime mock (mock_webtime/wt_periodic.adp).
+# Point the filler at it with --url to develop or benchmark without the real site, e.g.:
+#   python mock_webtime_server.py --port 8765
+#   python timesheet_filler.py --url "http://127.0.0.1:8765/wt_periodic.adp?month=2024-06"
+
+import os
+import argparse
+import threading
+from functools import partial
+from urllib.parse import urlencode
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+MOCK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_webtime')
+MOCK_PAGE = 'wt_periodic.adp'
+
+class MockWebtimeHandler(SimpleHTTPRequestHandler):
+    # .adp is unknown to mimetypes; without this the browser would download the page.
+    extensions_map = dict(SimpleHTTPRequestHandler.extensions_map, **{'.adp': 'text/html; charset=utf-8'})
+
+    def log_message(self, format, *args):
+        pass
+
+def start_mock_server(port=0):
+    """Serve the mock from a background thread. port=0 picks a free port; call shutdown() when done."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), partial(MockWebtimeHandler, directory=MOCK_DIR))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def mock_timesheet_url(server, month=None, latency=0, lazy_notes=False):
+    """URL of the mock timesheet page on a running server ('YYYY-MM' month, latency in ms)."""
+    params = {}
+    if month:
+        params['month'] = month
+    if latency:
+        params['latency'] = latency
+    if lazy_notes:
+        params['lazy_notes'] = 1
+    url = f"http://127.0.0.1:{server.server_address[1]}/{MOCK_PAGE}"
+    return f"{url}?{urlencode(params)}" if params else url
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve the offline webtime mock page.')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on.')
+    parser.add_argument('--month', type=str, help='Month shown by the printed URL (YYYY-MM).')
+    parser.add_argument('--latency', type=int, default=0, help='Simulated delay in ms for adds, popups and the table load.')
+    parser.add_argument('--lazy-notes', action='store_true', help='Create notes textareas only when their popup opens.')
+    args = parser.parse_args()
+
+    server = start_mock_server(args.port)
+    print(f"Mock webtime running at {mock_timesheet_url(server, args.month, args.latency, args.lazy_notes)}")
+    print("Press Ctrl+C to stop.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,23 @@
+import socket
+
+from browser_session import load_session_state, save_session_state, resolve_driver_path, is_debugger_listening, SESSION_FILE_NAME
+
+def test_session_state_round_trip_and_corrupt_file(tmp_path):
+    session_dir = str(tmp_path / 'session')
+    assert load_session_state(session_dir) == {}
+    save_session_state(session_dir, {'driver_path': '/opt/chromedriver'})
+    assert load_session_state(session_dir) == {'driver_path': '/opt/chromedriver'}
+    (tmp_path / 'session' / SESSION_FILE_NAME).write_text('{"driver_pa', encoding='utf-8')
+    assert load_session_state(session_dir) == {}
+
+def test_a_cached_driver_path_is_used_without_webdriver_manager(tmp_path):
+    driver = tmp_path / 'chromedriver'
+    driver.write_text('')
+    save_session_state(str(tmp_path), {'driver_path': str(driver)})
+    assert resolve_driver_path(str(tmp_path)) == str(driver)
+
+def test_no_browser_listening_on_a_free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    assert not is_debugger_listening(port, timeout=0.2)
@@ -0,0 +1,89 @@
+import datetime
+
+from calendar_cache import CalendarCache, time_key
+from google_calendar_integration import sync_calendar_cache
+
+def event(event_id, day, hour, etag='1', status='confirmed'):
+    start = datetime.datetime(2024, 1, day, hour, tzinfo=datetime.timezone.utc)
+    return {'id': event_id, 'etag': etag, 'status': status, 'summary': event_id,
+            'start': {'dateTime': start.isoformat()}, 'end': {'dateTime': (start + datetime.timedelta(hours=1)).isoformat()}}
+
+class Gone(Exception):
+    class resp:
+        status = 410
+
+class FakeCalendar:
+    """events().list over a mutable calendar; a syncToken returns what changed since it was handed out."""
+
+    def __init__(self, events):
+        self.events_by_id = {item['id']: item for item in events}
+        self.changes = []
+        self.calls = []
+        self.expire_tokens = False
+
+    def update(self, item):
+        self.events_by_id[item['id']] = item
+        self.changes.append(item)
+
+    def events(self):
+        return self
+
+    def list(self, calendarId, pageToken=None, syncToken=None, **params):
+        self.calls.append('incremental' if syncToken else 'full')
+        if syncToken and self.expire_tokens:
+            raise Gone()
+        if syncToken:
+            items = self.changes[int(syncToken):]
+        else:
+            items = [item for item in self.events_by_id.values() if item['status'] != 'cancelled']
+        self.response = {'items': items, 'nextSyncToken': str(len(self.changes))}
+        return self
+
+    def execute(self, http=None):
+        return self.response
+
+def test_time_key():
+    assert time_key({'dateTime': '2024-01-02T09:00:00+02:00'}) == '2024-01-02T07:00:00'
+    assert time_key({'dateTime': '2024-01-02T07:00:00Z'}) == '2024-01-02T07:00:00'
+    assert time_key({'date': '2024-01-02'}) == '2024-01-02T00:00:00'
+    assert time_key({}) is None
+
+def test_apply_skips_unchanged_etags_and_deletes_cancelled(tmp_path):
+    cache = CalendarCache(str(tmp_path / 'cache.sqlite'))
+    assert cache.apply('primary', [event('a', 2, 9), event('b', 3, 9)]) == 2
+    assert cache.apply('primary', [event('a', 2, 9), event('b', 3, 10, etag='2')]) == 1
+    assert cache.apply('primary', [event('a', 2, 9, status='cancelled')]) == 1
+    assert [item['id'] for item in cache.all_events('primary')] == ['b']
+    assert cache.events_between('primary', '2024-01-03T10:30:00', '2024-01-04T00:00:00')[0]['etag'] == '2'
+    assert cache.events_between('primary', '2024-01-03T11:00:00', '2024-01-04T00:00:00') == []
+    cache.close()
+
+def test_incremental_sync_matches_a_full_download(tmp_path):
+    start, end = datetime.date(2024, 1, 1), datetime.date(2024, 1, 31)
+    service = FakeCalendar([event('a', 2, 9), event('b', 3, 9), event('c', 4, 9)])
+    cache = CalendarCache(str(tmp_path / 'cache.sqlite'))
+    assert sync_calendar_cache(service, cache, 'primary', start, end) == ('full', 3)
+
+    service.update(event('b', 3, 11, etag='2'))
+    service.update(event('c', 4, 9, status='cancelled'))
+    service.update(event('d', 5, 9))
+    assert sync_calendar_cache(service, cache, 'primary', start, end) == ('incremental', 3)
+    fresh = CalendarCache(str(tmp_path / 'fresh.sqlite'))
+    sync_calendar_cache(service, fresh, 'primary', start, end)
+    assert cache.all_events('primary') == fresh.all_events('primary')
+    assert [item['id'] for item in cache.all_events('primary')] == ['a', 'b', 'd']
+
+    # A range outside the synced window needs a full sync
+    assert sync_calendar_cache(service, cache, 'primary', start, datetime.date(2024, 2, 29))[0] == 'full'
+    cache.close()
+    fresh.close()
+
+def test_expired_sync_token_falls_back_to_a_full_sync(tmp_path):
+    start, end = datetime.date(2024, 1, 1), datetime.date(2024, 1, 31)
+    service = FakeCalendar([event('a', 2, 9)])
+    cache = CalendarCache(str(tmp_path / 'cache.sqlite'))
+    sync_calendar_cache(service, cache, 'primary', start, end)
+    service.expire_tokens = True
+    assert sync_calendar_cache(service, cache, 'primary', start, end) == ('full', 1)
+    assert service.calls == ['full', 'incremental', 'full']
+    cache.close()
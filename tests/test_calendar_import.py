@@ -0,0 +1,165 @@
+import datetime
+import random
+import threading
+
+import pandas as pd
+import pytest
+
+from conflict_policy import ConflictPolicy, KEEP_EXISTING
+import google_calendar_integration
+from google_calendar_integration import import_calendar_events, merge_calendar_events, list_calendar_ids, _event_order_key
+from timesheet_store import SQLiteStore, SHEET_COLUMNS
+
+class FakeRequest:
+    def __init__(self, response):
+        self.response = response
+
+    def execute(self, http=None):
+        return self.response
+
+class FakeEvents:
+    def __init__(self, calendars, page_size):
+        self.calendars = calendars
+        self.page_size = page_size
+
+    def requested(self, calendar_id, page):
+        pass
+
+    def list(self, calendarId, pageToken=None, orderBy=None, **params):
+        # Pages come in the calendar's own order unless asked for start order
+        items = self.calendars[calendarId]
+        if orderBy == 'startTime':
+            items = sorted(items, key=_event_order_key)
+        self.requested(calendarId, int(pageToken or 0) // self.page_size)
+        start = int(pageToken or 0)
+        response = {'items': items[start:start + self.page_size]}
+        if start + self.page_size < len(items):
+            response['nextPageToken'] = str(start + self.page_size)
+        else:
+            response['nextSyncToken'] = 'sync'
+        return FakeRequest(response)
+
+class FakeService:
+    def __init__(self, calendars, page_size=2):
+        self._events = FakeEvents(calendars, page_size)
+
+    def events(self):
+        return self._events
+
+def event(uid, day, start, end, summary):
+    def when(hhmm):
+        return {'dateTime': datetime.datetime(2024, 1, day, *map(int, hhmm.split(':'))).astimezone().isoformat()}
+    return {'id': uid, 'iCalUID': uid, 'etag': '1', 'status': 'confirmed', 'summary': summary,
+            'start': when(start), 'end': when(end)}
+
+def read_rows(store):
+    return store.read().astype(object).where(lambda df: df.notna(), None).values.tolist()
+
+@pytest.mark.parametrize('use_cache', [False, True])
+def test_calendars_are_merged_in_start_order(tmp_path, use_cache):
+    calendars = {
+        'primary': [event('late', 2, '10:00', '11:00', 'Late'), event('shared', 2, '14:00', '15:00', 'Shared')],
+        'team': [event('early', 2, '09:30', '10:30', 'Early'), event('shared', 2, '14:00', '15:00', 'Shared'),
+                 event('other', 3, '09:00', '10:00', 'Other')],
+    }
+    store = SQLiteStore(str(tmp_path / 'sheet.sqlite'))
+    store.replace(pd.DataFrame([(2024, 1, 1, '09:00', '10:00', 1.0, 'Existing')], columns=SHEET_COLUMNS))
+    policy = ConflictPolicy(KEEP_EXISTING)
+    change_log, received = import_calendar_events(
+        FakeService(calendars), store, datetime.date(2024, 1, 1), datetime.date(2024, 1, 31), lambda pairs: [],
+        calendar_ids=['primary', 'team'], cache_path=str(tmp_path / 'cache.sqlite') if use_cache else None,
+        conflict_policy=policy)
+    assert received == 4 # 'shared' is on both calendars
+    # Early starts first, so it is the one kept; Late (merged first by calendar order) is skipped
+    summaries = [row[6] for row in read_rows(store)]
+    assert summaries == ['Existing', 'Early', 'Shared', 'Other']
+
+def test_import_matches_merging_the_sorted_events(tmp_path):
+    rng = random.Random(7)
+    calendars = {}
+    for calendar_id in ('primary', 'a', 'b'):
+        items = []
+        for n in range(12):
+            start = rng.randrange(8 * 4, 17 * 4) * 15
+            end = start + rng.choice((15, 30, 60, 90))
+            items.append(event(f'{calendar_id}{n}', rng.randint(1, 3), f'{start // 60}:{start % 60:02d}',
+                               f'{end // 60}:{end % 60:02d}', f'{calendar_id} {n}'))
+        items.append(event('everyone', 2, '12:00', '13:00', 'Lunch'))
+        rng.shuffle(items)
+        calendars[calendar_id] = items
+    existing = [[2024, 1, day, '10:00', '11:00', 1.0, f'Sheet {day}'] for day in (1, 2, 3)]
+    store = SQLiteStore(str(tmp_path / 'sheet.sqlite'))
+    store.replace(pd.DataFrame(existing, columns=SHEET_COLUMNS))
+    review = lambda pairs: [('new',) if index % 2 else ('existing',) for index in range(len(pairs))]
+
+    change_log, received = import_calendar_events(
+        FakeService(calendars, page_size=5), store, datetime.date(2024, 1, 1), datetime.date(2024, 1, 31), review,
+        calendar_ids=['primary', 'a', 'b'], cache_path=str(tmp_path / 'cache.sqlite'))
+
+    ordered, seen = [], set()
+    for item in sorted((item for items in calendars.values() for item in items), key=_event_order_key):
+        if (item['iCalUID'], _event_order_key(item)) not in seen:
+            seen.add((item['iCalUID'], _event_order_key(item)))
+            ordered.append(item)
+    expected_rows, expected_log = merge_calendar_events(existing, ordered, review)
+    assert received == len(ordered) == 37
+    assert read_rows(store) == expected_rows
+    # Events are parsed as they arrive, so skip messages are interleaved with the merge's messages
+    assert sorted(change_log) == sorted(expected_log)
+    assert [line for line in change_log if not line.startswith('Skipped event')] == \
+        [line for line in expected_log if not line.startswith('Skipped event')]
+
+class FakeCalendarList:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def calendarList(self):
+        return self
+
+    def list(self, pageToken=None, **params):
+        index = int(pageToken or 0)
+        response = {'items': self.pages[index]}
+        if index + 1 < len(self.pages):
+            response['nextPageToken'] = str(index + 1)
+        return FakeRequest(response)
+
+def test_list_calendar_ids_puts_primary_first_and_skips_hidden_calendars():
+    service = FakeCalendarList([
+        [{'id': 'team', 'selected': True}, {'id': 'holidays', 'selected': True, 'hidden': True}],
+        [{'id': 'me@example.com', 'primary': True, 'selected': True}, {'id': 'unselected'}, {'id': 'room', 'selected': True}],
+    ])
+    assert list_calendar_ids(service) == ['primary', 'team', 'room']
+
+def test_a_meeting_on_several_calendars_is_kept_once_from_the_first_calendar(tmp_path):
+    calendars = {'primary': [event('m', 2, '10:00', '11:00', 'Mine'), event('x', 2, '09:00', '09:30', 'Early')],
+                 'team': [event('m', 2, '10:00', '11:00', 'Team copy'), event('y', 2, '09:30', '10:00', 'Mid')]}
+    store = SQLiteStore(str(tmp_path / 'sheet.sqlite'))
+    _, received = import_calendar_events(FakeService(calendars, page_size=1), store, datetime.date(2024, 1, 1),
+                                         datetime.date(2024, 1, 31), lambda pairs: [], calendar_ids=['primary', 'team', 'primary'],
+                                         cache_path=None)
+    assert received == 3
+    assert [row[6] for row in read_rows(store)] == ['Early', 'Mid', 'Mine']
+
+def test_pages_in_start_order_are_merged_while_later_pages_download(tmp_path, monkeypatch):
+    calendars = {'primary': [event(f'e{day}', day, '09:00', '10:00', f'Day {day}') for day in range(1, 7)]}
+    service = FakeService(calendars, page_size=2)
+    merged = []
+    first_merged = threading.Event()
+    add = google_calendar_integration.CalendarMerge.add
+    def recording_add(merge, entry):
+        merged.append(entry['summary'])
+        first_merged.set()
+        add(merge, entry)
+    monkeypatch.setattr(google_calendar_integration.CalendarMerge, 'add', recording_add)
+    merged_before_last_page = []
+    def requested(calendar_id, page):
+        if page == 2: # The last page waits until earlier events are in the merge
+            first_merged.wait(5)
+            merged_before_last_page.extend(merged)
+    service.events().requested = requested
+    store = SQLiteStore(str(tmp_path / 'sheet.sqlite'))
+    _, received = import_calendar_events(service, store, datetime.date(2024, 1, 1), datetime.date(2024, 1, 31),
+                                         lambda pairs: [], cache_path=None)
+    assert received == 6
+    assert merged_before_last_page and merged_before_last_page == merged[:len(merged_before_last_page)]
+    assert merged == [f'Day {day}' for day in range(1, 7)]
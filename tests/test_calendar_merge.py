@@ -0,0 +1,152 @@
+import datetime
+import random
+
+import pytest
+
+from conflict_policy import ConflictPolicy, ASK, KEEP_EXISTING, PREFER_CALENDAR, KEEP_BOTH, LONGEST_WINS
+from google_calendar_integration import (CalendarMerge, merge_calendar_events, parse_calendar_event, _existing_entries,
+                                         are_overlapping)
+
+ACTIONS = [('existing',), ('new',), ('new', 'existing'), ()]
+
+def event(day, start, end, summary):
+    def when(minutes):
+        return {'dateTime': (datetime.datetime(2024, 1, day) + datetime.timedelta(minutes=minutes)).astimezone().isoformat()}
+    return {'id': summary, 'status': 'confirmed', 'summary': summary, 'start': when(start), 'end': when(end)}
+
+def reference_merge(existing_rows, events, callback):
+    """The merge as it was before conflicts were batched: every conflict is decided on the spot."""
+    all_events = _existing_entries(existing_rows)
+    def key(entry):
+        return (entry['year'], entry['month'], entry['day'], entry['start_time'], entry['end_time'], entry['summary'])
+    for event_data in events:
+        new, _ = parse_calendar_event(event_data)
+        if new is None or any(key(existing) == key(new) for existing in all_events):
+            continue
+        conflicts = [existing for existing in all_events if (existing['year'], existing['month'], existing['day']) ==
+                     (new['year'], new['month'], new['day']) and
+                     are_overlapping(new['start_dt'], new['end_dt'], existing['start_dt'], existing['end_dt'])]
+        keep, remove = True, []
+        for existing in conflicts:
+            action = callback(new, existing)
+            if 'new' in action and 'existing' in action:
+                continue
+            if 'new' in action:
+                remove.append(existing)
+                continue
+            keep = False
+            if 'existing' not in action:
+                remove.append(existing)
+            break
+        for existing in remove:
+            all_events.remove(existing)
+        if keep:
+            all_events.append(new)
+    all_events.sort(key=lambda entry: (entry['year'], entry['month'], entry['day'], entry['start_dt']))
+    return [[entry['year'], entry['month'], entry['day'], entry['start_time'], entry['end_time'], entry['hours'],
+             entry['summary']] for entry in all_events]
+
+def test_an_event_dropped_in_the_review_does_not_block_later_events():
+    # X is in the sheet; A and B both overlap it, and B also overlaps A. The user keeps X over A
+    # and B over X: B must replace X, as it did when each conflict was asked on the spot.
+    existing = [[2024, 1, 2, '09:00', '10:00', 1.0, 'X']]
+    events = [event(2, 9 * 60, 9 * 60 + 30, 'A'), event(2, 9 * 60 + 15, 10 * 60, 'B')]
+    answers = {('A', 'X'): ('existing',), ('B', 'X'): ('new',), ('B', 'A'): ('existing',)}
+    reviews = []
+    def review(pairs):
+        reviews.append([(new['summary'], other['summary']) for new, other in pairs])
+        return [answers[(new['summary'], other['summary'])] for new, other in pairs]
+    rows, change_log = merge_calendar_events(existing, events, review)
+    assert [row[6] for row in rows] == ['B']
+    assert rows == reference_merge(existing, events, lambda new, other: answers[(new['summary'], other['summary'])])
+    assert len(reviews) == 1
+    assert "User chose to replace existing event 'X' with new event 'B' on 2/1/2024." in change_log
+
+def test_log_names_who_decided_each_pair():
+    existing = [[2024, 1, 2, '09:00', '10:00', 1.0, 'Lunch'], [2024, 1, 2, '10:00', '11:00', 1.0, 'Design']]
+    policy = ConflictPolicy(ASK, [('lunch', KEEP_BOTH)])
+    rows, change_log = merge_calendar_events(existing, [event(2, 9 * 60 + 30, 10 * 60 + 30, 'Sync')],
+                                             lambda pairs: [('new',)] * len(pairs), policy)
+    assert [row[6] for row in rows] == ['Lunch', 'Sync']
+    assert change_log == ["Policy chose to keep both new event 'Sync' and existing event 'Lunch' on 2/1/2024.",
+                          "User chose to replace existing event 'Design' with new event 'Sync' on 2/1/2024."]
+
+def test_policy_settled_conflicts_are_not_reviewed():
+    existing = [[2024, 1, 2, '09:00', '10:00', 1.0, 'X']]
+    def review(pairs):
+        raise AssertionError('nothing to review')
+    rows, _ = merge_calendar_events(existing, [event(2, 9 * 60, 11 * 60, 'Long')], review, ConflictPolicy(LONGEST_WINS))
+    assert [row[6] for row in rows] == ['Long']
+
+def test_entries_are_labelled_with_their_source():
+    reviewed = []
+    def review(pairs):
+        reviewed.extend(pairs)
+        return [('new', 'existing')] * len(pairs)
+    merge = CalendarMerge([[2024, 1, 2, '09:00', '10:00', 1.0, 'X']], review)
+    for event_data in (event(2, 9 * 60, 10 * 60, 'A'), event(2, 9 * 60 + 30, 10 * 60, 'B')):
+        merge.add(parse_calendar_event(event_data)[0])
+    merge.finish()
+    assert [(new['summary'], other['summary'], other['source']) for new, other in reviewed] == \
+        [('A', 'X', 'sheet'), ('B', 'X', 'sheet'), ('B', 'A', 'calendar')]
+
+POLICIES = [ConflictPolicy(), ConflictPolicy(KEEP_EXISTING), ConflictPolicy(PREFER_CALENDAR), ConflictPolicy(LONGEST_WINS),
+            ConflictPolicy(ASK, [('^a', KEEP_BOTH), ('^b', PREFER_CALENDAR)])]
+
+@pytest.mark.parametrize('seed', range(400))
+def test_batched_review_matches_deciding_on_the_spot(seed):
+    rng = random.Random(seed)
+    names = iter(f'{letter}{n}' for n in range(100) for letter in 'abc')
+    def span():
+        start = rng.randrange(9 * 4, 11 * 4) * 15
+        return start, start + rng.choice((15, 30, 45, 60, 90))
+    existing = []
+    for _ in range(rng.randint(0, 3)):
+        start, end = span()
+        existing.append([2024, 1, rng.randint(1, 2), f'{start // 60:02d}:{start % 60:02d}', f'{end // 60:02d}:{end % 60:02d}',
+                         (end - start) / 60, next(names)])
+    events = []
+    for _ in range(rng.randint(1, 8)):
+        if existing and rng.random() < 0.1: # The same entry as one already in the sheet
+            row = rng.choice(existing)
+            start = int(row[3][:2]) * 60 + int(row[3][3:])
+            events.append(event(row[2], start, start + round(row[5] * 60), row[6]))
+            continue
+        start, end = span()
+        events.append(event(rng.randint(1, 2), start, end, next(names)))
+    policy = rng.choice(POLICIES)
+    answers = {}
+    def answer(new, other):
+        return answers.setdefault((new['summary'], other['summary']), rng.choice(ACTIONS))
+    def on_the_spot(new, other):
+        decided = policy.decide(new, other)
+        return decided if decided is not None else answer(new, other)
+
+    rows, change_log = merge_calendar_events(existing, events, lambda pairs: [answer(new, other) for new, other in pairs], policy)
+    assert rows == reference_merge(existing, events, on_the_spot)
+
+def summaries_review(answers, reviews):
+    def review(pairs):
+        reviews.append([(new['summary'], other['summary']) for new, other in pairs])
+        return [answers[(new['summary'], other['summary'])] for new, other in pairs]
+    return review
+
+def test_exact_duplicates_are_not_reviewed():
+    existing = [[2024, 1, 2, '09:00', '10:00', 1.0, 'Standup'], [2024, 1, 2, '11:00', '12:00', 1.0, 'Review']]
+    events = [event(2, 9 * 60 + 30, 10 * 60 + 30, 'Design'), event(2, 11 * 60, 12 * 60, 'Review'),
+              event(2, 9 * 60 + 30, 10 * 60 + 30, 'Design')]
+    reviews = []
+    rows, change_log = merge_calendar_events(existing, events, summaries_review({('Design', 'Standup'): ('new', 'existing')}, reviews))
+    assert reviews == [[('Design', 'Standup')]]
+    assert [row[6] for row in rows] == ['Standup', 'Design', 'Review']
+    assert change_log.count("Skipped duplicate event 'Review' on 2/1/2024.") == 1
+    assert change_log.count("Skipped duplicate event 'Design' on 2/1/2024.") == 1
+
+def test_a_duplicate_whose_twin_was_replaced_is_asked_about_on_its_own():
+    existing = [[2024, 1, 2, '09:00', '10:00', 1.0, 'X']]
+    events = [event(2, 9 * 60 + 30, 10 * 60 + 30, 'N'), event(2, 9 * 60, 10 * 60, 'X')]
+    answers = {('N', 'X'): ('new',), ('X', 'N'): ('existing',)}
+    reviews = []
+    rows, _ = merge_calendar_events(existing, events, summaries_review(answers, reviews))
+    assert reviews == [[('N', 'X')], [('X', 'N')]]
+    assert rows == reference_merge(existing, events, lambda new, other: answers[(new['summary'], other['summary'])])
@@ -0,0 +1,47 @@
+import datetime
+
+from calendar_recurrence import expand_recurring_events, expand_master
+
+UTC = datetime.timezone.utc
+
+def window(first_day, last_day):
+    return (datetime.datetime(2024, 3, first_day, tzinfo=UTC), datetime.datetime(2024, 3, last_day, 23, 59, 59, tzinfo=UTC))
+
+STANDUP = {
+    'id': 'standup', 'status': 'confirmed', 'summary': 'Standup',
+    'start': {'dateTime': '2024-03-08T09:00:00-05:00', 'timeZone': 'America/New_York'},
+    'end': {'dateTime': '2024-03-08T09:15:00-05:00', 'timeZone': 'America/New_York'},
+    'recurrence': ['RRULE:FREQ=DAILY;UNTIL=20240313', 'EXDATE;TZID=America/New_York:20240309T090000'],
+}
+
+def test_occurrences_keep_local_time_across_daylight_saving():
+    instances = expand_master(STANDUP, *window(1, 31))
+    assert [instance['start']['dateTime'] for instance in instances] == [
+        '2024-03-08T09:00:00-05:00', '2024-03-10T09:00:00-04:00', '2024-03-11T09:00:00-04:00',
+        '2024-03-12T09:00:00-04:00', '2024-03-13T09:00:00-04:00']
+    first = instances[0]
+    # Shaped like the instances Google returns
+    assert first['id'] == 'standup_20240308T140000Z'
+    assert first['recurringEventId'] == 'standup'
+    assert first['end']['dateTime'] == '2024-03-08T09:15:00-05:00'
+    assert 'recurrence' not in first
+
+def test_exceptions_replace_or_cancel_their_occurrence():
+    moved = {'id': 'standup_20240311T130000Z', 'recurringEventId': 'standup', 'status': 'confirmed', 'summary': 'Standup (moved)',
+             'originalStartTime': {'dateTime': '2024-03-11T09:00:00-04:00'},
+             'start': {'dateTime': '2024-03-11T11:00:00-04:00'}, 'end': {'dateTime': '2024-03-11T11:15:00-04:00'}}
+    cancelled = {'id': 'standup_20240312T130000Z', 'recurringEventId': 'standup', 'status': 'cancelled',
+                 'originalStartTime': {'dateTime': '2024-03-12T09:00:00-04:00'}}
+    one_off = {'id': 'review', 'status': 'confirmed', 'summary': 'Review',
+               'start': {'dateTime': '2024-03-11T10:00:00Z'}, 'end': {'dateTime': '2024-03-11T11:00:00Z'}}
+    events = expand_recurring_events([cancelled, STANDUP, one_off, moved], *window(10, 12))
+    assert [(event['id'], event['summary']) for event in events] == [
+        ('standup_20240310T130000Z', 'Standup'), ('review', 'Review'), ('standup_20240311T130000Z', 'Standup (moved)')]
+
+def test_all_day_series():
+    holiday = {'id': 'offsite', 'status': 'confirmed', 'summary': 'Offsite',
+               'start': {'date': '2024-03-04'}, 'end': {'date': '2024-03-05'},
+               'recurrence': ['RRULE:FREQ=WEEKLY;COUNT=3']}
+    events = expand_recurring_events([holiday], *window(10, 31))
+    assert [(event['id'], event['start']) for event in events] == [
+        ('offsite_20240311', {'date': '2024-03-11'}), ('offsite_20240318', {'date': '2024-03-18'})]
@@ -0,0 +1,42 @@
+import os
+import stat
+
+import openpyxl
+
+from google_calendar_integration import _read_sheet_rows, _write_sheet_rows
+from timesheet_store import SHEET_COLUMNS
+
+def test_rewrite_keeps_the_rest_of_the_workbook(tmp_path):
+    path = str(tmp_path / 'sheet.xlsx')
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = 'Hours'
+    sheet.append(SHEET_COLUMNS)
+    sheet.append([2024, 1, 2, '09:00', '10:00', 1.0, 'old'])
+    sheet.append([2024, 1, 3, '09:00', '10:00', 1.0, 'older'])
+    sheet.column_dimensions['G'].width = 40
+    sheet['A1'].font = openpyxl.styles.Font(bold=True)
+    sheet['F1'].number_format = '0.00'
+    notes = workbook.create_sheet('Notes')
+    notes['A1'] = 'keep me'
+    workbook.save(path)
+    os.chmod(path, 0o640)
+
+    rows = [[2024, 1, 2, '08:00', '09:00', 1.0, 'new'], [2024, 1, 2, '09:00', '10:00', 1.0, 'old']]
+    _write_sheet_rows(path, list(SHEET_COLUMNS), rows)
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    assert _read_sheet_rows(path) == (list(SHEET_COLUMNS), rows)
+    workbook = openpyxl.load_workbook(path)
+    assert workbook.sheetnames == ['Hours', 'Notes']
+    assert workbook['Notes']['A1'].value == 'keep me'
+    sheet = workbook['Hours']
+    assert sheet.column_dimensions['G'].width == 40
+    assert sheet['A1'].font.bold
+    assert sheet['F1'].number_format == '0.00'
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('.calendar_merge_')]
+
+def test_new_file_gets_the_header(tmp_path):
+    path = str(tmp_path / 'new.xlsx')
+    _write_sheet_rows(path, list(SHEET_COLUMNS), [[2024, 1, 2, '08:00', '09:00', 1.0, 'x']])
+    assert _read_sheet_rows(path) == (list(SHEET_COLUMNS), [[2024, 1, 2, '08:00', '09:00', 1.0, 'x']])
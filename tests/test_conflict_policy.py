@@ -0,0 +1,42 @@
+import datetime
+import types
+
+import pytest
+
+from conflict_policy import (ConflictPolicy, policy_from_config, ASK, KEEP_EXISTING, PREFER_CALENDAR, KEEP_BOTH,
+                             LONGEST_WINS, KEEP_EXISTING_ACTION, KEEP_NEW_ACTION, KEEP_BOTH_ACTION)
+
+def entry(summary, start_hour, end_hour):
+    day = datetime.datetime(2024, 1, 2)
+    return {'summary': summary, 'start_dt': day.replace(hour=start_hour), 'end_dt': day.replace(hour=end_hour)}
+
+def test_default_actions():
+    new, existing = entry('Sync', 9, 10), entry('Report', 9, 11)
+    assert ConflictPolicy().decide(new, existing) is None
+    assert ConflictPolicy(KEEP_EXISTING).decide(new, existing) == KEEP_EXISTING_ACTION
+    assert ConflictPolicy(PREFER_CALENDAR).decide(new, existing) == KEEP_NEW_ACTION
+    assert ConflictPolicy(KEEP_BOTH).decide(new, existing) == KEEP_BOTH_ACTION
+
+def test_longest_wins_keeps_the_existing_entry_on_a_tie():
+    policy = ConflictPolicy(LONGEST_WINS)
+    assert policy.decide(entry('Long', 9, 12), entry('Short', 9, 10)) == KEEP_NEW_ACTION
+    assert policy.decide(entry('Short', 9, 10), entry('Long', 9, 12)) == KEEP_EXISTING_ACTION
+    assert policy.decide(entry('Same', 9, 10), entry('Same too', 9, 10)) == KEEP_EXISTING_ACTION
+
+def test_first_matching_rule_wins_on_either_summary():
+    policy = ConflictPolicy(ASK, [(r'lunch|break', KEEP_EXISTING), (r'^Sprint', PREFER_CALENDAR)])
+    assert policy.policy_for(entry('Sprint review', 9, 10), entry('Lunch', 9, 10)) == KEEP_EXISTING
+    assert policy.policy_for(entry('Sprint review', 9, 10), entry('Design', 9, 10)) == PREFER_CALENDAR
+    assert policy.policy_for(entry('Design', 9, 10), {'summary': None, **entry('', 9, 10)}) == ASK
+
+def test_unknown_policies_are_rejected():
+    with pytest.raises(ValueError):
+        ConflictPolicy('newest')
+    with pytest.raises(ValueError):
+        ConflictPolicy(ASK, [('x', 'newest')])
+
+def test_policy_from_config():
+    assert policy_from_config(types.SimpleNamespace()).default == ASK
+    policy = policy_from_config(types.SimpleNamespace(conflict_policy=KEEP_BOTH, conflict_rules=[('^1:1', ASK)]))
+    assert policy.default == KEEP_BOTH
+    assert policy.policy_for(entry('1:1 with Dana', 9, 10), entry('x', 9, 10)) == ASK
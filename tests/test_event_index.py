@@ -0,0 +1,44 @@
+import random
+import datetime
+
+from google_calendar_integration import EventIndex, are_overlapping
+
+def make_event(rng, number):
+    day = rng.randint(1, 3)
+    start = datetime.datetime(2026, 3, day, rng.randint(7, 17), rng.choice([0, 15, 30, 45]))
+    end = start + datetime.timedelta(minutes=rng.choice([0, 15, 30, 60, 90, 180]))
+    return {'year': 2026, 'month': 3, 'day': day, 'start_time': start.strftime('%H:%M'), 'end_time': end.strftime('%H:%M'),
+            'hours': 1.0, 'summary': f"S{number % 5}", 'start_dt': start, 'end_dt': end}
+
+def scan_overlapping(events, event):
+    """What the original code did: scan the whole list in order."""
+    return [other for other in events
+            if (other['year'], other['month'], other['day']) == (event['year'], event['month'], event['day'])
+            and are_overlapping(event['start_dt'], event['end_dt'], other['start_dt'], other['end_dt'])]
+
+def test_matches_a_scan_of_the_rows_in_row_order():
+    rng = random.Random(11)
+    for _ in range(200):
+        events = [make_event(rng, i) for i in range(rng.randint(0, 30))]
+        index = EventIndex(events)
+        listed = list(events)
+        for step in range(30):
+            probe = make_event(rng, 100 + step)
+            assert [id(e) for e in index.overlapping(probe)] == [id(e) for e in scan_overlapping(listed, probe)]
+            key = lambda e: (e['year'], e['month'], e['day'], e['start_time'], e['end_time'], e['summary'])
+            assert index.has_duplicate(probe) == any(key(e) == key(probe) for e in listed)
+            if listed and rng.random() < 0.4:
+                removed = listed.pop(rng.randrange(len(listed)))
+                index.remove(removed)
+            else:
+                index.add(probe)
+                listed.append(probe)
+        assert len(index) == len(listed)
+        expected = sorted(listed, key=lambda e: (e['year'], e['month'], e['day'], e['start_dt']))
+        assert [id(e) for e in index.sorted_events()] == [id(e) for e in expected]
+
+def test_remove_of_an_unknown_event_is_ignored():
+    rng = random.Random(1)
+    index = EventIndex([make_event(rng, 0)])
+    index.remove(make_event(rng, 1))
+    assert len(index) == 1
@@ -0,0 +1,51 @@
+from fill_journal import FillJournal, NULL_JOURNAL, load_journal, split_confirmed, default_journal_path
+
+def entry(index, start, end, notes, date='02/01/2024'):
+    return {'date': date, 'index': index, 'start_time': start, 'end_time': end, 'notes': notes}
+
+def web(row, start, end, notes, jid=''):
+    return {'row': str(row), 'start_time': start, 'end_time': end, 'notes': notes, 'jid': jid}
+
+def test_default_journal_path():
+    assert default_journal_path('sheets/timesheet.xlsx') == 'sheets/timesheet.fill_journal.jsonl'
+
+def test_latest_record_wins_and_a_cut_line_is_ignored(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    journal = FillJournal(path)
+    journal.record(entry(0, '09:00', '10:00', 'a'), '1', 'failed', reason='timeout')
+    journal.record(entry(0, '09:00', '10:00', 'a'), '1', 'written')
+    journal.record(entry(1, '10:00', '11:00', 'b'), '2', 'written')
+    journal.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"date": "02/01/2024", "ind') # The run died mid-write
+    records = load_journal(path)
+    assert {key: record['status'] for key, record in records.items()} == {('02/01/2024', 0): 'written', ('02/01/2024', 1): 'written'}
+    assert load_journal(str(tmp_path / 'missing.jsonl')) == {}
+
+def test_resume_skips_only_entries_the_page_still_shows(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    journal = FillJournal(path)
+    entries = [entry(0, '09:00', '10:00', 'a'), entry(1, '10:00', '11:00', 'b'), entry(2, '11:00', '12:00', 'c')]
+    journal.record(entries[0], '1', 'written')
+    journal.record(entries[1], '2', 'written')
+    journal.record(entries[2], '3', 'failed')
+    journal.close()
+    # Row 2 was edited on the page since, and the sheet entry b was changed too
+    entries[1] = entry(1, '10:00', '11:30', 'b')
+    page = {'02/01/2024': [web(1, '09:00', '10:00', 'a'), web(2, '10:00', '11:00', 'b'), web(3, None, None, '')]}
+    remaining, web_rows, confirmed = split_confirmed({'02/01/2024': entries}, page, load_journal(path))
+    assert [item['entry']['index'] for item in confirmed] == [0]
+    assert [item['index'] for item in remaining['02/01/2024']] == [1, 2]
+    assert [w['row'] for w in web_rows['02/01/2024']] == ['2', '3']
+    assert [w['row'] for w in page['02/01/2024']] == ['1', '2', '3'] # The caller's rows are not changed
+
+def test_appending_keeps_earlier_runs(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    first = FillJournal(path)
+    first.record(entry(0, '09:00', '10:00', 'a'), '1', 'written')
+    first.close()
+    second = FillJournal(path, append=True)
+    second.record(entry(1, '10:00', '11:00', 'b'), '2', 'written')
+    second.close()
+    assert len(load_journal(path)) == 2
+    NULL_JOURNAL.record(entry(2, '11:00', '12:00', 'c'), '3', 'written') # Dry runs write nothing
@@ -0,0 +1,40 @@
+import threading
+
+import pytest
+
+from fill_progress import FillProgress, FillCancelled
+
+def test_reports_each_step():
+    snapshots = []
+    progress = FillProgress(snapshots.append)
+    assert progress.eta() is None
+    progress.set_phase('login')
+    progress.start(dates_total=2, entries_total=4)
+    progress.advance(entries=1)
+    progress.advance(dates=1, entries=1)
+    assert [snapshot['phase'] for snapshot in snapshots] == ['login', 'filling', 'filling', 'filling']
+    last = snapshots[-1]
+    assert (last['dates_done'], last['dates_total'], last['entries_done'], last['entries_total']) == (1, 2, 2, 4)
+    assert last['eta'] is not None and last['eta'] >= 0
+
+def test_cancellation_is_raised_at_the_next_check():
+    cancel = threading.Event()
+    progress = FillProgress(cancel_event=cancel)
+    progress.set_phase('filling')
+    progress.check_cancelled()
+    cancel.set()
+    with pytest.raises(FillCancelled, match='filling'):
+        progress.check_cancelled()
+    FillProgress().check_cancelled() # No event: never cancelled
+
+def test_by_dates_the_bar_follows_the_dates_until_the_entries_are_written():
+    snapshots = []
+    progress = FillProgress(snapshots.append)
+    progress.start(dates_total=4, entries_total=10, by_dates=True)
+    assert progress.eta() is None
+    progress.advance(dates=1)
+    assert snapshots[-1]['fraction'] == 0.25 and snapshots[-1]['eta'] is not None
+    progress.advance(dates=3)
+    progress.advance(entries=10)
+    assert snapshots[-1]['fraction'] == 1.0 and snapshots[-1]['eta'] == 0
+    assert FillProgress().fraction() == 0.0 # Nothing planned yet
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from filler_trace import Tracer, NULL_TRACER
+
+class FakeDriver:
+    def execute(self, driver_command, params=None):
+        return {'value': driver_command}
+
+def test_spans_count_the_webdriver_calls_made_inside_them(tmp_path):
+    path = tmp_path / 'trace.jsonl'
+    tracer = Tracer(str(path))
+    driver = FakeDriver()
+    tracer.attach(driver)
+    with tracer.span('login'):
+        driver.execute('get')
+        with tracer.span('field_fill', date='02/01/2024') as span:
+            driver.execute('executeScript')
+            driver.execute('executeScript')
+            span.set(rows=2)
+    with pytest.raises(RuntimeError):
+        with tracer.span('add_row'):
+            raise RuntimeError('no row')
+    tracer.close()
+
+    fill, login, add_row = tracer.spans
+    assert (login['span'], login['webdriver_calls'], login['parent']) == ('login', 3, None)
+    assert (fill['webdriver_calls'], fill['parent'], fill['rows'], fill['date']) == (2, login['id'], 2, '02/01/2024')
+    assert add_row['error'] == 'RuntimeError'
+    assert tracer.calls_by_command == {'get': 1, 'executeScript': 2}
+    assert [json.loads(line)['span'] for line in path.read_text(encoding='utf-8').splitlines()] == ['field_fill', 'login', 'add_row']
+    assert tracer.summary_lines()[-1] == 'Total WebDriver calls: 3'
+
+def test_null_tracer_accepts_the_same_calls():
+    NULL_TRACER.attach(FakeDriver())
+    with NULL_TRACER.span('login', user='x') as span:
+        span.set(ok=True)
@@ -0,0 +1,71 @@
+import re
+
+import pytest
+
+pytest.importorskip('selenium') # The waits import selenium's exceptions and WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from filler_waits import BrowserWaiter, CHECK_SCRIPT, OBSERVER_SCRIPT
+
+class ScriptDriver:
+    """Answers the waiter's scripts: the observer result (or an error) and a sequence of poll checks."""
+
+    def __init__(self, observed=None, checks=()):
+        self.observed = observed
+        self.checks = list(checks)
+        self.calls = []
+        self.script_timeouts = []
+
+    def set_script_timeout(self, seconds):
+        self.script_timeouts.append(seconds)
+
+    def execute_async_script(self, script, *args):
+        assert script == OBSERVER_SCRIPT
+        self.calls.append('observe')
+        if isinstance(self.observed, Exception):
+            raise self.observed
+        return self.observed
+
+    def execute_script(self, script, *args):
+        assert script == CHECK_SCRIPT
+        self.calls.append('check')
+        # The last answer repeats once the sequence is used up
+        return self.checks.pop(0) if len(self.checks) > 1 else self.checks[0]
+
+def test_an_observer_cut_short_by_a_page_load_falls_back_to_polling():
+    driver = ScriptDriver(observed=WebDriverException('javascript error: document unloaded while waiting for result'),
+                          checks=[{'met': False, 'element': None}, {'met': True, 'element': 'table'}])
+    waiter = BrowserWaiter(driver, poll_interval=0.01)
+    assert waiter.present('#tableDyn1', timeout=2, label='table load') == 'table'
+    assert driver.calls == ['observe', 'check', 'check']
+    assert driver.script_timeouts == [7]
+    assert [(timing['wait'], timing['ok']) for timing in waiter.timings] == [('table load', True)]
+
+def test_a_met_observer_does_not_poll_and_navigation_waits_skip_the_observer():
+    driver = ScriptDriver(observed={'met': True, 'element': None}, checks=[{'met': True, 'element': 'form'}])
+    waiter = BrowserWaiter(driver)
+    assert waiter.hidden('#popup') is True # No element for 'hidden'
+    assert waiter.present('#email', across_navigation=True) == 'form'
+    assert driver.calls == ['observe', 'check']
+
+@pytest.mark.parametrize('strategy', ['observer', 'poll'])
+def test_timeouts_raise_and_are_recorded_as_failed(strategy):
+    driver = ScriptDriver(observed={'met': False, 'element': None}, checks=[{'met': False, 'element': None}])
+    waiter = BrowserWaiter(driver, strategy=strategy, poll_interval=0.01)
+    with pytest.raises(TimeoutException, match="visible '#submit1'"):
+        waiter.visible('#submit1', timeout=0.05, label='show button')
+    assert [(timing['wait'], timing['ok']) for timing in waiter.timings] == [('show button', False)]
+    assert ('observe' in driver.calls) == (strategy == 'observer')
+
+def test_summary_has_one_line_per_wait_with_the_slowest_first():
+    waiter = BrowserWaiter(ScriptDriver())
+    waiter.timings = [{'wait': 'notes popup', 'seconds': 0.1, 'ok': True},
+                      {'wait': 'table load', 'seconds': 2.0, 'ok': True},
+                      {'wait': 'notes popup', 'seconds': 0.3, 'ok': False}]
+    table, notes = [re.sub(r'=\s+', '=', line).split() for line in waiter.summary_lines()]
+    assert table == ['table', 'load', 'count=1', 'total=2.00s', 'avg=2.000s', 'max=2.000s', 'timeouts=0']
+    assert notes == ['notes', 'popup', 'count=2', 'total=0.40s', 'avg=0.200s', 'max=0.300s', 'timeouts=1']
+
+def test_unknown_strategies_are_rejected():
+    with pytest.raises(ValueError, match='observer, poll'):
+        BrowserWaiter(ScriptDriver(), strategy='sleep')
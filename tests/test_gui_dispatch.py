@@ -0,0 +1,79 @@
+import threading
+
+from gui_dispatch import UiDispatcher
+
+class FakeRoot:
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay, func):
+        self.scheduled.append(func)
+
+    def run_pending(self):
+        pending, self.scheduled = self.scheduled, []
+        for func in pending:
+            func()
+
+class FakeText:
+    """Just enough of a Tk Text widget: whole lines, 'end-1c' and line.column deletes."""
+
+    def __init__(self):
+        self.content = ''
+        self.inserts = []
+
+    def insert(self, index, text, tag=None):
+        self.content += text
+        self.inserts.append((text, tag))
+
+    def delete(self, start, end):
+        if start == '1.0' and end != 'end':
+            line = int(end.split('.')[0])
+            self.content = ''.join(self.content.splitlines(keepends=True)[line - 1:])
+        else:
+            self.content = ''
+
+    def index(self, index):
+        return f"{self.content.count(chr(10)) + 1}.0"
+
+    def see(self, index):
+        pass
+
+def dispatcher(**kwargs):
+    root, text = FakeRoot(), FakeText()
+    ui = UiDispatcher(root, text, time_budget=10, **kwargs)
+    ui.start()
+    return ui, root, text
+
+def test_lines_with_the_same_tag_are_inserted_together_and_in_order():
+    ui, root, text = dispatcher()
+    calls = []
+    ui.log('a\n')
+    ui.log('b\n')
+    ui.log('c\n', 'danger')
+    ui.call(calls.append, 'called')
+    ui.log('d\n', 'danger')
+    root.run_pending()
+    assert text.inserts == [('a\nb\n', None), ('c\n', 'danger'), ('d\n', 'danger')]
+    assert calls == ['called']
+    ui.clear()
+    ui.log('e\n')
+    root.run_pending()
+    assert text.content == 'e\n'
+
+def test_the_log_is_capped():
+    ui, root, text = dispatcher(max_lines=3)
+    for number in range(10):
+        ui.log(f'{number}\n')
+    root.run_pending()
+    assert text.content == '8\n9\n' # Tk counts the empty line after the last newline
+
+def test_call_and_wait_runs_on_the_main_loop():
+    ui, root, text = dispatcher()
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(value=ui.call_and_wait(lambda: threading.current_thread().name)))
+    worker.start()
+    while worker.is_alive():
+        root.run_pending()
+        worker.join(0.01)
+    assert result['value'] == threading.main_thread().name
+    assert ui.call_and_wait(lambda: 5) == 5 # On the main thread it runs directly
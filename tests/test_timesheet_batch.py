@@ -0,0 +1,38 @@
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+import timesheet_batch
+from timesheet_filler import FILL_MODES
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_fill_mode_choices_come_from_the_filler():
+    assert timesheet_batch.FILL_MODES is FILL_MODES
+
+def test_importing_the_batch_runner_does_not_need_config(tmp_path):
+    # Run from a directory without config.py, as a batch using env:/file: credentials would
+    code = ("import sys; sys.path.insert(0, sys.argv[1]); import timesheet_batch, timesheet_filler; "
+            "print('config' in sys.modules)")
+    completed = subprocess.run([sys.executable, '-c', code, REPO], cwd=tmp_path, capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stdout.strip() == 'False'
+
+def test_env_and_file_credentials(tmp_path, monkeypatch):
+    monkeypatch.setenv('ALICE_USERNAME', 'alice')
+    monkeypatch.setenv('ALICE_PASSWORD', 'secret')
+    assert timesheet_batch.resolve_credentials('env:ALICE') == ('alice', 'secret')
+    path = tmp_path / 'bob.json'
+    path.write_text(json.dumps({'username': 'bob', 'password': 'pw'}), encoding='utf-8')
+    assert timesheet_batch.resolve_credentials(f'file:{path}') == ('bob', 'pw')
+    with pytest.raises(ValueError):
+        timesheet_batch.resolve_credentials('env:NOBODY')
+
+def test_load_manifest_defaults_credentials_to_config(tmp_path):
+    path = tmp_path / 'manifest.csv'
+    path.write_text("user,credentials,excel_file\nalice,,a.xlsx\nbob,env:BOB,b.xlsx\n", encoding='utf-8')
+    jobs = timesheet_batch.load_manifest(str(path))
+    assert [(job['user'], job['credentials']) for job in jobs] == [('alice', 'config'), ('bob', 'env:BOB')]
@@ -0,0 +1,170 @@
+import pandas as pd
+import pytest
+
+import timesheet_filler
+from timesheet_filler import (TABLE_SNAPSHOT_SCRIPT, DATE_ROWS_SCRIPT, ADD_ROWS_SCRIPT, BATCH_FILL_SCRIPT,
+                              TimesheetTableIndex, automate_timesheet, fill_entries_in_batch, record_batch)
+from timesheet_reconcile import WEB_ROWS_SCRIPT
+from timesheet_store import SHEET_COLUMNS, ExcelStore, normalize_entries
+
+class FakeTable:
+    """A driver whose execute_script answers the filler's scripts from an in-memory tableDyn1."""
+
+    def __init__(self, rows_by_date, fail_rows=()):
+        self.rows = {}
+        for date, count in rows_by_date.items():
+            for _ in range(count):
+                self._new_row(date)
+        self.fail_rows = set(fail_rows)
+        self.batches = []
+
+    def _new_row(self, date):
+        row = str(len(self.rows) + 1)
+        self.rows[row] = {'row': row, 'date': date, 'start_hh': '', 'start_mm': '', 'end_hh': '', 'end_mm': '', 'notes': '', 'jid': ''}
+        return row
+
+    def date_rows(self, date):
+        return [row for row, values in self.rows.items() if values['date'] == date]
+
+    def execute(self, driver_command, params=None):
+        return {'value': None}
+
+    def execute_script(self, script, *args):
+        if script == TABLE_SNAPSHOT_SCRIPT:
+            dates = dict.fromkeys(values['date'] for values in self.rows.values())
+            # The page lists a date's rows in table order, not by row_no
+            return {date: {'rows': self.date_rows(date)[::-1], 'row': f'tr {date}', 'add_button': f'add {date}'} for date in dates}
+        if script == WEB_ROWS_SCRIPT:
+            web_rows = {}
+            for values in self.rows.values():
+                web_rows.setdefault(values['date'], []).append({key: value for key, value in values.items() if key != 'date'})
+            return web_rows
+        if script == DATE_ROWS_SCRIPT:
+            return self.date_rows(args[0])
+        if script == ADD_ROWS_SCRIPT:
+            add_button, date, count = args
+            for _ in range(count):
+                self._new_row(date)
+            return self.date_rows(date)
+        if script == BATCH_FILL_SCRIPT:
+            payload, job_value, job_name = args
+            self.batches.append([entry['row'] for entry in payload])
+            failed = []
+            for entry in payload:
+                if entry['row'] in self.fail_rows:
+                    failed.append({'row': entry['row'], 'reason': 'missing notes textarea'})
+                    continue
+                self.rows[entry['row']].update({key: value for key, value in entry.items() if key != 'row'})
+            return failed
+        if 'tableDyn1' in script and 'submit1' in script:
+            return True # The attached browser already shows the timesheet
+        return None # scrollIntoView
+
+    def quit(self):
+        pass
+
+class FakeElement:
+    def click(self):
+        pass
+
+class FakeWaiter:
+    strategy = 'fake'
+
+    def __init__(self, driver, **options):
+        self.timings = []
+
+    def clickable(self, selector, **options):
+        return FakeElement()
+
+    def visible(self, selector, **options):
+        return FakeElement()
+
+    def summary_lines(self):
+        return []
+
+def write_sheet(path, rows):
+    ExcelStore(str(path)).replace(normalize_entries(pd.DataFrame(rows, columns=SHEET_COLUMNS)))
+
+def test_month_mode_moves_the_progress_as_each_date_is_prepared(tmp_path, monkeypatch):
+    pytest.importorskip('selenium') # automate_timesheet imports the selenium exceptions
+    path = tmp_path / 'sheet.xlsx'
+    write_sheet(path, [(2024, 1, 2, '09:00', '10:00', 1.0, 'a'), (2024, 1, 2, '11:00', '12:00', 1.0, 'b'),
+                       (2024, 1, 3, '09:00', '17:00', 8.0, 'c'), (2024, 1, 4, '08:00', '09:00', 1.0, 'd')])
+    driver = FakeTable({'2024-01-02': 1, '2024-01-03': 1, '2024-01-04': 1})
+    monkeypatch.setattr(timesheet_filler, 'create_driver', lambda **options: (driver, True))
+    monkeypatch.setattr(timesheet_filler, 'BrowserWaiter', FakeWaiter)
+    snapshots = []
+    result = automate_timesheet(str(path), 'user', 'secret', fill_mode='month', journal_path=str(tmp_path / 'journal.jsonl'),
+                                progress_callback=snapshots.append)
+
+    assert result['ok'] and result['entries_written'] == 4
+    assert len(driver.batches) == 1 # Still one script for the whole month
+    filling = [snapshot for snapshot in snapshots if snapshot['phase'] == 'filling']
+    # Every date moves the bar and the ETA is known after the first one, long before the entries are written
+    assert [snapshot['fraction'] for snapshot in filling] == pytest.approx([0, 1 / 3, 2 / 3, 1])
+    assert all(snapshot['entries_done'] == 0 for snapshot in filling)
+    assert all(snapshot['eta'] is not None for snapshot in filling[1:])
+    assert snapshots[-1]['phase'] == 'done' and snapshots[-1]['entries_done'] == 4
+
+def test_table_index_maps_each_date_to_its_sorted_rows():
+    driver = FakeTable({'2024-01-02': 1, '2024-01-03': 3})
+    driver._new_row('2024-01-02') # Row 5 belongs to the first date
+    index = TimesheetTableIndex(driver, waiter=None)
+    index.refresh()
+    assert index.dates() == ['2024-01-02', '2024-01-03']
+    assert index.rows_for('2024-01-02') == ['1', '5']
+    assert index.rows_for('2024-01-03') == ['2', '3', '4']
+    assert index.date_row('2024-01-03') == 'tr 2024-01-03'
+    assert index.has_date('2024-01-02') and not index.has_date('2024-01-05')
+    assert index.rows_for('2024-01-05') == [] and index.date_row('2024-01-05') is None
+
+def test_add_rows_keeps_the_index_in_sync():
+    pytest.importorskip('selenium') # add_rows raises selenium's NoSuchElementException for unknown dates
+    driver = FakeTable({'2024-01-02': 1, '2024-01-03': 1})
+    index = TimesheetTableIndex(driver, waiter=None)
+    index.refresh()
+    assert index.add_rows('2024-01-02', 2) == ['1', '3', '4']
+    assert index.rows_for('2024-01-02') == driver.date_rows('2024-01-02')
+    assert index.rows_for('2024-01-03') == ['2']
+    from selenium.common.exceptions import NoSuchElementException
+    with pytest.raises(NoSuchElementException):
+        index.add_rows('2024-01-05', 1)
+
+class FakeJournal:
+    def __init__(self):
+        self.records = []
+
+    def record(self, entry, row, status, reason=None):
+        self.records.append((row, status))
+
+def batch_entries(rows):
+    return [{'date': '2024-01-02', 'index': i, 'row': row, 'start_time': '09:05', 'end_time': f'1{i}:30', 'notes': f'note {i}'}
+            for i, row in enumerate(rows)]
+
+def test_batch_fill_writes_every_row_with_one_script():
+    driver = FakeTable({'2024-01-02': 2})
+    assert fill_entries_in_batch(driver, None, batch_entries(['1', '2'])) == []
+    assert driver.batches == [['1', '2']]
+    assert driver.rows['2'] == dict(driver.rows['2'], start_hh='09', start_mm='05', end_hh='11', end_mm='30', notes='note 1')
+    assert fill_entries_in_batch(driver, None, []) == []
+    assert len(driver.batches) == 1 # Nothing to fill: no script at all
+
+def test_rows_the_batch_script_misses_fall_back_to_the_per_field_path(monkeypatch):
+    pytest.importorskip('selenium') # fill_entry_with_fallback catches the selenium exceptions
+    from selenium.common.exceptions import TimeoutException
+    driver = FakeTable({'2024-01-02': 3}, fail_rows={'2', '3'})
+    filled_by_fields = []
+    def fill_row_fields(driver, waiter, row, start_time, end_time, notes, job_value=None, job_name=None, tracer=None):
+        filled_by_fields.append(row)
+        if row == '3':
+            raise TimeoutException('notes popup did not open')
+    monkeypatch.setattr(timesheet_filler, 'fill_row_fields', fill_row_fields)
+    entries = batch_entries(['1', '2', '3'])
+
+    failures = fill_entries_in_batch(driver, None, entries, job_value='7', job_name='Job')
+    assert driver.batches == [['1', '2', '3']]
+    assert filled_by_fields == ['2', '3'] # Only the rows the script reported
+    assert failures == [entries[2]]
+    journal = FakeJournal()
+    record_batch(journal, entries, failures)
+    assert journal.records == [('1', 'written'), ('2', 'written'), ('3', 'failed')]
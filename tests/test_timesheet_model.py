@@ -0,0 +1,68 @@
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from timesheet_model import TimesheetModel
+from timesheet_store import SHEET_COLUMNS, ExcelStore, normalize_entries
+
+def entries(rows):
+    return pd.DataFrame(rows, columns=SHEET_COLUMNS)
+
+def write_sheet(path, rows):
+    ExcelStore(str(path)).replace(normalize_entries(entries(rows)))
+
+def test_append_keeps_the_totals_of_a_full_reload(tmp_path):
+    path = tmp_path / 'sheet.xlsx'
+    write_sheet(path, [(2024, 1, 2, '09:00', '17:00', 8.0, 'a'), (2024, 2, 1, '09:00', '10:00', 1.0, 'b')])
+    model = TimesheetModel(str(path))
+    model.append(entries([(2024, 1, 2, '18:00', '19:30', 1.5, 'c'), (2024, 1, 3, '22:00', '01:00', 3.0, 'd')]))
+    assert not model.is_stale()
+    reloaded = TimesheetModel(str(path))
+    assert model.total_hours() == reloaded.total_hours() == 13.5
+    assert model.hours_by_day == reloaded.hours_by_day
+    assert model.month_hours(2024, 1) == 12.5
+    assert model.entries().to_dict('records') == reloaded.entries().to_dict('records')
+
+def test_a_file_that_fails_to_load_is_read_once_per_change(tmp_path):
+    path = tmp_path / 'sheet.xlsx'
+    path.write_bytes(b'not a workbook')
+    model = TimesheetModel(str(path))
+    reads = []
+    read = model.store.read
+    model.store.read = lambda *args: reads.append(args) or read(*args)
+    with pytest.raises(Exception):
+        model.refresh()
+    assert not model.is_stale()
+    with pytest.raises(Exception):
+        model.total_hours()
+    assert len(reads) == 1
+
+    write_sheet(path, [(2024, 1, 2, '09:00', '17:00', 8.0, 'a')])
+    os.utime(path, ns=(1, 1)) # Make sure the signature changes even on coarse clocks
+    assert model.is_stale()
+    assert model.total_hours() == 8.0
+    assert len(reads) == 2
+    assert model.error is None
+
+def test_cached_totals_never_read_the_file(tmp_path):
+    path = tmp_path / 'sheet.xlsx'
+    write_sheet(path, [(2024, 1, 2, '09:00', '17:00', 8.0, 'a'), (2024, 2, 1, '09:00', '10:00', 1.0, 'b')])
+    model = TimesheetModel(str(path))
+    reads = []
+    read = model.store.read
+    model.store.read = lambda *args: reads.append(args) or read(*args)
+    assert model.cached_totals(2024, 1) is None
+    assert reads == []
+
+    model.refresh()
+    assert model.cached_totals(2024, 1) == (9.0, 8.0)
+    assert model.cached_totals(2024, 3) == (9.0, 0.0)
+    with model.lock: # Held by another thread in the GUI; the answer must not wait for it
+        result = []
+        worker = threading.Thread(target=lambda: result.append(model.cached_totals(2024, 1)))
+        worker.start()
+        worker.join(5)
+        assert result == [None]
+    assert len(reads) == 1
@@ -0,0 +1,56 @@
+import random
+import datetime
+
+import pandas as pd
+import pytest
+
+from timesheet_overlaps import overlap_frame, find_overlap_groups
+from timesheet_store import SHEET_COLUMNS
+
+def sheet(rows):
+    return pd.DataFrame([(2024, 1, day, start, end, 0, '') for day, start, end in rows], columns=SHEET_COLUMNS)
+
+def test_entries_past_midnight_overlap_the_next_day():
+    df = sheet([(2, '22:00', '01:00'), (3, '00:30', '02:00'), (3, '09:00', '10:00'), (3, '10:00', '11:00')])
+    assert find_overlap_groups(df) == [[0, 1]]
+
+def test_groups_reuse_a_computed_frame():
+    df = sheet([(2, '23:00', '00:30'), (2, '09:00', '10:00'), (3, '00:15', '01:00'), (3, '09:30', '10:30'), (3, '10:00', '11:00')])
+    frame = overlap_frame(df)
+    assert find_overlap_groups(df, frame) == find_overlap_groups(df) == [[0, 2], [3, 4]]
+
+def test_invalid_rows_are_left_out():
+    df = sheet([(2, '09:00', '10:00'), (2, 'soon', '10:00'), (32, '09:00', '10:00'), (2, '09:30', '11:00')])
+    frame = overlap_frame(df)
+    assert list(frame.index) == [0, 3]
+    assert find_overlap_groups(df) == [[0, 3]]
+
+@pytest.mark.parametrize('seed', range(50))
+def test_matches_checking_every_pair(seed):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(rng.randint(1, 30)):
+        start = rng.randrange(0, 24 * 4) * 15
+        end = (start + rng.randrange(1, 12) * 15) % (24 * 60)
+        rows.append((rng.randint(1, 4), f'{start // 60:02d}:{start % 60:02d}', f'{end // 60:02d}:{end % 60:02d}'))
+    df = sheet(rows)
+    frame = overlap_frame(df)
+    # Reference spans from the raw rows, not from the frame: an end before the start is on the next day
+    spans = {}
+    for label, (day, start, end) in enumerate(rows):
+        starts_at = datetime.datetime(2024, 1, day, *map(int, start.split(':')))
+        ends_at = datetime.datetime(2024, 1, day, *map(int, end.split(':')))
+        spans[label] = (starts_at, ends_at if ends_at > starts_at else ends_at + datetime.timedelta(days=1))
+    overlaps = {label: any(max(s, spans[other][0]) < min(e, spans[other][1]) for other in spans if other != label)
+                for label, (s, e) in spans.items()}
+    assert frame['is_overlap'].to_dict() == overlaps
+    # The groups are the sets of entries chained together by overlaps
+    components = {label: {label} for label in spans}
+    for label in spans:
+        for other in spans:
+            if label != other and max(spans[label][0], spans[other][0]) < min(spans[label][1], spans[other][1]):
+                merged = components[label] | components[other]
+                for member in merged:
+                    components[member] = merged
+    expected = {frozenset(component) for component in components.values() if len(component) > 1}
+    assert {frozenset(group) for group in find_overlap_groups(df)} == expected
@@ -0,0 +1,55 @@
+from timesheet_reconcile import build_plan, plan_counts, format_plan, normalize_hhmm
+
+def entry(index, start, end, notes):
+    return {'index': index, 'start_time': start, 'end_time': end, 'notes': notes}
+
+def web(row, start=None, end=None, notes='', jid=''):
+    return {'row': str(row), 'start_time': start, 'end_time': end, 'notes': notes, 'jid': jid}
+
+def apply_plan(plan, web_rows_by_date):
+    """The page after the plan is carried out (added rows get new row numbers)."""
+    pages = {date: {w['row']: dict(w) for w in rows} for date, rows in web_rows_by_date.items()}
+    next_row = 1 + max((int(w['row']) for rows in web_rows_by_date.values() for w in rows), default=0)
+    for item in plan:
+        if item['action'] in ('fill', 'patch', 'add'):
+            row = item['row']
+            if row is None:
+                row, next_row = str(next_row), next_row + 1
+            entry = item['entry']
+            pages.setdefault(item['date'], {})[row] = web(row, entry['start_time'], entry['end_time'], entry['notes'])
+    return {date: sorted(rows.values(), key=lambda w: int(w['row'])) for date, rows in pages.items()}
+
+ENTRIES = {'02/01/2024': [entry(0, '09:00', '10:00', 'Standup'), entry(1, '10:00', '12:30', 'Design'),
+                          entry(2, '13:00', '14:00', 'Review')],
+           '03/01/2024': [entry(3, '09:00', '17:00', 'Build')]}
+WEB = {'02/01/2024': [web(1, '09:00', '10:00', 'Standup'), web(2, '10:00', '12:00', 'Design'), web(3),
+                      web(4, '18:00', '19:00', 'Old')],
+       '03/01/2024': []}
+
+def test_plan_actions():
+    plan = build_plan(ENTRIES, WEB)
+    assert [(item['action'], item['row']) for item in plan] == [
+        ('unchanged', '1'), ('patch', '2'), ('fill', '3'), ('stale', '4'), ('add', None)]
+    assert plan_counts(plan) == {'unchanged': 1, 'fill': 1, 'patch': 1, 'add': 1, 'stale': 1}
+    assert format_plan(plan)[-1] == "Plan: 1 unchanged, 1 fill, 1 patch, 1 add, 1 stale"
+
+def test_a_second_run_changes_nothing():
+    page = apply_plan(build_plan(ENTRIES, WEB), WEB)
+    plan = build_plan(ENTRIES, page)
+    assert {item['action'] for item in plan} == {'unchanged', 'stale'}
+    assert apply_plan(plan, page) == page
+
+def test_without_reconciling_every_entry_is_written_in_row_order():
+    plan = build_plan(ENTRIES, WEB, incremental=False)
+    assert [(item['action'], item['row'], item['entry']['index']) for item in plan] == [
+        ('fill', '1', 0), ('fill', '2', 1), ('fill', '3', 2), ('add', None, 3)]
+
+def test_job_value_must_match_too():
+    rows = {'02/01/2024': [web(1, '09:00', '10:00', 'Standup', jid='7')]}
+    entries = {'02/01/2024': [entry(0, '09:00', '10:00', 'Standup')]}
+    assert build_plan(entries, rows, job_value=7)[0]['action'] == 'unchanged'
+    assert build_plan(entries, rows, job_value=8)[0]['action'] == 'patch'
+
+def test_normalize_hhmm():
+    assert normalize_hhmm('9', '5') == '09:05'
+    assert normalize_hhmm('', '00') is None
@@ -0,0 +1,67 @@
+import datetime
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from timesheet_store import (SHEET_COLUMNS, YEAR, MONTH, DAY, START, NOTES, ExcelStore, SQLiteStore, ParquetStore,
+                             normalize_entries, sort_entries, copy_entries)
+
+def entries(rows):
+    return pd.DataFrame(rows, columns=SHEET_COLUMNS)
+
+MIXED = entries([
+    (2024, 1, 3, '09:00', '10:00', 1.0, 'Standup'),
+    (2024, 1, 2, datetime.time(13, 0), '15:30', 2.5, 42),
+    (2024, 2, 1, '08:00', '08:30', 0.5, 3.5),
+    (2024, 2, 1, '10:00', '11:00', 1.0, None),
+])
+
+def test_notes_are_text():
+    assert list(normalize_entries(MIXED)[NOTES]) == ['Standup', '42', '3.5', None]
+
+@pytest.mark.parametrize('store_class, name', [(ExcelStore, 'sheet.xlsx'), (SQLiteStore, 'sheet.sqlite'),
+                                               (ParquetStore, 'sheet.parquet')])
+def test_round_trip_with_mixed_notes(tmp_path, store_class, name):
+    store = store_class(str(tmp_path / name))
+    store.replace(sort_entries(normalize_entries(MIXED)))
+    expected = sort_entries(normalize_entries(MIXED))
+    assert normalize_entries(store.read()).to_dict('records') == expected.to_dict('records')
+    store.append(entries([(2024, 1, 2, '10:00', '11:00', 1.0, 7)]))
+    january = normalize_entries(store.read(2024, 1))
+    assert list(january[NOTES]) == ['7', '42', 'Standup']
+
+def test_excel_append_inserts_rows_in_sorted_order(tmp_path):
+    path = str(tmp_path / 'sheet.xlsx')
+    existing = entries([(2024, 1, day, '09:00', '10:00', 1.0, f'day {day}') for day in (2, 4, 6)])
+    ExcelStore(path).replace(normalize_entries(existing))
+    added = entries([(2024, 1, 5, '09:00', '10:00', 1.0, 'b'), (2024, 1, 1, '09:00', '10:00', 1.0, 'a'),
+                     (2024, 1, 4, '08:00', '09:00', 1.0, 'c'), (2024, 1, 4, '09:00', '09:30', 1.0, 'd'),
+                     (2024, 2, 1, '09:00', '10:00', 1.0, 'e')])
+    ExcelStore(path).append(added)
+    result = normalize_entries(ExcelStore(path).read())
+    expected = sort_entries(normalize_entries(pd.concat([existing, added], ignore_index=True)))
+    assert result.to_dict('records') == expected.to_dict('records')
+
+def test_copy_entries_between_stores(tmp_path):
+    source, destination = str(tmp_path / 'sheet.xlsx'), str(tmp_path / 'sheet.parquet')
+    ExcelStore(source).replace(normalize_entries(MIXED))
+    assert copy_entries(source, destination) == len(MIXED)
+    result = normalize_entries(ParquetStore(destination).read())
+    assert sorted(result[[YEAR, MONTH, DAY, START]].itertuples(index=False, name=None)) == \
+        sorted(normalize_entries(MIXED)[[YEAR, MONTH, DAY, START]].itertuples(index=False, name=None))
+
+def test_excel_append_leaves_existing_cells_and_formatting(tmp_path):
+    path = str(tmp_path / 'sheet.xlsx')
+    ExcelStore(path).replace(normalize_entries(entries([(2024, 1, 2, '09:00', '10:00', 1.0, 'a')])))
+    workbook = openpyxl.load_workbook(path)
+    workbook.active['F2'].number_format = '0.00'
+    workbook.active['G2'].font = openpyxl.styles.Font(italic=True)
+    workbook.create_sheet('Notes')['A1'] = 'keep me'
+    workbook.save(path)
+    ExcelStore(path).append(entries([(2024, 1, 1, '09:00', '10:00', 1.0, 'b'), (2024, 1, 3, '09:00', '10:00', 1.0, 'c')]))
+    sheet = openpyxl.load_workbook(path).active
+    assert [sheet.cell(row=row, column=7).value for row in (2, 3, 4)] == ['b', 'a', 'c']
+    assert sheet['F3'].number_format == '0.00' and sheet['G3'].font.italic
+    assert sheet['F4'].number_format == '0.00' # New rows take the formatting of the row above
+    assert openpyxl.load_workbook(path)['Notes']['A1'].value == 'keep me'
@@ -0,0 +1,38 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from timesheet_times import (time_to_minutes, time_to_hhmm, hours_between, hours_to_float,
+                             total_hours, normalize_time, _value_to_minutes)
+
+def test_mixed_column_parses_like_each_value():
+    values = ['09:00', '9:30', '17:45:00', datetime.time(8, 15), pd.Timestamp('2024-01-02 13:05'),
+              0.5, datetime.timedelta(hours=7), None, np.nan, '', 'abc', '25:00', 1.5, True, '09:00']
+    expected = [_value_to_minutes(value) if not pd.isna(value) else np.nan for value in values]
+    np.testing.assert_array_equal(time_to_minutes(values), np.array(expected, dtype=float))
+    assert list(time_to_minutes(values)[:7]) == [540, 570, 1065, 495, 785, 720, 420]
+    assert np.isnan(time_to_minutes(values)[7:14]).all()
+
+def test_every_minute_agrees_with_strptime():
+    texts = [f'{minute // 60}:{minute % 60:02d}' for minute in range(24 * 60)]
+    parsed = [datetime.datetime.strptime(text, '%H:%M') for text in texts]
+    assert list(time_to_minutes(texts)) == [value.hour * 60 + value.minute for value in parsed]
+    assert list(time_to_hhmm(texts)) == [value.strftime('%H:%M') for value in parsed]
+
+def test_normalize_time():
+    assert normalize_time('9:00') == '09:00'
+    assert normalize_time('09:00:00') == '09:00'
+    assert normalize_time(datetime.time(7, 5)) == '07:05'
+    assert normalize_time('later') is None
+
+def test_hours_between_wraps_past_midnight():
+    hours = hours_between(['09:00', '22:00', '10:00', 'x'], ['17:30', '02:00', '10:00', '11:00'])
+    assert list(hours[:3]) == [8.5, 4.0, 0.0]
+    assert np.isnan(hours[3])
+
+def test_hours_to_float():
+    hours = hours_to_float([8, '7.5', datetime.time(1, 30), None, 'n/a'])
+    assert list(hours[:3]) == [8.0, 7.5, 1.5]
+    assert np.isnan(hours[3:]).all()
+    assert total_hours([8, '7.5', datetime.time(1, 30), None, 'n/a']) == 17.0
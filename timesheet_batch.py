@@ -0,0 +1,126 @@
+# Month-end batch runner: fills the timesheets of many users in parallel.
+# Each manifest entry runs automate_timesheet in its own worker process with a headless
+# Chrome, writing its output to a per-user log file. A summary table is printed at the end.
+#
+# Manifest (CSV with a header row, or a JSON list of objects) columns:
+#   user         - label used for the log file and the summary
+#   credentials  - where the login comes from:
+#                    config          username/password from config.py
+#                    env:PREFIX      environment variables PREFIX_USERNAME and PREFIX_PASSWORD
+#                    file:path.json  a JSON file with "username" and "password" keys
+#   excel_file   - path to the user's Excel timesheet
+#   job_value    - optional job assignment value
+#   job_name     - optional job assignment name
+
+import os
+import csv
+import json
+import time
+import datetime
+import argparse
+import traceback
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from timesheet_filler import FILL_MODES
+
+MANIFEST_FIELDS = ['user', 'credentials', 'excel_file', 'job_value', 'job_name']
+
+def load_manifest(manifest_path):
+    if manifest_path.lower().endswith('.json'):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            jobs = json.load(f)
+    else:
+        with open(manifest_path, 'r', encoding='utf-8-sig', newline='') as f:
+            jobs = list(csv.DictReader(f))
+    cleaned_jobs = []
+    for line_no, job in enumerate(jobs, start=1):
+        job = {field: (str(job.get(field) or '').strip()) for field in MANIFEST_FIELDS}
+        if not job['user'] or not job['excel_file']:
+            raise ValueError(f"Manifest entry {line_no} needs at least 'user' and 'excel_file'.")
+        job['credentials'] = job['credentials'] or 'config'
+        cleaned_jobs.append(job)
+    return cleaned_jobs
+
+def resolve_credentials(source):
+    """Return (username, password) for a manifest credentials source."""
+    if source == 'config':
+        import config
+        return config.username, config.password
+    if source.startswith('env:'):
+        prefix = source[len('env:'):]
+        try:
+            return os.environ[f"{prefix}_USERNAME"], os.environ[f"{prefix}_PASSWORD"]
+        except KeyError as e:
+            raise ValueError(f"Environment variable {e.args[0]} is not set.")
+    if source.startswith('file:'):
+        with open(source[len('file:'):], 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data['username'], data['password']
+    raise ValueError(f"Unknown credentials source '{source}'. Use config, env:PREFIX or file:path.json.")
+
+def _safe_file_name(text):
+    return ''.join(c if c.isalnum() or c in '-_.' else '_' for c in text)
+
+def run_user_job(job, log_dir, options):
+    """Worker entry point: fill one user's timesheet with stdout/stderr sent to the user's log file."""
+    started = time.perf_counter()
+    log_path = os.path.join(log_dir, f"{_safe_file_name(job['user'])}.log")
+    summary = {'user': job['user'], 'log': log_path, 'ok': False, 'entries_written': 0, 'entries_failed': 0, 'error': None}
+    with open(log_path, 'w', encoding='utf-8') as log_file, contextlib.redirect_stdout(log_file), contextlib.redirect_stderr(log_file):
+        try:
+            from timesheet_filler import automate_timesheet
+            username, password = resolve_credentials(job['credentials'])
+            result = automate_timesheet(job['excel_file'], username, password, headless=True, close_browser=True,
+                                        job_value=job['job_value'] or None, job_name=job['job_name'] or None, **options)
+            summary.update({key: result[key] for key in ('ok', 'entries_written', 'entries_failed', 'error')})
+        except Exception as e:
+            traceback.print_exc()
+            summary['error'] = str(e)
+    summary['seconds'] = round(time.perf_counter() - started, 1)
+    return summary
+
+def run_batch(jobs, workers=2, log_dir=None, **options):
+    """Run every manifest job with at most `workers` browsers at a time and return the per-user summaries."""
+    log_dir = log_dir or os.path.join('batch_logs', datetime.datetime.now().strftime('%Y%m%d_%H%M%S'))
+    os.makedirs(log_dir, exist_ok=True)
+    summaries = []
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(run_user_job, job, log_dir, options): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e: # The worker process itself died
+                summary = {'user': job['user'], 'log': '', 'ok': False, 'entries_written': 0, 'entries_failed': 0, 'error': str(e), 'seconds': 0}
+            status = "OK" if summary['ok'] else "FAILED"
+            print(f"[{status}] {summary['user']}: {summary['entries_written']} entries written in {summary['seconds']}s")
+            summaries.append(summary)
+    return sorted(summaries, key=lambda s: s['user'])
+
+def print_summary(summaries):
+    print("\n--- Batch Summary ---")
+    print(f"{'User':<20} {'Status':<8} {'Written':>8} {'Failed':>7} {'Seconds':>8}  Log / Error")
+    for summary in summaries:
+        status = "OK" if summary['ok'] else "FAILED"
+        detail = summary['error'] if summary['error'] else summary['log']
+        print(f"{summary['user']:<20} {status:<8} {summary['entries_written']:>8} {summary['entries_failed']:>7} {summary['seconds']:>8}  {detail}")
+    succeeded = sum(1 for summary in summaries if summary['ok'])
+    print(f"{succeeded} of {len(summaries)} users completed successfully.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Fill the timesheets of several users in parallel.')
+    parser.add_argument('manifest', type=str, help='CSV or JSON manifest of users (see batch_manifest_example.csv).')
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1), help='Maximum number of browsers running at once.')
+    parser.add_argument('--log-dir', type=str, help='Directory for the per-user logs (default: batch_logs/<timestamp>).')
+    parser.add_argument('--dry-run', action='store_true', help='Run without making any changes.')
+    parser.add_argument('--plan', action='store_true', help='Only log the diff between Excel and the web timesheet for each user.')
+    parser.add_argument('--fill-mode', choices=FILL_MODES, default='month', help='Fill mode passed to every run.')
+    parser.add_argument('--resume', action='store_true', help="Skip entries each user's journal recorded as written and the page still shows.")
+    args = parser.parse_args()
+
+    jobs = load_manifest(args.manifest)
+    print(f"Running {len(jobs)} users with up to {args.workers} browsers in parallel...")
+    summaries = run_batch(jobs, workers=args.workers, log_dir=args.log_dir, dry_run=args.dry_run, plan_only=args.plan, fill_mode=args.fill_mode,
+                          resume=args.resume)
+    print_summary(summaries)
+    raise SystemExit(0 if all(summary['ok'] for summary in summaries) else 1)
@@ -1,288 +1,590 @@
-import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+# Selenium and pandas are imported by the functions that drive the browser and read the
+# timesheet, so parsing the command line (and importing FILL_MODES) does not load them.
+# config.py is only read when the filler runs from the command line; callers of
+# automate_timesheet (the GUI, timesheet_batch.py) pass the credentials themselves.
 import time
 import getpass # For securely getting password input
 from datetime import datetime
 import traceback
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
-import config  # Import the config file
 import argparse # Import argparse
-
-def automate_timesheet(excel_file_path, username, password, dry_run=False, headless=False, job_value=None, job_name=None):
+from filler_waits import BrowserWaiter, WAIT_STRATEGIES, by_id
+from filler_trace import Tracer, NULL_TRACER
+from browser_session import create_driver, DEFAULT_DEBUG_PORT, DEFAULT_SESSION_DIR
+from fill_progress import FillProgress, FillCancelled
+
+TIMESHEET_URL = "https://saas.webtime.co.il/wt_periodic.adp"
+
+# Reads the whole tableDyn1 structure in one round-trip: for every date the
+# row_no values of its rows, the first row element and its 'Add Row' button.
+TABLE_SNAPSHOT_SCRIPT = """
+var table = document.getElementById('tableDyn1');
+var snapshot = {};
+if (!table) { return snapshot; }
+var dayInputs = table.querySelectorAll("input[id^='day_']");
+for (var i = 0; i < dayInputs.length; i++) {
+    var row = dayInputs[i].closest('tr[row_no]');
+    if (!row) { continue; }
+    var date = dayInputs[i].value;
+    var entry = snapshot[date];
+    if (!entry) {
+        entry = snapshot[date] = {rows: [], row: row, add_button: null};
+    }
+    var rowNo = row.getAttribute('row_no');
+    if (entry.rows.indexOf(rowNo) === -1) { entry.rows.push(rowNo); }
+    if (!entry.add_button) {
+        entry.add_button = row.querySelector("img[onclick*='addRow(this,true)']");
+    }
+}
+return snapshot;
+"""
+
+# Returns the row_no values currently present for a single date.
+DATE_ROWS_SCRIPT = """
+var date = arguments[0];
+var rows = [];
+var dayInputs = document.querySelectorAll("#tableDyn1 input[id^='day_']");
+for (var i = 0; i < dayInputs.length; i++) {
+    if (dayInputs[i].value !== date) { continue; }
+    var row = dayInputs[i].closest('tr[row_no]');
+    if (row && rows.indexOf(row.getAttribute('row_no')) === -1) { rows.push(row.getAttribute('row_no')); }
+}
+return rows;
+"""
+
+# Clicks 'Add Row' up to arguments[2] times, stopping early if the page adds
+# rows asynchronously, and returns the row_no values for the date afterwards.
+ADD_ROWS_SCRIPT = """
+var button = arguments[0], date = arguments[1], count = arguments[2];
+function rowsForDate() {
+    var rows = [];
+    var dayInputs = document.querySelectorAll("#tableDyn1 input[id^='day_']");
+    for (var i = 0; i < dayInputs.length; i++) {
+        if (dayInputs[i].value !== date) { continue; }
+        var row = dayInputs[i].closest('tr[row_no]');
+        if (row && rows.indexOf(row.getAttribute('row_no')) === -1) { rows.push(row.getAttribute('row_no')); }
+    }
+    return rows;
+}
+var rows = rowsForDate();
+for (var n = 0; n < count; n++) {
+    var before = rows.length;
+    button.click();
+    rows = rowsForDate();
+    if (rows.length <= before) { break; }
+}
+return rows;
+"""
+
+class TimesheetTableIndex:
+    """In-memory index of the timesheet table: date -> sorted row_no list and 'Add Row' button."""
+
+    def __init__(self, driver, waiter):
+        self.driver = driver
+        self.waiter = waiter
+        self._rows = {}
+        self._date_rows = {}
+        self._add_buttons = {}
+
+    def refresh(self):
+        snapshot = self.driver.execute_script(TABLE_SNAPSHOT_SCRIPT) or {}
+        self._rows = {}
+        self._date_rows = {}
+        self._add_buttons = {}
+        for date, entry in snapshot.items():
+            self._rows[date] = sorted(entry['rows'], key=int)
+            self._date_rows[date] = entry['row']
+            self._add_buttons[date] = entry['add_button']
+
+    def dates(self):
+        return list(self._rows.keys())
+
+    def has_date(self, date):
+        return date in self._rows
+
+    def rows_for(self, date):
+        return list(self._rows.get(date, []))
+
+    def date_row(self, date):
+        return self._date_rows.get(date)
+
+    def add_rows(self, date, count, timeout=20):
+        """Click 'Add Row' for a date until `count` new rows exist, keeping the index in sync."""
+        from selenium.common.exceptions import NoSuchElementException
+        add_button = self._add_buttons.get(date)
+        if add_button is None:
+            raise NoSuchElementException(f"No 'Add Row' button found for date {date}")
+        target = len(self._rows.get(date, [])) + count
+        while len(self._rows.get(date, [])) < target:
+            before = len(self._rows.get(date, []))
+            rows = self.driver.execute_script(ADD_ROWS_SCRIPT, add_button, date, target - before)
+            if len(rows) <= before:
+                # The page adds rows asynchronously; wait in the browser for the next one.
+                try:
+                    self.waiter.row_count(date, before + 1, timeout=timeout, label='add row')
+                finally:
+                    # Re-read the rows even on timeout so the index matches the page.
+                    self._rows[date] = sorted(self.driver.execute_script(DATE_ROWS_SCRIPT, date), key=int)
+            else:
+                self._rows[date] = sorted(rows, key=int)
+        return self.rows_for(date)
+
+FILL_MODES = ('month', 'day', 'fields')
+
+# Sets start/end/notes/job values for many rows at once and fires the page's
+# input/change/blur handlers. Rows whose fields are not all present in the DOM
+# are left untouched and reported back for the per-field WebDriver path.
+BATCH_FILL_SCRIPT = """
+var entries = arguments[0], jobValue = arguments[1], jobName = arguments[2];
+var failed = [];
+function fire(el, type) { el.dispatchEvent(new Event(type, {bubbles: true})); }
+function setValue(el, value) {
+    el.value = value;
+    fire(el, 'input');
+    fire(el, 'change');
+    fire(el, 'blur');
+}
+function byName(name) {
+    var els = document.getElementsByName(name);
+    return els.length ? els[0] : null;
+}
+for (var i = 0; i < entries.length; i++) {
+    var entry = entries[i], row = entry.row;
+    var targets = [], missing = [];
+    var timeFields = [
+        ['time_start_HH_' + row, entry.start_hh], ['time_start_MM_' + row, entry.start_mm],
+        ['time_end_HH_' + row, entry.end_hh], ['time_end_MM_' + row, entry.end_mm]
+    ];
+    for (var f = 0; f < timeFields.length; f++) {
+        var el = document.getElementById(timeFields[f][0]);
+        if (el) { targets.push([el, timeFields[f][1]]); } else { missing.push(timeFields[f][0]); }
+    }
+    var popup = document.getElementById('detailsDiv_CMMPAN_' + row + '_1');
+    var notes = popup ? popup.querySelector('textarea') : null;
+    if (!notes) { notes = document.getElementById('work_comments_' + row + '_1'); }
+    if (notes) { targets.push([notes, entry.notes]); } else { missing.push('notes textarea'); }
+    if (jobValue && jobName) {
+        var jid = byName('jid_' + row), assignment = byName('assignment_name_' + row);
+        if (jid) { targets.push([jid, jobValue]); } else { missing.push('jid_' + row); }
+        if (assignment) { targets.push([assignment, jobName]); } else { missing.push('assignment_name_' + row); }
+    }
+    if (missing.length) {
+        failed.push({row: row, reason: 'missing ' + missing.join(', ')});
+        continue;
+    }
+    try {
+        for (var t = 0; t < targets.length; t++) { setValue(targets[t][0], targets[t][1]); }
+    } catch (e) {
+        failed.push({row: row, reason: String(e)});
+    }
+}
+return failed;
+"""
+
+def split_time(time_value):
+    """Split a normalized 'HH:MM' time into (hour, minute) strings."""
+    hour, minute = time_value.split(':')
+    return hour, minute
+
+def fill_entries_in_batch(driver, waiter, entries, job_value=None, job_name=None, tracer=NULL_TRACER):
+    """Fill many rows with one injected script; rows the script cannot fill go through the per-field path."""
+    if not entries:
+        return []
+    payload = []
+    for entry in entries:
+        start_hour, start_minute = split_time(entry['start_time'])
+        end_hour, end_minute = split_time(entry['end_time'])
+        payload.append({'row': entry['row'], 'start_hh': start_hour, 'start_mm': start_minute,
+                        'end_hh': end_hour, 'end_mm': end_minute, 'notes': str(entry['notes'])})
+    with tracer.span('field fill', mode='batch', entries=len(entries)) as span:
+        failed = driver.execute_script(BATCH_FILL_SCRIPT, payload, job_value or '', job_name or '') or []
+        span.set(fallback=len(failed))
+    print(f"    Batch filled {len(entries) - len(failed)} of {len(entries)} entries.")
+
+    entries_by_row = {entry['row']: entry for entry in entries}
+    fallback_failures = []
+    for failure in failed:
+        entry = entries_by_row[failure['row']]
+        print(f"    Row {failure['row']} ({entry['date']}) could not be batch filled ({failure['reason']}); using per-field fill.")
+        if not fill_entry_with_fallback(driver, waiter, entry, job_value, job_name, tracer):
+            fallback_failures.append(entry)
+    return fallback_failures
+
+def fill_entry_with_fallback(driver, waiter, entry, job_value=None, job_name=None, tracer=NULL_TRACER):
+    """Fill one entry through the per-field path, logging instead of raising on failure."""
+    from selenium.common.exceptions import NoSuchElementException, TimeoutException
+    try:
+        with tracer.span('field fill', mode='fields', row=entry['row'], date=entry['date']):
+            fill_row_fields(driver, waiter, entry['row'], entry['start_time'], entry['end_time'], entry['notes'], job_value, job_name, tracer)
+        return True
+    except (NoSuchElementException, TimeoutException) as e:
+        print(f"    Error filling fields for row {entry['row']}: {e}")
+        traceback.print_exc()
+        return False
+
+def fill_row_fields(driver, waiter, current_row_suffix, start_time, end_time, notes, job_value=None, job_name=None, tracer=NULL_TRACER):
+    """Fill a single row field by field through WebDriver (the slow but most compatible path)."""
+    from selenium.webdriver.common.by import By
+    from selenium.common.exceptions import NoSuchElementException, TimeoutException
+    # Construct dynamic IDs
+    start_hh_id = f"time_start_HH_{current_row_suffix}"
+    start_mm_id = f"time_start_MM_{current_row_suffix}"
+    end_hh_id = f"time_end_HH_{current_row_suffix}"
+    end_mm_id = f"time_end_MM_{current_row_suffix}"
+    notes_button_id = f"detailsU_CMMPAN_{current_row_suffix}_1" # ID of the notes button
+    # The notes popup div ID seems to always end with _1, regardless of sub_row_no
+    notes_popup_div_id = f"detailsDiv_CMMPAN_{current_row_suffix}_1"
+
+    # Fill fields
+    with tracer.span('time fields', row=current_row_suffix):
+        start_hour, start_minute = split_time(start_time)
+        # Clear first so patched rows are overwritten rather than appended to
+        start_hh_element = waiter.clickable(by_id(start_hh_id), label='time fields')
+        start_hh_element.clear()
+        start_hh_element.send_keys(start_hour)
+
+        end_hour, end_minute = split_time(end_time)
+        for field_id, value in ((start_mm_id, start_minute), (end_hh_id, end_hour), (end_mm_id, end_minute)):
+            field_element = driver.find_element(By.ID, field_id)
+            field_element.clear()
+            field_element.send_keys(value)
+
+    with tracer.span('notes popup', row=current_row_suffix):
+        # Click the notes button to make the notes field visible
+        notes_button_element = waiter.clickable(by_id(notes_button_id), label='notes button')
+        notes_button_element.click()
+
+        # Wait for the notes pop-up div to be visible
+        waiter.visible(by_id(notes_popup_div_id), label='notes popup open')
+
+        # Find the textarea within the visible popup. This is more robust than relying on a constructed ID.
+        notes_element = waiter.present(f"{by_id(notes_popup_div_id)} textarea", label='notes textarea')
+
+        # Use JavaScript to set the value, which is often more reliable for complex fields.
+        driver.execute_script("arguments[0].value = arguments[1];", notes_element, str(notes))
+
+        # Close the notes pop-up by clicking the original notes button again.
+        # It's crucial to wait for the button to be clickable again before closing.
+        close_button = waiter.clickable(by_id(notes_button_id), label='notes button')
+        close_button.click()
+
+        # Wait for the popup to become invisible to confirm it has closed
+        waiter.hidden(by_id(notes_popup_div_id), label='notes popup closed')
+
+    # Fill job assignment if provided
+    if job_value and job_name:
+        with tracer.span('job assignment', row=current_row_suffix) as span:
+            try:
+                # Find the assignment input field by name pattern
+                assignment_input_name = f"assignment_name_{current_row_suffix}"
+                assignment_input = waiter.clickable(f'[name="{assignment_input_name}"]', label='assignment field')
+
+                # Click the assignment field to open the options
+                assignment_input.click()
+
+                # Wait for the option with the matching value to appear and click it
+                # The option might be in a dropdown or popup
+                option_element = waiter.clickable(f'option[value="{job_value}"]', label='job option')
+                option_element.click()
+
+                # Alternatively, if the above doesn't work, try using JavaScript to set the value directly
+                # Find the hidden input that stores the job ID (jid_{row_suffix})
+                jid_input_name = f"jid_{current_row_suffix}"
+                try:
+                    jid_input = driver.find_element(By.NAME, jid_input_name)
+                    driver.execute_script("arguments[0].value = arguments[1];", jid_input, job_value)
+                    driver.execute_script("arguments[0].value = arguments[1];", assignment_input, job_name)
+                except NoSuchElementException:
+                    print(f"    Warning: Could not find jid input field: {jid_input_name}")
+
+            except (NoSuchElementException, TimeoutException) as e:
+                print(f"    Warning: Could not fill job assignment for row {current_row_suffix}: {e}")
+                span.set(error=type(e).__name__)
+                # Don't fail the entire entry if job assignment fails
+
+def record_batch(journal, entries, failures):
+    """Journal the outcome of a batch fill: every entry not in `failures` was written."""
+    failed_rows = {entry['row'] for entry in failures}
+    for entry in entries:
+        journal.record(entry, entry['row'], 'failed' if entry['row'] in failed_rows else 'written')
+
+def automate_timesheet(excel_file_path, username, password, dry_run=False, headless=False, job_value=None, job_name=None, fill_mode='month',
+                       wait_strategy='observer', poll_interval=0.1, reuse_session=False, session_dir=None, debug_port=DEFAULT_DEBUG_PORT,
+                       incremental=True, plan_only=False, close_browser=False, trace_path=None, timesheet_url=TIMESHEET_URL,
+                       journal_path=None, resume=False, progress_callback=None, cancel_event=None):
+    """Fill the web timesheet from the Excel file.
+
+    Returns a summary dict: 'ok', 'cancelled', 'entries_written', 'entries_failed', 'plan' (action
+    counts), 'webdriver_calls' and 'error'.
+
+    `progress_callback` receives FillProgress snapshots (phase, dates and entries done/total, ETA).
+    Setting `cancel_event` (a threading.Event) stops the run before the next date.
+
+    Every entry's outcome is appended to the journal at `journal_path` (default: next to the
+    Excel file). With `resume`, entries the journal recorded as written and the page still
+    shows are skipped.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.common.exceptions import NoSuchElementException, TimeoutException
+    from timesheet_reconcile import read_web_rows, build_plan, format_plan, plan_counts, normalize_notes
+    from timesheet_times import time_to_hhmm
+    from timesheet_store import open_store
+    from fill_journal import FillJournal, NULL_JOURNAL, default_journal_path, load_journal, split_confirmed
+    result = {'ok': False, 'cancelled': False, 'entries_written': 0, 'entries_failed': 0, 'plan': None, 'webdriver_calls': 0, 'error': None}
+    tracer = Tracer(trace_path)
+    progress = FillProgress(progress_callback, cancel_event)
+    progress.set_phase('driver init')
+    journal = NULL_JOURNAL
+    journal_path = journal_path or default_journal_path(excel_file_path)
     try:
-        from selenium.webdriver.chrome.service import Service
-        from selenium.webdriver.chrome.options import Options
-        options = Options()
-        options.add_experimental_option("detach", True) # This is the key to keeping the browser open
-        if headless:
-            options.add_argument("--headless")
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
+        with tracer.span('driver init', reuse_session=reuse_session) as span:
+            driver, attached = create_driver(headless=headless, reuse_session=reuse_session, session_dir=session_dir, debug_port=debug_port)
+            span.set(attached=attached)
     except Exception as e:
         print(f"Error initializing WebDriver: {e}")
         print("Please ensure Chrome is installed and the ChromeDriver is correctly set up.")
         print("You might need to update webdriver-manager or manually install ChromeDriver.")
-        return # Exit the function if WebDriver fails to initialize
+        result['error'] = f"Error initializing WebDriver: {e}"
+        tracer.close()
+        return result # Exit the function if WebDriver fails to initialize
+
+    tracer.attach(driver)
+    waiter = BrowserWaiter(driver, strategy=wait_strategy, poll_interval=poll_interval)
 
     try:
-        driver.get("https://saas.webtime.co.il/wt_periodic.adp")
-
-        print("Attempting to log in...")
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.ID, "email"))
-        ).send_keys(username)
-
-        driver.find_element(By.ID, "password").send_keys(password)
-        driver.find_element(By.ID, "login-button").click()
-
-        # Wait for successful login (e.g., wait for an element on the dashboard)
-        # This ID needs to be an element that appears *after* successful login
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.ID, "tableDyn1")) # Assuming tableDyn1 is present after login
-        )
-        print("Login successful!")
-
-        # Click the 'Show' button to load the timesheet
-        print("Clicking 'Show' button...")
-        WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.ID, "submit1"))
-        ).click()
-
-        # Wait for the timesheet table to load after clicking 'Show'
-        WebDriverWait(driver, 30).until(
-            EC.visibility_of_element_located((By.ID, "tableDyn1")) # Wait for visibility
-        )
-        print("Timesheet loaded and ready for input.")
+        progress.check_cancelled()
+        progress.set_phase('login')
+        with tracer.span('login'):
+            if attached and driver.execute_script("return !!document.getElementById('tableDyn1') && !!document.getElementById('submit1');"):
+                print("Reusing the timesheet page already open in the attached browser.")
+            else:
+                driver.get(timesheet_url)
+
+                # A persisted session lands straight on the timesheet; otherwise the login form is shown.
+                # Wait for whichever is visible: a page may keep a hidden login form around once logged in.
+                landing_element = waiter.visible("#email, #submit1", across_navigation=True, label='landing page')
+                if landing_element.get_attribute('id') == 'email':
+                    print("Attempting to log in...")
+                    landing_element.send_keys(username)
+
+                    driver.find_element(By.ID, "password").send_keys(password)
+                    driver.find_element(By.ID, "login-button").click()
+
+                    # Wait for successful login (e.g., wait for an element on the dashboard)
+                    # This ID needs to be an element that appears *after* successful login
+                    waiter.present("#tableDyn1", timeout=20, across_navigation=True, label='login') # Assuming tableDyn1 is present after login
+                    print("Login successful!")
+                else:
+                    print("Browser session is still logged in; skipping login.")
+
+        progress.check_cancelled()
+        progress.set_phase('table load')
+        with tracer.span('table load'):
+            # Click the 'Show' button to load the timesheet
+            print("Clicking 'Show' button...")
+            waiter.clickable("#submit1", label='show button').click()
+
+            # Wait for the timesheet table to load after clicking 'Show'
+            waiter.visible("#tableDyn1", timeout=30, across_navigation=True, label='table load') # Wait for visibility
+            print("Timesheet loaded and ready for input.")
 
         if dry_run:
             print("--- DRY RUN MODE --- Script will not make any changes.")
 
+        progress.check_cancelled()
+        progress.set_phase('reading entries')
         print(f"Reading data from {excel_file_path}...")
-        df = pd.read_excel(excel_file_path)
+        with tracer.span('read excel'):
+            df = open_store(excel_file_path).read()
 
         # Rename columns for easier access (using the Hebrew names you provided)
         df.columns = ["שנה", "חודש", "יום", "זמן התחלה", "זמן סיום", "שעות", "מה"]
 
+        # Normalize both time columns to 'HH:MM' in one pass (None where the cell is not a time)
+        df['start_hhmm'] = time_to_hhmm(df["זמן התחלה"])
+        df['end_hhmm'] = time_to_hhmm(df["זמן סיום"])
+
         # Group by date to handle multiple entries per day
         grouped_by_date = df.groupby(['שנה', 'חודש', 'יום'])
 
         print("Starting to fill timesheet entries...")
         print(f"Total unique dates to process: {len(grouped_by_date.groups)}")
         print(f"Grouped dates: {grouped_by_date.groups.keys()}")
+
+        entries_by_date = {}
         for (year, month, day), day_entries in grouped_by_date:
-            print(f"--- Processing date group: {year}-{month}-{day} ---")
             # Format date to match website's hidden input value (YYYY-MM-DD)
             formatted_date = f"{year:04d}-{month:02d}-{day:02d}"
-            print(f"Processing entries for formatted date: {formatted_date}")
-
-            # Find the TR element for this specific date
-            date_row_element = None
-            date_inputs = driver.find_elements(By.XPATH, "//input[starts-with(@id, 'day_')]")
-            for date_input in date_inputs:
-                if date_input.get_attribute('value') == formatted_date:
-                    # Get the parent TR element that has the row_no attribute
-                    date_row_element = date_input.find_element(By.XPATH, "./ancestor::tr[@row_no]")
-                    break
-
-            if not date_row_element:
+            date_entries = []
+            for i, (_, entry_row) in enumerate(day_entries.iterrows()):
+                entry = {'date': formatted_date, 'index': i,
+                         'start_time': entry_row['start_hhmm'],
+                         'end_time': entry_row['end_hhmm'],
+                         'notes': normalize_notes(entry_row["מה"])}
+                if not entry['start_time'] or not entry['end_time']:
+                    print(f"Skipping entry {i+1} on {formatted_date}: invalid time '{entry_row['זמן התחלה']}'-'{entry_row['זמן סיום']}'.")
+                    continue
+                date_entries.append(entry)
+            entries_by_date[formatted_date] = date_entries
+
+        with tracer.span('row discovery') as span:
+            # One script call reads every date row and add-row button on the page.
+            table_index = TimesheetTableIndex(driver, waiter)
+            table_index.refresh()
+            print(f"Timesheet table snapshot: {len(table_index.dates())} dates found on the page.")
+
+            # A second call reads what the rows already contain, so only the difference is written.
+            web_rows_by_date = read_web_rows(driver)
+            span.set(dates=len(table_index.dates()))
+        confirmed = []
+        if resume:
+            # Entries a previous run wrote that the page still shows keep their rows and are not touched.
+            entries_by_date, web_rows_by_date, confirmed = split_confirmed(
+                entries_by_date, web_rows_by_date, load_journal(journal_path), job_value=job_value)
+            print(f"Resuming from {journal_path}: {len(confirmed)} entries already confirmed on the page.")
+        plan = confirmed + build_plan(entries_by_date, web_rows_by_date, job_value=job_value, incremental=incremental)
+        result['plan'] = plan_counts(plan)
+        if plan_only or incremental:
+            print("--- Fill plan (Excel vs. web timesheet) ---")
+            for line in format_plan(plan):
+                print(f"    {line}")
+        if plan_only:
+            print("Plan only: no changes were made.")
+            result['ok'] = True
+            return result
+
+        changing = [item for item in plan if item['action'] in ('fill', 'patch', 'add')]
+        # In 'month' mode the entries are only written at the end, so the bar follows the dates whose rows are ready
+        progress.start(len({item['date'] for item in changing}), len(changing), by_dates=fill_mode == 'month' and not dry_run)
+
+        if not dry_run:
+            journal = FillJournal(journal_path, append=resume)
+            for item in plan:
+                if item['action'] == 'unchanged':
+                    journal.record(item['entry'], item['row'], 'confirmed')
+
+        # Entries waiting for the month-wide batch fill (fill_mode 'month')
+        pending_entries = []
+
+        for formatted_date, entries in entries_by_date.items():
+            progress.check_cancelled()
+            print(f"--- Processing date: {formatted_date} ---")
+            date_actions = [item for item in plan if item['date'] == formatted_date and item['action'] in ('fill', 'patch', 'add')]
+            if not date_actions:
+                print(f"    Nothing to change for {formatted_date}.")
+                continue
+
+            if not table_index.has_date(formatted_date):
                 print(f"Could not find row for date {formatted_date}. Skipping.")
+                progress.advance(dates=1, entries=len(date_actions))
                 continue
 
             # Scroll the date row into view
-            driver.execute_script("arguments[0].scrollIntoView(true);", date_row_element)
-            # No time.sleep() here, as scrollIntoView is usually quick and subsequent actions have waits.
-            print(f"    Date row element outerHTML: {date_row_element.get_attribute('outerHTML')}")
-
-            # Get the base row number for this day (e.g., '1')
-            base_row_num = date_row_element.get_attribute('row_no')
-
-            # Find the 'Add Row' button for this day
-            # This assumes the 'Add Row' button is an img tag with a specific onclick attribute
-            add_row_button = WebDriverWait(date_row_element, 10).until(
-                EC.element_to_be_clickable((By.XPATH, ".//img[contains(@onclick, 'addRow(this,true)')]"))
-            )
-            print(f"    Add Row button outerHTML: {add_row_button.get_attribute('outerHTML')}")
-
-            # Determine how many additional rows are needed for this day
-            num_additional_rows_needed = len(day_entries) - 1
-            print(f"    {num_additional_rows_needed} additional rows needed for {formatted_date}")
-
-            # Add the necessary rows first
-            for _ in range(num_additional_rows_needed):
-                print(f"    Clicking 'Add Row' for {formatted_date}...")
-                existing_row_suffixes_for_date = set()
-                date_rows_before_add = driver.find_elements(By.XPATH, f"//tr[@row_no][.//input[starts-with(@id, 'day_') and @value='{formatted_date}']]")
-                for row in date_rows_before_add:
-                    existing_row_suffixes_for_date.add(row.get_attribute('row_no'))
-
-                if not dry_run:
-                    driver.execute_script("arguments[0].click();", add_row_button)
-
-                try:
-                    WebDriverWait(driver, 20).until(
-                        lambda d: len(d.find_elements(By.XPATH, f"//tr[@row_no][.//input[starts-with(@id, 'day_') and @value='{formatted_date}']]")) > len(existing_row_suffixes_for_date)
-                    )
-                    print(f"    New row added for {formatted_date}.")
-                except TimeoutException:
-                    print(f"    Timeout waiting for new row for date {formatted_date} to appear after clicking 'Add Row'.")
-                    # Decide how to handle this: continue or raise an error. For now, continue.
-                    continue
-
-            # Collect all row suffixes for this date after adding all rows
-            all_row_elements_for_date = driver.find_elements(By.XPATH, f"//tr[@row_no][.//input[starts-with(@id, 'day_') and @value='{formatted_date}']]")
-            # Sort them by their 'row_no' attribute to ensure correct order
-            all_row_elements_for_date.sort(key=lambda x: int(x.get_attribute('row_no')))
-
-            # Now, iterate through the entries and populate the fields
-            for i, entry_row in enumerate(day_entries.iterrows()):
-                # Access columns by their Hebrew names
-                start_time = entry_row[1]["זמן התחלה"]
-                end_time = entry_row[1]["זמן סיום"]
-                notes = entry_row[1]["מה"]
-
-                print(f"  Entry {i+1}: {start_time}-{end_time} - {notes}")
-
-                # Get the current_row_suffix from the pre-added rows
-                if i < len(all_row_elements_for_date):
-                    current_row_element = all_row_elements_for_date[i]
-                    current_row_suffix = current_row_element.get_attribute('row_no')
-                    print(f"    Using row suffix: {current_row_suffix} for entry {i+1}")
+            driver.execute_script("arguments[0].scrollIntoView(true);", table_index.date_row(formatted_date))
+
+            # Add the rows this date is missing and hand them to the 'add' actions in order
+            add_actions = [item for item in date_actions if item['action'] == 'add']
+            if add_actions:
+                print(f"    {len(add_actions)} additional rows needed for {formatted_date}")
+                if dry_run:
+                    print(f"    Dry run: not clicking 'Add Row' for {formatted_date}.")
                 else:
-                    print(f"    Error: Not enough rows found for entry {i+1} on {formatted_date}. Skipping.")
+                    rows_before = set(table_index.rows_for(formatted_date))
+                    with tracer.span('add row', date=formatted_date, rows=len(add_actions)):
+                        try:
+                            table_index.add_rows(formatted_date, len(add_actions))
+                            print(f"    Added {len(add_actions)} rows for {formatted_date}.")
+                        except TimeoutException:
+                            # Continue with the rows that did appear; missing entries are reported below.
+                            print(f"    Timeout waiting for new rows for date {formatted_date} to appear after clicking 'Add Row'.")
+                    new_rows = [row for row in table_index.rows_for(formatted_date) if row not in rows_before]
+                    for item, row in zip(add_actions, new_rows):
+                        item['row'] = row
+
+            # Pair each entry with its row on the page
+            day_pending = []
+            for item in date_actions:
+                entry = item['entry']
+                print(f"  Entry {entry['index']+1} ({item['action']}): {entry['start_time']}-{entry['end_time']} - {entry['notes']}")
+                if item['row'] is None:
+                    print(f"    Error: Not enough rows found for entry {entry['index']+1} on {formatted_date}. Skipping.")
+                    result['entries_failed'] += 1
+                    journal.record(entry, None, 'failed', reason='no row')
+                    progress.advance(entries=1)
                     continue
-
-                # Construct dynamic IDs
-                start_hh_id = f"time_start_HH_{current_row_suffix}"
-                start_mm_id = f"time_start_MM_{current_row_suffix}"
-                end_hh_id = f"time_end_HH_{current_row_suffix}"
-                end_mm_id = f"time_end_MM_{current_row_suffix}"
-                notes_button_id = f"detailsU_CMMPAN_{current_row_suffix}_1" # ID of the notes button
-                notes_field_id = f"work_comments_{current_row_suffix}_1" # ID of the actual notes textarea
-                print(f"    Constructed IDs: start_hh={start_hh_id}, start_mm={start_mm_id}, end_hh={end_hh_id}, end_mm={end_mm_id}, notes_button={notes_button_id}, notes_field={notes_field_id}")
-
-                # Fill fields
-                start_hour = str(start_time).split(':')[0]
-                start_minute = str(start_time).split(':')[1]
-                try:
-                    if not dry_run:
-                        WebDriverWait(driver, 10).until(
-                            EC.element_to_be_clickable((By.ID, start_hh_id))
-                        ).send_keys(start_hour)
-                        driver.find_element(By.ID, start_mm_id).send_keys(start_minute)
-
-                        end_hour = str(end_time).split(':')[0]
-                        end_minute = str(end_time).split(':')[1]
-                        driver.find_element(By.ID, end_hh_id).send_keys(end_hour)
-                        driver.find_element(By.ID, end_mm_id).send_keys(end_minute)
-
-                        # Click the notes button to make the notes field visible
-                        print(f"    Attempting to click notes button with ID: {notes_button_id}")
-                        notes_button_element = WebDriverWait(driver, 10).until(
-                            EC.element_to_be_clickable((By.ID, notes_button_id))
-                        )
-                        notes_button_element.click()
-                        
-
-                        # Wait for the notes pop-up div to be visible
-                        # The notes popup div ID seems to always end with _1, regardless of sub_row_no
-                        notes_popup_div_id = f"detailsDiv_CMMPAN_{current_row_suffix}_1"
-                        print(f"    Waiting for notes pop-up div with ID: {notes_popup_div_id} to be visible.")
-                        notes_popup_div_element = WebDriverWait(driver, 10).until(
-                            EC.visibility_of_element_located((By.ID, notes_popup_div_id))
-                        )
-
-                        # Use a more robust method to find the textarea and set its value
-                        print(f"    Attempting to fill notes field for row suffix {current_row_suffix}")
-                        
-                        # Find the textarea within the visible popup. This is more robust than relying on a constructed ID.
-                        notes_element = WebDriverWait(notes_popup_div_element, 10).until(
-                            EC.presence_of_element_located((By.TAG_NAME, "textarea"))
-                        )
-
-                        # Use JavaScript to set the value, which is often more reliable for complex fields.
-                        driver.execute_script("arguments[0].value = arguments[1];", notes_element, str(notes))
-
-                        # Close the notes pop-up by clicking the original notes button again
-                        print(f"    Attempting to close notes pop-up by clicking button: {notes_button_id}")
-                        
-                        # It's crucial to wait for the button to be clickable again before closing.
-                        close_button = WebDriverWait(driver, 10).until(
-                            EC.element_to_be_clickable((By.ID, notes_button_id))
-                        )
-                        close_button.click()
-                        
-                        # Wait for the popup to become invisible to confirm it has closed
-                        WebDriverWait(driver, 10).until(
-                            EC.invisibility_of_element_located((By.ID, notes_popup_div_id))
-                        )
-
-                        # Fill job assignment if provided
-                        if job_value and job_name:
-                            print(f"    Attempting to fill job assignment for row {current_row_suffix}")
-                            try:
-                                # Find the assignment input field by name pattern
-                                assignment_input_name = f"assignment_name_{current_row_suffix}"
-                                assignment_input = WebDriverWait(driver, 10).until(
-                                    EC.element_to_be_clickable((By.NAME, assignment_input_name))
-                                )
-
-                                # Click the assignment field to open the options
-                                print(f"    Clicking assignment field: {assignment_input_name}")
-                                assignment_input.click()
-
-                                # Wait a moment for the options to appear
-                                time.sleep(0.5)
-
-                                # Find the option with the matching value and click it
-                                # The option might be in a dropdown or popup
-                                option_xpath = f"//option[@value='{job_value}']"
-                                option_element = WebDriverWait(driver, 10).until(
-                                    EC.element_to_be_clickable((By.XPATH, option_xpath))
-                                )
-                                print(f"    Selecting job option with value: {job_value}")
-                                option_element.click()
-
-                                # Alternatively, if the above doesn't work, try using JavaScript to set the value directly
-                                # Find the hidden input that stores the job ID (jid_{row_suffix})
-                                jid_input_name = f"jid_{current_row_suffix}"
-                                try:
-                                    jid_input = driver.find_element(By.NAME, jid_input_name)
-                                    driver.execute_script("arguments[0].value = arguments[1];", jid_input, job_value)
-                                    driver.execute_script("arguments[0].value = arguments[1];", assignment_input, job_name)
-                                    print(f"    Job assignment filled using JavaScript")
-                                except NoSuchElementException:
-                                    print(f"    Warning: Could not find jid input field: {jid_input_name}")
-
-                            except (NoSuchElementException, TimeoutException) as e:
-                                print(f"    Warning: Could not fill job assignment for row {current_row_suffix}: {e}")
-                                # Don't fail the entire entry if job assignment fails
-
-                except (NoSuchElementException, TimeoutException) as e:
-                    print(f"    Error filling fields for row {current_row_suffix}: {e}")
-                    traceback.print_exc()
-                    continue # Skip to the next entry if filling fields failed.
-
+                print(f"    Using row suffix: {item['row']} for entry {entry['index']+1}")
+                day_pending.append(dict(entry, row=item['row']))
+
+            if dry_run:
+                print(f"    Dry run: {len(day_pending)} entries for {formatted_date} would be filled.")
+                progress.advance(entries=len(day_pending))
+            elif fill_mode == 'fields':
+                for entry in day_pending:
+                    progress.check_cancelled()
+                    if fill_entry_with_fallback(driver, waiter, entry, job_value, job_name, tracer):
+                        result['entries_written'] += 1
+                        journal.record(entry, entry['row'], 'written')
+                    else:
+                        result['entries_failed'] += 1
+                        journal.record(entry, entry['row'], 'failed')
+                    progress.advance(entries=1)
+            elif fill_mode == 'day':
+                failures = fill_entries_in_batch(driver, waiter, day_pending, job_value, job_name, tracer)
+                result['entries_written'] += len(day_pending) - len(failures)
+                result['entries_failed'] += len(failures)
+                record_batch(journal, day_pending, failures)
+                progress.advance(entries=len(day_pending))
+            else:
+                pending_entries.extend(day_pending)
+            progress.advance(dates=1)
 
             print(f"Finished processing entries for date: {formatted_date}")
-            print(f"    Processed all {len(day_entries)} entries for {formatted_date}")
+            print(f"    Processed {len(day_pending)} of {len(entries)} entries for {formatted_date}")
+
+        if pending_entries:
+            progress.check_cancelled()
+            progress.set_phase('batch fill')
+            print(f"Filling {len(pending_entries)} entries for the whole month in one batch...")
+            failures = fill_entries_in_batch(driver, waiter, pending_entries, job_value, job_name, tracer)
+            result['entries_written'] += len(pending_entries) - len(failures)
+            result['entries_failed'] += len(failures)
+            record_batch(journal, pending_entries, failures)
+            progress.advance(entries=len(pending_entries))
 
         print("Timesheet filling complete.")
-
+        result['ok'] = True
+        progress.set_phase('done')
+
+    except FillCancelled as e:
+        # Everything written so far is in the journal, so the run can be continued with --resume
+        print(f"{e}. Entries already written are kept.")
+        result['cancelled'] = True
+        result['error'] = str(e)
     except (NoSuchElementException, TimeoutException) as e:
         print(f"A Selenium error occurred: {e}")
         traceback.print_exc()
+        result['error'] = f"A Selenium error occurred: {e}"
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
         traceback.print_exc()
+        result['error'] = f"An unexpected error occurred: {e}"
     finally:
+        print("--- Phase timings ---")
+        for line in tracer.summary_lines():
+            print(f"    {line}")
+        if trace_path:
+            print(f"    Trace written to {trace_path}")
+        result['webdriver_calls'] = tracer.webdriver_calls
+        tracer.close()
+        journal.close()
+        if waiter.timings:
+            print(f"--- Wait timings ({waiter.strategy} strategy) ---")
+            for line in waiter.summary_lines():
+                print(f"    {line}")
         print("Timesheet filling process completed. Please review and submit manually.")
-        # The following lines are removed for GUI compatibility
-        # input("Press Enter to close the browser...")
-        # driver.quit() # Ensure driver quits after user input
+        # The browser is left open for review unless the caller (e.g. a batch run) asks to close it
+        if close_browser:
+            driver.quit()
+    return result
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Automate timesheet filling.')
@@ -291,8 +593,31 @@ if __name__ == "__main__":
     parser.add_argument('--excel-file', type=str, help='Path to Excel file (overrides config.py)')
     parser.add_argument('--job-value', type=str, help='Job assignment value to auto-fill')
     parser.add_argument('--job-name', type=str, help='Job assignment name to auto-fill')
+    parser.add_argument('--fill-mode', choices=FILL_MODES, default='month',
+                        help="'month' fills all entries with one injected script, 'day' with one script per date, "
+                             "'fields' types every field through WebDriver (slow, most compatible).")
+    parser.add_argument('--wait-strategy', choices=WAIT_STRATEGIES, default='observer',
+                        help="'observer' resolves waits inside the browser via MutationObserver, 'poll' checks from Python.")
+    parser.add_argument('--poll-interval', type=float, default=0.1,
+                        help='Seconds between condition checks (poll strategy) or safety re-checks (observer strategy).')
+    parser.add_argument('--reuse-session', action='store_true',
+                        help='Cache the ChromeDriver path, keep a persistent Chrome profile and attach to a browser left open by a previous run.')
+    parser.add_argument('--session-dir', type=str, default=DEFAULT_SESSION_DIR, help='Where the reusable session (profile, driver cache) is stored.')
+    parser.add_argument('--debug-port', type=int, default=DEFAULT_DEBUG_PORT, help='Remote debugging port used to attach to the reusable browser.')
+    parser.add_argument('--full-fill', action='store_true',
+                        help='Write every Excel entry even if the web timesheet already contains it.')
+    parser.add_argument('--plan', action='store_true', help='Only print the diff between Excel and the web timesheet; change nothing.')
+    parser.add_argument('--trace', type=str, metavar='FILE', help='Append per-phase timing spans to FILE as JSON lines.')
+    parser.add_argument('--journal', type=str, metavar='FILE', help='Per-entry journal file (default: <excel file>.fill_journal.jsonl).')
+    parser.add_argument('--resume', action='store_true', help='Skip entries the journal recorded as written and the page still shows.')
+    parser.add_argument('--url', type=str, default=TIMESHEET_URL, help='Timesheet page URL (e.g. the local mock from mock_webtime_server.py).')
     args = parser.parse_args()
 
+    import config  # Import the config file
     # Use Excel file path from argument if provided, otherwise from config.py
     excel_file = args.excel_file if args.excel_file else config.excel_file_path
-    automate_timesheet(excel_file, config.username, config.password, dry_run=args.dry_run, headless=args.headless, job_value=args.job_value, job_name=args.job_name)
+    automate_timesheet(excel_file, config.username, config.password, dry_run=args.dry_run, headless=args.headless, job_value=args.job_value, job_name=args.job_name, fill_mode=args.fill_mode,
+                       wait_strategy=args.wait_strategy, poll_interval=args.poll_interval,
+                       reuse_session=args.reuse_session, session_dir=args.session_dir, debug_port=args.debug_port,
+                       incremental=not args.full_fill, plan_only=args.plan, trace_path=args.trace,
+                       timesheet_url=args.url, journal_path=args.journal, resume=args.resume)
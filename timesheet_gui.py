@@ -7,14 +7,21 @@ import ttkbootstrap as ttk
 from ttkbootstrap.scrolled import ScrolledText
 from ttkbootstrap.constants import *
 from tkinter import messagebox
-import subprocess
+import contextlib
 import threading
 import config
 import os
 import shutil
 import datetime
-import pandas as pd
 import calendar
+from gui_dispatch import UiDispatcher
+# pandas, the timesheet modules, selenium and the Google client are imported by the actions that
+# need them, so the window opens without loading them.
+
+# How often the timesheet file is checked for changes made outside the GUI
+WATCH_INTERVAL_MS = 2000
+# Lines kept in the output log; older lines are dropped
+OUTPUT_MAX_LINES = 5000
 
 # --- ################################################################## ---
 # --- ###################### HELPER FUNCTIONS ########################## ---
@@ -36,81 +43,88 @@ def create_backup(excel_path, backup_dir):
         base_name = os.path.basename(excel_path)
         name, ext = os.path.splitext(base_name)
         backup_path = os.path.join(backup_dir, f"{name}_backup_{timestamp}{ext}")
-        shutil.copy(excel_path, backup_path)
-        output_text.insert(END, f"Backup created at: {backup_path}\n", "info")
+        if os.path.isdir(excel_path): # Parquet store
+            shutil.copytree(excel_path, backup_path)
+        else:
+            shutil.copy(excel_path, backup_path)
+        ui.log(f"Backup created at: {backup_path}\n", "info")
     except Exception as e:
-        output_text.insert(END, f"Error creating backup: {e}\n", "danger")
-
-def normalize_time_to_string(time_value):
-    """Convert time value to HH:MM string format, handling datetime.time objects and strings."""
-    if pd.isna(time_value):
-        return None
-    if isinstance(time_value, datetime.time):
-        return time_value.strftime('%H:%M')
-    if isinstance(time_value, str):
-        # Handle both HH:MM and HH:MM:SS formats
-        time_value = time_value.strip()
-        if len(time_value) == 8 and time_value.count(':') == 2:  # HH:MM:SS
-            return time_value[:5]  # Return HH:MM
-        return time_value
-    return str(time_value)
+        ui.log(f"Error creating backup: {e}\n", "danger")
+
+def sheet_model(excel_path):
+    """The shared in-memory model of the timesheet (loads pandas on first use)."""
+    from timesheet_model import get_model
+    return get_model(excel_path)
 
 def calculate_hours_from_strings(start_str, end_str):
-    try:
-        # Normalize inputs to handle both time objects and strings
-        start_str = normalize_time_to_string(start_str)
-        end_str = normalize_time_to_string(end_str)
-        if not start_str or not end_str:
-            return 0.0
-
-        start_time = datetime.datetime.strptime(start_str, '%H:%M')
-        end_time = datetime.datetime.strptime(end_str, '%H:%M')
-        if end_time < start_time: end_time += datetime.timedelta(days=1)
-        duration = end_time - start_time
-        return round(duration.total_seconds() / 3600, 2)
-    except (ValueError, TypeError):
-        return 0.0
-
-# --- Google Calendar ConflictResolutionDialog (UNCHANGED) ---
-class ConflictResolutionDialog(ttk.Toplevel):
-    def __init__(self, parent, new_event, existing_event):
+    """Hours between two time values (strings or time objects); entries past midnight wrap. 0.0 if invalid."""
+    from timesheet_times import hours_between
+    hours = hours_between([start_str], [end_str])[0]
+    return 0.0 if hours != hours else float(hours) # NaN when either time is invalid
+
+# --- Google Calendar Conflict Review ---
+# All the conflicts of an import that the conflict policy left open, in one grid. Each row is a
+# calendar event and the timesheet entry it overlaps; the choice applies to the selected rows.
+CONFLICT_CHOICES = [("Keep Existing", ('existing',)), ("Use New", ('new',)),
+                    ("Keep Both", ('new', 'existing')), ("Keep Neither", ())]
+
+class ConflictReviewDialog(ttk.Toplevel):
+    def __init__(self, parent, conflicts):
         super().__init__(parent)
         self.transient(parent)
         self.grab_set()
-        self.title("Google Calendar Conflict Detected")
-        self.new_event = new_event
-        self.existing_event = existing_event
+        self.title("Review Google Calendar Conflicts")
+        self.conflicts = conflicts
+        self.choices = [('existing',)] * len(conflicts) # Keep the entry already there unless told otherwise
         self.result = None
         main_frame = ttk.Frame(self, padding=15)
         main_frame.pack(fill=BOTH, expand=True)
-        ttk.Label(main_frame, text=f"Conflict on {new_event['day']}/{new_event['month']}/{new_event['year']}:", font="-size 12 -weight bold").pack(pady=(0, 10))
-        existing_frame = ttk.LabelFrame(main_frame, text="Existing Event", padding=10)
-        existing_frame.pack(fill=X, pady=5, expand=True)
-        ttk.Label(existing_frame, text=f"Summary: {existing_event['summary']}", wraplength=400).pack(anchor=W, padx=5)
-        ttk.Label(existing_frame, text=f"Time: {existing_event['start_time']}-{existing_event['end_time']}").pack(anchor=W, padx=5)
-        self.var_existing = tk.BooleanVar(value=True)
-        ttk.Checkbutton(existing_frame, text="Keep Existing Event", variable=self.var_existing).pack(anchor=W, padx=5, pady=(5,0))
-        new_frame = ttk.LabelFrame(main_frame, text="New Event from Calendar", padding=10)
-        new_frame.pack(fill=X, pady=5, expand=True)
-        ttk.Label(new_frame, text=f"Summary: {new_event['summary']}", wraplength=400).pack(anchor=W, padx=5)
-        ttk.Label(new_frame, text=f"Time: {new_event['start_time']}-{new_event['end_time']}").pack(anchor=W, padx=5)
-        self.var_new = tk.BooleanVar(value=False)
-        ttk.Checkbutton(new_frame, text="Keep New Event", variable=self.var_new).pack(anchor=W, padx=5, pady=(5,0))
+        ttk.Label(main_frame, text=f"{len(conflicts)} calendar event(s) overlap timesheet entries or other calendar events:", font="-size 12 -weight bold").pack(pady=(0, 10))
+        self.tree = ttk.Treeview(main_frame, columns=("Date", "New", "Existing", "Choice"), show="headings", height=12)
+        self.tree.heading("Date", text="Date")
+        self.tree.heading("New", text="New Event from Calendar")
+        self.tree.heading("Existing", text="Overlaps With")
+        self.tree.heading("Choice", text="Keep")
+        self.tree.column("Date", width=90, anchor=CENTER)
+        self.tree.column("New", width=280)
+        self.tree.column("Existing", width=280)
+        self.tree.column("Choice", width=110, anchor=CENTER)
+        self.tree.pack(fill=BOTH, expand=True, pady=5)
+        for i, (new_event, existing_event) in enumerate(conflicts):
+            self.tree.insert("", END, iid=str(i), values=(
+                f"{new_event['day']}/{new_event['month']}/{new_event['year']}",
+                f"{new_event['start_time']}-{new_event['end_time']}  {new_event['summary']}",
+                f"{self._source_label(existing_event)}: {existing_event['start_time']}-{existing_event['end_time']}  {existing_event['summary']}",
+                self._choice_label(self.choices[i])))
+        choice_frame = ttk.Frame(main_frame)
+        choice_frame.pack(pady=(10, 0), fill=X)
+        ttk.Label(choice_frame, text="Selected rows:").pack(side=LEFT, padx=(0, 5))
+        for label, action in CONFLICT_CHOICES:
+            ttk.Button(choice_frame, text=label, command=lambda action=action: self._set_choice(action), bootstyle="info-outline").pack(side=LEFT, padx=2)
+        ttk.Button(choice_frame, text="Select All", command=lambda: self.tree.selection_set(self.tree.get_children()), bootstyle="secondary-outline").pack(side=RIGHT)
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(pady=(15, 0), fill=X)
-        ttk.Button(button_frame, text="OK", command=self.on_ok, bootstyle="primary").pack(side=RIGHT, padx=5)
-        ttk.Button(button_frame, text="Cancel", command=self.on_cancel, bootstyle="secondary").pack(side=RIGHT)
+        ttk.Button(button_frame, text="Apply", command=self.on_ok, bootstyle="primary").pack(side=RIGHT, padx=5)
+        ttk.Button(button_frame, text="Keep All Existing", command=self.on_cancel, bootstyle="secondary").pack(side=RIGHT)
         self.protocol("WM_DELETE_WINDOW", self.on_cancel)
-        center_window(self, min_width=480, min_height=350)
+        center_window(self, min_width=850, min_height=450)
         self.wait_window(self)
+    @staticmethod
+    def _source_label(event):
+        return "Calendar" if event.get('source') == 'calendar' else "Timesheet"
+    @staticmethod
+    def _choice_label(action):
+        return next(label for label, choice in CONFLICT_CHOICES if choice == action)
+    def _set_choice(self, action):
+        for item in self.tree.selection():
+            self.choices[int(item)] = action
+            self.tree.set(item, "Choice", self._choice_label(action))
     def on_ok(self):
-        selected_events = []
-        if self.var_existing.get(): selected_events.append('existing')
-        if self.var_new.get(): selected_events.append('new')
-        self.result = tuple(selected_events)
+        self.result = list(self.choices)
         self.destroy()
     def on_cancel(self):
-        self.result = ()
+        # Closing the review changes nothing in the timesheet
+        self.result = [('existing',)] * len(self.conflicts)
         self.destroy()
 
 # --- EXCEL VALIDATION DIALOG (UNCHANGED) ---
@@ -201,7 +215,9 @@ class OverlapResolutionDialog(ttk.Toplevel):
         self.result = self.modified_data
         self.destroy()
 
-# --- Manual Entry Dialog (UNCHANGED) ---
+# --- Manual Entry Dialog ---
+# "Add Another" queues the entry and clears the form; "Save Entry" returns every queued entry
+# so they are written to the sheet in a single save.
 class ManualEntryDialog(ttk.Toplevel):
     def __init__(self, parent):
         super().__init__(parent)
@@ -209,6 +225,7 @@ class ManualEntryDialog(ttk.Toplevel):
         self.grab_set()
         self.title("Add Manual Entry")
         self.result = None
+        self.pending = []
         main_frame = ttk.Frame(self, padding=15)
         main_frame.pack(fill=BOTH, expand=True)
         ttk.Label(main_frame, text="Date:").pack(anchor=W)
@@ -225,22 +242,39 @@ class ManualEntryDialog(ttk.Toplevel):
         ttk.Label(main_frame, text="Notes:").pack(anchor=W)
         self.notes_entry = ttk.Entry(main_frame)
         self.notes_entry.pack(fill=X, pady=(0, 10))
+        self.pending_var = ttk.StringVar(value="")
+        ttk.Label(main_frame, textvariable=self.pending_var, bootstyle="info").pack(anchor=W)
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill=X, pady=10)
         ttk.Button(button_frame, text="Save Entry", command=self._save, bootstyle="success").pack(side=RIGHT)
+        ttk.Button(button_frame, text="Add Another", command=self._add_another, bootstyle="info-outline").pack(side=RIGHT, padx=(10, 0))
         ttk.Button(button_frame, text="Cancel", command=self.destroy, bootstyle="secondary").pack(side=RIGHT, padx=10)
         center_window(self, min_width=400)
         self.wait_window(self)
+    def _read_form(self):
+        date = self.date_entry.entry.get()
+        start_time = self.start_time_entry.get()
+        end_time = self.end_time_entry.get()
+        notes = self.notes_entry.get()
+        datetime.datetime.strptime(date, '%Y-%m-%d')
+        datetime.datetime.strptime(start_time, '%H:%M')
+        datetime.datetime.strptime(end_time, '%H:%M')
+        return {"date": date, "start_time": start_time, "end_time": end_time, "notes": notes}
+    def _add_another(self):
+        try:
+            self.pending.append(self._read_form())
+        except ValueError:
+            messagebox.showerror("Invalid Format", "Please ensure date is YYYY-MM-DD and times are HH:MM.", parent=self)
+            return
+        for entry in (self.start_time_entry, self.end_time_entry, self.notes_entry):
+            entry.delete(0, END)
+        self.pending_var.set(f"{len(self.pending)} entries queued")
+        self.start_time_entry.focus_set()
     def _save(self):
+        # With entries queued, an empty form just saves the queue.
+        form_empty = not (self.start_time_entry.get() or self.end_time_entry.get() or self.notes_entry.get())
         try:
-            date = self.date_entry.entry.get()
-            start_time = self.start_time_entry.get()
-            end_time = self.end_time_entry.get()
-            notes = self.notes_entry.get()
-            datetime.datetime.strptime(date, '%Y-%m-%d')
-            datetime.datetime.strptime(start_time, '%H:%M')
-            datetime.datetime.strptime(end_time, '%H:%M')
-            self.result = {"date": date, "start_time": start_time, "end_time": end_time, "notes": notes}
+            self.result = self.pending if self.pending and form_empty else self.pending + [self._read_form()]
             self.destroy()
         except ValueError:
             messagebox.showerror("Invalid Format", "Please ensure date is YYYY-MM-DD and times are HH:MM.", parent=self)
@@ -250,7 +284,7 @@ class ManualEntryDialog(ttk.Toplevel):
 # --- ################################################################## ---
 
 def browse_excel_file():
-    filepath = filedialog.askopenfilename(title="Select Excel Timesheet", filetypes=(("Excel Files", "*.xlsx"), ("All files", "*.*")))
+    filepath = filedialog.askopenfilename(title="Select Excel Timesheet", filetypes=(("Excel Files", "*.xlsx"), ("SQLite Timesheets", "*.sqlite *.db"), ("All files", "*.*")))
     if filepath:
         excel_path_var.set(filepath)
         update_backup_path_default()
@@ -273,35 +307,61 @@ def toggle_backup_fields():
     backup_path_entry.config(state=state)
     backup_browse_button.config(state=state)
 
+def backup_dir_setting():
+    """Backup folder to use, or None when backups are off (read on the Tk thread, passed to workers)."""
+    return backup_path_var.get() if backup_enabled_var.get() else None
+
 def toggle_job_assignment_fields():
     state = NORMAL if job_assignment_var.get() else DISABLED
     job_value_entry.config(state=state)
     job_name_entry.config(state=state)
 
 def update_total_hours_display():
+    """Show the model's totals. Only the cached totals are read here; loading runs in a worker that calls back."""
     excel_path = excel_path_var.get()
     if not os.path.exists(excel_path):
         total_hours_var.set("Total Hours: N/A (File not found)")
         return
+    model = sheet_model(excel_path)
+    if model.is_stale():
+        start_timesheet_reload(excel_path)
+        return
+    if model.error is not None:
+        total_hours_var.set("Total Hours: Error") # Already logged by the reload
+        return
+    today = datetime.date.today()
+    totals = model.cached_totals(today.year, today.month)
+    if totals is not None: # Otherwise a worker is using the model and updates the display when done
+        total_hours_var.set(f"Total Hours: {totals[0]:.2f}  |  This Month: {totals[1]:.2f}")
+
+def start_timesheet_reload(excel_path):
+    """Load the timesheet into the model in a worker thread (one at a time), then update the totals."""
+    global reload_thread
+    if reload_thread is not None and reload_thread.is_alive():
+        return
+    reload_thread = threading.Thread(target=reload_timesheet_in_thread, args=(excel_path,), daemon=True)
+    reload_thread.start()
+
+def watch_timesheet_file():
+    """Refresh the totals when the timesheet was changed outside the GUI (e.g. edited in Excel).
+
+    Only the file's size and time are checked here; the reload runs in a worker thread.
+    """
+    excel_path = excel_path_var.get()
+    if excel_path and os.path.exists(excel_path) and sheet_model(excel_path).is_stale():
+        start_timesheet_reload(excel_path)
+    root.after(WATCH_INTERVAL_MS, watch_timesheet_file)
+
+def reload_timesheet_in_thread(excel_path):
     try:
-        df = pd.read_excel(excel_path)
-        if "שעות" in df.columns:
-            total = 0.0
-            for value in df["שעות"]:
-                if pd.isna(value):
-                    continue
-                elif isinstance(value, datetime.time):
-                    # Convert time object to hours (handle 00:00:00 and 00:00)
-                    total += value.hour + value.minute / 60.0 + value.second / 3600.0
-                else:
-                    # Handle numeric values
-                    total += float(value)
-            total_hours_var.set(f"Total Hours: {total:.2f}")
-        else:
-            total_hours_var.set("Total Hours: N/A ('Hours' column missing)")
+        if os.path.exists(excel_path):
+            sheet_model(excel_path).refresh() # Also imports pandas on first use, off the Tk thread
     except Exception as e:
-        total_hours_var.set(f"Total Hours: Error")
-        output_text.insert(END, f"Error reading total hours: {e}\n", "danger")
+        # Logged once: the model does not read this version of the file again
+        ui.call(total_hours_var.set, "Total Hours: Error")
+        ui.log(f"Error reading total hours: {e}\n", "danger")
+        return
+    ui.call(update_total_hours_display)
 
 def add_manual_entry():
     dialog = ManualEntryDialog(root)
@@ -312,14 +372,16 @@ def add_manual_entry():
             return
         if backup_enabled_var.get(): create_backup(excel_path, backup_path_var.get())
         try:
-            df = pd.read_excel(excel_path)
-            entry = dialog.result
-            date_obj = datetime.datetime.strptime(entry['date'], '%Y-%m-%d')
-            new_row = {"שנה": date_obj.year, "חודש": date_obj.month, "יום": date_obj.day, "זמן התחלה": entry['start_time'], "זמן סיום": entry['end_time'], "שעות": calculate_hours_from_strings(entry['start_time'], entry['end_time']), "מה": entry['notes']}
-            df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-            df = df.sort_values(by=['שנה', 'חודש', 'יום', 'זמן התחלה'])
-            df.to_excel(excel_path, index=False)
-            output_text.insert(END, f"Successfully added manual entry for {entry['date']}.\n", "success")
+            new_rows = []
+            for entry in dialog.result:
+                date_obj = datetime.datetime.strptime(entry['date'], '%Y-%m-%d')
+                new_rows.append({"שנה": date_obj.year, "חודש": date_obj.month, "יום": date_obj.day, "זמן התחלה": entry['start_time'], "זמן סיום": entry['end_time'], "שעות": calculate_hours_from_strings(entry['start_time'], entry['end_time']), "מה": entry['notes']})
+            # All entries go in with one save; rows are inserted at their sorted position.
+            import pandas as pd
+            from timesheet_store import SHEET_COLUMNS
+            sheet_model(excel_path).append(pd.DataFrame(new_rows, columns=SHEET_COLUMNS))
+            dates = ", ".join(sorted({entry['date'] for entry in dialog.result}))
+            ui.log(f"Successfully added {len(new_rows)} manual entr{'y' if len(new_rows) == 1 else 'ies'} for {dates}.\n", "success")
             update_total_hours_display()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save manual entry: {e}")
@@ -333,121 +395,142 @@ def clear_sheet():
         return
     if backup_enabled_var.get(): create_backup(excel_path, backup_path_var.get())
     try:
-        headers = ["שנה", "חודש", "יום", "זמן התחלה", "זמן סיום", "שעות", "מה"]
-        df = pd.DataFrame(columns=headers)
-        df.to_excel(excel_path, index=False)
-        output_text.insert(END, "Excel sheet has been cleared.\n", "success")
+        sheet_model(excel_path).clear()
+        ui.log("Excel sheet has been cleared.\n", "success")
         update_total_hours_display()
     except Exception as e:
         messagebox.showerror("Error", f"Failed to clear sheet: {e}")
 
 def check_excel_overlaps():
     check_overlap_button.config(state=DISABLED)
-    output_text.insert(END, "\n--- Checking Excel for Overlapping Hours ---\n", "info")
-    thread = threading.Thread(target=execute_excel_overlap_check_in_thread)
+    ui.log("\n--- Checking Excel for Overlapping Hours ---\n", "info")
+    thread = threading.Thread(target=execute_excel_overlap_check_in_thread, args=(excel_path_var.get(), backup_dir_setting()))
     thread.start()
 
-def execute_excel_overlap_check_in_thread():
+def execute_excel_overlap_check_in_thread(excel_path, backup_dir):
     try:
-        excel_path = excel_path_var.get()
         if not os.path.exists(excel_path):
-            messagebox.showerror("Error", f"Excel file not found at:\n{excel_path}")
+            ui.call_and_wait(messagebox.showerror, "Error", f"Excel file not found at:\n{excel_path}")
             return
-        if backup_enabled_var.get(): create_backup(excel_path, backup_path_var.get())
-        df = pd.read_excel(excel_path)
-        df.columns = ["שנה", "חודש", "יום", "זמן התחלה", "זמן סיום", "שעות", "מה"]
-
-        # Normalize time values to string format and then to time objects
-        df['זמן התחלה'] = df['זמן התחלה'].apply(normalize_time_to_string)
-        df['זמן סיום'] = df['זמן סיום'].apply(normalize_time_to_string)
-
-        # Convert to time objects for comparison
-        df['start_dt'] = pd.to_datetime(df['זמן התחלה'], format='%H:%M', errors='coerce').dt.time
-        df['end_dt'] = pd.to_datetime(df['זמן סיום'], format='%H:%M', errors='coerce').dt.time
-
-        invalid_rows = df[df['start_dt'].isna() | df['end_dt'].isna()]
+        if backup_dir: create_backup(excel_path, backup_dir)
+        import pandas as pd
+        from timesheet_overlaps import overlap_frame, find_overlap_groups
+        df = sheet_model(excel_path).entries()
+
+        # One sorted sweep over the whole sheet flags every overlapping entry,
+        # including entries that run past midnight into the next day.
+        overlaps = overlap_frame(df)
+        groups = find_overlap_groups(df, overlaps)
+        overlapping = {index for group in groups for index in group}
+
+        invalid_rows = df.loc[df.index.difference(overlaps.index)]
         if not invalid_rows.empty:
-            output_text.insert(END, "Warning: Some rows had invalid time formats and were ignored:\n", "danger")
-            for index, row in invalid_rows.iterrows():
-                msg = f"  - Row {index + 2}: Start='{row['זמן התחלה']}', End='{row['זמן סיום']}'\n"
-                output_text.insert(END, msg, "danger")
-        df.dropna(subset=['start_dt', 'end_dt'], inplace=True)
+            ui.log("Warning: Some rows had invalid time formats and were ignored:\n", "danger")
+            for index, start_value, end_value in zip(invalid_rows.index, invalid_rows['זמן התחלה'], invalid_rows['זמן סיום']):
+                msg = f"  - Row {index + 2}: Start='{start_value}', End='{end_value}'\n"
+                ui.log(msg, "danger")
+        df = df.loc[overlaps.index.sort_values()].copy()
+        df['זמן התחלה'] = overlaps['start_time']
+        df['זמן סיום'] = overlaps['end_time']
+
+        # Every day with an entry of a conflict group is shown in full, the group's rows highlighted.
+        # A group can span two days when an entry runs past midnight.
+        conflict_days = overlaps.loc[sorted(overlapping), 'date_key'].unique()
+        day_rows = overlaps[overlaps['date_key'].isin(conflict_days)]
+        summaries = df.loc[day_rows.index, 'מה']
         conflicting_entries_by_day = {}
-        for (year, month, day), day_entries in df.groupby(['שנה', 'חודש', 'יום']):
-            day_entries = day_entries.sort_values(by='start_dt').reset_index()
-            overlaps_found = False
-            day_entries['is_overlap'] = False
-            for i in range(len(day_entries)):
-                for j in range(i + 1, len(day_entries)):
-                    if day_entries.loc[i, 'end_dt'] > day_entries.loc[j, 'start_dt']:
-                        overlaps_found = True
-                        day_entries.loc[i, 'is_overlap'] = True
-                        day_entries.loc[j, 'is_overlap'] = True
-            if overlaps_found:
-                date_key = f"{year:04d}-{month:02d}-{day:02d}"
-                conflicting_entries_by_day[date_key] = [{'original_index': row['index'], 'start_time': row['זמן התחלה'], 'end_time': row['זמן סיום'], 'summary': str(row['מה']) if pd.notna(row['מה']) else '', 'is_overlap': row['is_overlap']} for _, row in day_entries.iterrows()]
-        
+        for index, date_key, start_time, end_time, summary in zip(
+                day_rows.index, day_rows['date_key'], day_rows['start_time'], day_rows['end_time'], summaries):
+            conflicting_entries_by_day.setdefault(date_key, []).append(
+                {'original_index': index, 'start_time': start_time, 'end_time': end_time,
+                 'summary': str(summary) if pd.notna(summary) else '', 'is_overlap': index in overlapping})
+        conflicting_entries_by_day = dict(sorted(conflicting_entries_by_day.items()))
+
         if not conflicting_entries_by_day:
-            output_text.insert(END, "Success: No overlapping hours found in Excel file.\n", "success")
-            messagebox.showinfo("Validation Success", "The Excel file is valid!\nNo overlapping entries were found.", icon='info')
+            ui.log("Success: No overlapping hours found in Excel file.\n", "success")
+            ui.call_and_wait(messagebox.showinfo, "Validation Success", "The Excel file is valid!\nNo overlapping entries were found.", icon='info')
             return
 
-        output_text.insert(END, f"Found overlaps on {len(conflicting_entries_by_day)} day(s). Opening resolution dialog...\n", "danger")
-        dialog = OverlapResolutionDialog(root, conflicting_entries_by_day)
-        if dialog.result:
-            for date_key, modified_entries in dialog.result.items():
+        ui.log(f"Found {len(groups)} group(s) of overlapping entries on {len(conflicting_entries_by_day)} day(s). Opening resolution dialog...\n", "danger")
+        resolution = ui.call_and_wait(lambda: OverlapResolutionDialog(root, conflicting_entries_by_day).result)
+        if resolution:
+            for date_key, modified_entries in resolution.items():
                 for entry in modified_entries:
                     idx = entry['original_index']
                     df.loc[idx, 'שעות'] = calculate_hours_from_strings(entry['start_time'], entry['end_time'])
                     df.loc[idx, 'זמן התחלה'] = entry['start_time']
                     df.loc[idx, 'זמן סיום'] = entry['end_time']
                     df.loc[idx, 'מה'] = entry['summary']
-            df = df.drop(columns=['start_dt', 'end_dt', 'is_overlap'], errors='ignore')
             df = df.sort_values(by=['שנה', 'חודש', 'יום', 'זמן התחלה'])
-            df.to_excel(excel_path, index=False)
-            output_text.insert(END, "Excel file updated and sorted successfully.\n", "success")
-            update_total_hours_display()
+            sheet_model(excel_path).replace(df)
+            ui.log("Excel file updated and sorted successfully.\n", "success")
+            ui.call(update_total_hours_display)
         else:
-            output_text.insert(END, "Overlap resolution cancelled. No changes were made.\n", "info")
+            ui.log("Overlap resolution cancelled. No changes were made.\n", "info")
     except Exception as e:
-        output_text.insert(END, f"\nAn error occurred during Excel validation: {e}\n", "danger")
+        ui.log(f"\nAn error occurred during Excel validation: {e}\n", "danger")
     finally:
-        root.after(100, lambda: check_overlap_button.config(state=NORMAL))
+        ui.call(check_overlap_button.config, state=NORMAL)
 
 def run_script():
+    global fill_cancel_event
     run_button.config(state=DISABLED)
-    output_text.delete(1.0, END)
-    output_text.insert(END, "--- Starting Timesheet Automation ---\n")
-    output_text.insert(END, f"Using config: User={config.username}, Excel Path={excel_path_var.get()}\n")
-    thread = threading.Thread(target=execute_script_in_thread)
+    cancel_button.config(state=NORMAL)
+    progress_var.set(0)
+    progress_text_var.set("Starting...")
+    ui.clear()
+    ui.log("--- Starting Timesheet Automation ---\n")
+    excel_path = excel_path_var.get()
+    ui.log(f"Using config: User={config.username}, Excel Path={excel_path}\n")
+    options = {'reuse_session': reuse_session_var.get()} # Reuse the cached driver, Chrome profile and any browser left open by the last run
+    # Add job assignment parameters if enabled
+    if job_assignment_var.get():
+        options.update(job_value=job_value_var.get(), job_name=job_name_var.get())
+    fill_cancel_event = threading.Event()
+    thread = threading.Thread(target=execute_script_in_thread, args=(excel_path, options, fill_cancel_event), daemon=True)
     thread.start()
 
-def execute_script_in_thread():
+def cancel_script():
+    if fill_cancel_event is not None:
+        fill_cancel_event.set()
+        cancel_button.config(state=DISABLED)
+        ui.log("Cancelling after the current date...\n", "info")
+
+class LogWriter:
+    """File-like object that sends the filler's print output to the output log."""
+    def write(self, text):
+        ui.log(text)
+    def flush(self):
+        pass
+
+def show_fill_progress(snapshot):
+    if snapshot['entries_total']:
+        progress_var.set(100.0 * snapshot['fraction'])
+    text = f"{snapshot['phase'].capitalize()}"
+    if snapshot['dates_total']:
+        text += f" - dates {snapshot['dates_done']}/{snapshot['dates_total']}, entries {snapshot['entries_done']}/{snapshot['entries_total']}"
+    if snapshot['eta'] is not None and snapshot['phase'] != 'done':
+        text += f", about {int(snapshot['eta'] // 60)}:{int(snapshot['eta'] % 60):02d} left"
+    progress_text_var.set(text)
+
+def execute_script_in_thread(excel_path, options, cancel_event):
+    # The filler runs in this process; its prints go to the log and its progress to the progress bar.
     try:
-        excel_path = excel_path_var.get()
-        command = ["python", "C:\\Users\\Golan-New_PC\\timesheet\\timesheet_filler.py", "--excel-file", excel_path]
-
-        # Add job assignment parameters if enabled
-        if job_assignment_var.get():
-            command.extend(["--job-value", job_value_var.get()])
-            command.extend(["--job-name", job_name_var.get()])
-
-        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8', errors='replace', creationflags=subprocess.CREATE_NO_WINDOW)
-        for line in iter(process.stdout.readline, ''):
-            output_text.insert(END, line)
-            output_text.see(END)
-        process.stdout.close()
-        return_code = process.wait()
-        if return_code == 0:
-            output_text.insert(END, "\n--- Script finished successfully! ---\n", "success")
+        with contextlib.redirect_stdout(LogWriter()), contextlib.redirect_stderr(LogWriter()):
+            from timesheet_filler import automate_timesheet
+            result = automate_timesheet(excel_path, config.username, config.password, cancel_event=cancel_event,
+                                        progress_callback=lambda snapshot: ui.call(show_fill_progress, snapshot), **options)
+        if result['ok']:
+            ui.log(f"\n--- Script finished successfully! {result['entries_written']} entries written. ---\n", "success")
+        elif result['cancelled']:
+            ui.log("\n--- Script cancelled. ---\n", "info")
         else:
-            output_text.insert(END, f"\n--- Script finished with error code: {return_code} ---\n", "danger")
-    except FileNotFoundError:
-        output_text.insert(END, "\nError: 'python' command not found. Make sure Python is installed and in your system's PATH.\n", "danger")
+            ui.log(f"\n--- Script finished with an error: {result['error']} ---\n", "danger")
     except Exception as e:
-        output_text.insert(END, f"\nAn unexpected error occurred: {e}\n", "danger")
+        ui.log(f"\nAn unexpected error occurred: {e}\n", "danger")
     finally:
-        root.after(100, lambda: run_button.config(state=NORMAL))
+        ui.call(run_button.config, state=NORMAL)
+        ui.call(cancel_button.config, state=DISABLED)
 
 def toggle_calendar_fields():
     state = NORMAL if calendar_var.get() else DISABLED
@@ -483,10 +566,10 @@ def import_calendar_data():
 
     if not os.path.exists(excel_path):
         if not messagebox.askyesno("Create New File?", f"The Excel file was not found at:\n\n{excel_path}\n\nDo you want to create it?"):
-            output_text.insert(END, "File creation cancelled by user.\n", "info")
+            ui.log("File creation cancelled by user.\n", "info")
             return
         # If user says yes, we just continue. The creation is handled by the backend function.
-        output_text.insert(END, f"A new Excel file will be created at the specified path.\n", "info")
+        ui.log(f"A new Excel file will be created at the specified path.\n", "info")
 
     if not calendar_var.get():
         messagebox.showinfo("Info", "Please enable Google Calendar integration.")
@@ -500,31 +583,39 @@ def import_calendar_data():
         messagebox.showerror("Error", "Invalid date format. Use YYYY-MM-DD.")
         return
     import_calendar_button.config(state=DISABLED)
-    output_text.insert(END, "\n--- Updating Excel from Google Calendar ---\n", "info")
-    thread = threading.Thread(target=execute_calendar_import_in_thread, args=(start_date, end_date, excel_path))
+    ui.log("\n--- Updating Excel from Google Calendar ---\n", "info")
+    thread = threading.Thread(target=execute_calendar_import_in_thread, args=(start_date, end_date, excel_path, backup_dir_setting()))
     thread.start()
 
-def execute_calendar_import_in_thread(start_date, end_date, excel_path):
+def execute_calendar_import_in_thread(start_date, end_date, excel_path, backup_dir):
     try:
-        from google_calendar_integration import get_calendar_service, get_calendar_events, update_excel_with_calendar_events
-        if backup_enabled_var.get(): create_backup(excel_path, backup_path_var.get())
+        from google_calendar_integration import get_calendar_service, import_calendar_events
+        from conflict_policy import policy_from_config
+        if backup_dir: create_backup(excel_path, backup_dir)
         service = get_calendar_service()
-        events = get_calendar_events(service, start_date, end_date)
-        def conflict_resolution_callback(new_event, existing_event):
-            dialog = ConflictResolutionDialog(root, new_event, existing_event)
-            return dialog.result
-        change_log = update_excel_with_calendar_events(excel_path, events, conflict_resolution_callback)
-        output_text.insert(END, "\n--- Excel Update Summary ---\n", "info")
+        def review_conflicts(conflicts):
+            # Called once, with every conflict the policy in config.py did not settle
+            return ui.call_and_wait(lambda: ConflictReviewDialog(root, conflicts).result)
+        # The sheet is read while the events download
+        change_log, received = import_calendar_events(service, sheet_model(excel_path).store, start_date, end_date,
+                                                      review_conflicts,
+                                                      calendar_ids=getattr(config, 'calendar_ids', ['primary']),
+                                                      local_recurrence=getattr(config, 'local_recurrence', False),
+                                                      conflict_policy=policy_from_config(config))
+        if not received:
+            ui.log("No events found in Google Calendar for the specified date range.\n", "info")
+        ui.log("\n--- Excel Update Summary ---\n", "info")
         if change_log:
-            for change in change_log: output_text.insert(END, f"- {change}\n")
+            for change in change_log: ui.log(f"- {change}\n")
         else:
-            output_text.insert(END, "No changes were made to the Excel file.\n")
-        output_text.insert(END, "--- Update complete ---\n", "success")
-        update_total_hours_display()
+            ui.log("No changes were made to the Excel file.\n")
+        ui.log("--- Update complete ---\n", "success")
+        sheet_model(excel_path).refresh() # Reload here, so the Tk thread only reads the new totals
+        ui.call(update_total_hours_display)
     except Exception as e:
-        output_text.insert(END, f"\nAn error occurred during calendar import: {e}\n", "danger")
+        ui.log(f"\nAn error occurred during calendar import: {e}\n", "danger")
     finally:
-        root.after(100, lambda: import_calendar_button.config(state=NORMAL))
+        ui.call(import_calendar_button.config, state=NORMAL)
 
 # --- ################################################################## ---
 # --- #################### MAIN APPLICATION WINDOW ##################### ---
@@ -614,8 +705,21 @@ job_name_entry.pack(side=LEFT, fill=X, expand=True)
 # --- Step 4: Run Automation Frame ---
 run_frame = ttk.LabelFrame(main_frame, text="Step 4: Run Automation", padding=10)
 run_frame.pack(fill=X, padx=5, pady=5)
+reuse_session_var = tk.BooleanVar(value=False) # Opt-in: the kept browser listens on a local debugging port
+reuse_session_check = ttk.Checkbutton(run_frame, text="Reuse browser session (skip browser startup and login on repeat runs)", variable=reuse_session_var, bootstyle="round-toggle")
+reuse_session_check.pack(anchor="w", padx=5, pady=(0, 5))
 run_button = ttk.Button(run_frame, text="Run Automation on Webtime", command=run_script, bootstyle="primary")
 run_button.pack(fill=X, ipady=5)
+progress_frame = ttk.Frame(run_frame)
+progress_frame.pack(fill=X, pady=(5, 0))
+fill_cancel_event = None
+reload_thread = None
+progress_var = tk.DoubleVar(value=0)
+progress_text_var = tk.StringVar(value="")
+cancel_button = ttk.Button(progress_frame, text="Cancel", command=cancel_script, bootstyle="danger-outline", state=DISABLED)
+cancel_button.pack(side=RIGHT)
+ttk.Progressbar(progress_frame, variable=progress_var, maximum=100, bootstyle="success-striped").pack(side=LEFT, fill=X, expand=True, padx=(0, 5))
+ttk.Label(run_frame, textvariable=progress_text_var, font="-size 8").pack(anchor=W)
 
 # --- Output Frame ---
 out_frame = ttk.LabelFrame(main_frame, text="Output Log", padding=10)
@@ -625,6 +729,8 @@ output_text.pack(fill=BOTH, expand=True, padx=5, pady=5)
 output_text.tag_config("success", foreground=root.style.colors.success)
 output_text.tag_config("danger", foreground=root.style.colors.danger)
 output_text.tag_config("info", foreground=root.style.colors.info)
+# Worker threads log and open dialogs through this queue instead of touching Tk directly
+ui = UiDispatcher(root, output_text, max_lines=OUTPUT_MAX_LINES)
 
 # --- Status Bar ---
 status_frame = ttk.Frame(main_frame, padding=(5, 2))
@@ -638,5 +744,8 @@ total_hours_label.pack(side=RIGHT)
 center_window(root, min_width=750, min_height=800)
 update_backup_path_default()
 toggle_backup_fields()
-update_total_hours_display()
+# The first totals need pandas and a full read of the file, so they load in a worker thread
+start_timesheet_reload(excel_path_var.get())
+root.after(WATCH_INTERVAL_MS, watch_timesheet_file)
+ui.start()
 root.mainloop()
\ No newline at end of file
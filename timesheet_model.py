@@ -0,0 +1,153 @@
+# In-memory model of the timesheet shared by the GUI's actions.
+# The entries are read from the store once and kept with running hour totals (overall, per
+# day and per month). Changes made through the model are written to the store and folded into
+# the totals without re-reading the file. The file's modification time and size are checked
+# on each access, so edits made elsewhere (e.g. in Excel, or by a calendar import) trigger a
+# reload. A file that fails to load (e.g. saved half-way) is not read again until it changes.
+
+import os
+import glob
+import threading
+import pandas as pd
+from timesheet_times import hours_to_float
+from timesheet_store import open_store, normalize_entries, sort_entries, empty_entries, YEAR, MONTH, DAY, HOURS
+
+def file_signature(path):
+    """(mtime_ns, size) of a file, or of all files in a directory store; None if it does not exist."""
+    if os.path.isdir(path):
+        stats = [os.stat(name) for name in glob.glob(os.path.join(path, '*'))]
+        stat_dir = os.stat(path)
+        return (max([stat_dir.st_mtime_ns] + [stat.st_mtime_ns for stat in stats]), sum(stat.st_size for stat in stats), len(stats))
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+class TimesheetModel:
+    def __init__(self, path):
+        self.path = path
+        self.store = open_store(path)
+        self.lock = threading.RLock()
+        self.signature = None
+        self.df = None
+        self.failed_signature = None
+        self.error = None
+        self.total = 0.0
+        self.hours_by_day = {}
+        self.hours_by_month = {}
+
+    def _failed(self, signature):
+        return self.error is not None and signature == self.failed_signature
+
+    def is_stale(self):
+        """True if the entries were never loaded or the file changed since they were (and it did not fail to load as it is)."""
+        signature = file_signature(self.path)
+        return (self.df is None or signature != self.signature) and not self._failed(signature)
+
+    def refresh(self, force=False):
+        """Reload from the store if the file changed (or always with force). Returns True if it reloaded.
+
+        If this version of the file already failed to load, its error is raised again without re-reading.
+        """
+        with self.lock:
+            signature = file_signature(self.path)
+            if not force:
+                if self._failed(signature):
+                    raise self.error
+                if self.df is not None and signature == self.signature:
+                    return False
+            try:
+                df = self.store.read() if signature is not None else empty_entries()
+                self._load(df, signature)
+            except Exception as e:
+                self.failed_signature, self.error = signature, e
+                raise
+            self.error = None
+            return True
+
+    def _load(self, df, signature):
+        self.df = normalize_entries(df)
+        self.signature = signature
+        self.total = 0.0
+        self.hours_by_day = {}
+        self.hours_by_month = {}
+        self._add_to_totals(self.df)
+
+    def _add_to_totals(self, df):
+        hours = pd.Series(hours_to_float(df[HOURS]), index=df.index).fillna(0.0)
+        dates = df[[YEAR, MONTH, DAY]].apply(pd.to_numeric, errors='coerce')
+        self.total += float(hours.sum())
+        dated = dates.notna().all(axis=1)
+        if not dated.any():
+            return
+        keys = dates[dated].astype(int)
+        for (year, month, day), value in hours[dated].groupby([keys[YEAR], keys[MONTH], keys[DAY]]).sum().items():
+            self.hours_by_day[(year, month, day)] = self.hours_by_day.get((year, month, day), 0.0) + value
+            self.hours_by_month[(year, month)] = self.hours_by_month.get((year, month), 0.0) + value
+
+    def cached_totals(self, year, month):
+        """(total hours, hours of the month) as last loaded, without touching the file.
+
+        None if nothing is loaded yet or another thread is (re)loading or writing, so a UI thread never waits.
+        """
+        if not self.lock.acquire(blocking=False):
+            return None
+        try:
+            if self.df is None:
+                return None
+            return self.total, self.hours_by_month.get((year, month), 0.0)
+        finally:
+            self.lock.release()
+
+    def entries(self):
+        """A copy of the current entries (reloaded first if the file changed)."""
+        with self.lock:
+            self.refresh()
+            return self.df.copy()
+
+    def total_hours(self):
+        with self.lock:
+            self.refresh()
+            return self.total
+
+    def day_hours(self, year, month, day):
+        with self.lock:
+            self.refresh()
+            return self.hours_by_day.get((year, month, day), 0.0)
+
+    def month_hours(self, year, month):
+        with self.lock:
+            self.refresh()
+            return self.hours_by_month.get((year, month), 0.0)
+
+    def append(self, rows):
+        """Add entries to the store and to the model, updating the totals by the new rows only."""
+        with self.lock:
+            self.refresh()
+            rows = normalize_entries(rows)
+            self.store.append(rows)
+            self.df = sort_entries(pd.concat([self.df, rows], ignore_index=True))
+            self._add_to_totals(rows)
+            self.signature = file_signature(self.path) # Our own write is not an external edit
+
+    def replace(self, df):
+        with self.lock:
+            self.store.replace(df)
+            self._load(df, file_signature(self.path))
+
+    def clear(self):
+        with self.lock:
+            self.store.clear()
+            self._load(empty_entries(), file_signature(self.path))
+
+_models = {}
+_models_lock = threading.Lock()
+
+def get_model(path):
+    """The shared model for a timesheet path (created on first use)."""
+    with _models_lock:
+        key = os.path.abspath(path)
+        if key not in _models:
+            _models[key] = TimesheetModel(path)
+        return _models[key]
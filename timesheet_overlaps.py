@@ -0,0 +1,58 @@
+# Vectorized overlap detection for the Excel timesheet.
+# Every entry is placed on one absolute timeline (minutes since 1970-01-01), with entries
+# that end before they start treated as crossing midnight. After a single sort by start,
+# an entry overlaps an earlier one exactly when it starts before the running maximum of
+# the earlier end times. Runs of such entries form the conflict groups.
+
+import numpy as np
+import pandas as pd
+from timesheet_times import MINUTES_PER_DAY, time_to_minutes, minutes_to_hhmm
+from timesheet_store import SHEET_COLUMNS
+
+def overlap_frame(df):
+    """One row per valid entry of the sheet, sorted by (date, start), with its overlap group.
+
+    Columns: date_key ('YYYY-MM-DD'), start_time/end_time ('HH:MM'), start_abs/end_abs
+    (absolute minutes, end after start for entries crossing midnight), group and is_overlap.
+    The index is the row's index in `df`; rows with an invalid date or time are left out.
+    """
+    dates = pd.to_datetime(pd.DataFrame({'year': pd.to_numeric(df[SHEET_COLUMNS[0]], errors='coerce'),
+                                         'month': pd.to_numeric(df[SHEET_COLUMNS[1]], errors='coerce'),
+                                         'day': pd.to_numeric(df[SHEET_COLUMNS[2]], errors='coerce')},
+                                        index=df.index), errors='coerce')
+    start = pd.Series(time_to_minutes(df[SHEET_COLUMNS[3]]), index=df.index)
+    end = pd.Series(time_to_minutes(df[SHEET_COLUMNS[4]]), index=df.index)
+    valid = dates.notna() & start.notna() & end.notna()
+
+    frame = pd.DataFrame(index=df.index[valid])
+    day_numbers = dates[valid].values.astype('datetime64[D]')
+    frame['date_key'] = np.datetime_as_string(day_numbers, unit='D')
+    day_minutes = day_numbers.astype(np.int64) * MINUTES_PER_DAY
+    start_minutes = start[valid].to_numpy(dtype=np.int64)
+    end_minutes = end[valid].to_numpy(dtype=np.int64)
+    frame['start_time'] = minutes_to_hhmm(start_minutes)
+    frame['end_time'] = minutes_to_hhmm(end_minutes)
+    frame['start_abs'] = day_minutes + start_minutes
+    # An end earlier than the start means the entry runs past midnight into the next day.
+    frame['end_abs'] = frame['start_abs'] + (end_minutes - start_minutes) % MINUTES_PER_DAY
+    frame = frame.sort_values('start_abs', kind='stable')
+
+    # Sweep line: an entry starting at or after every earlier end opens a new group.
+    end_abs = frame['end_abs'].to_numpy()
+    previous_max_end = np.concatenate(([np.iinfo(np.int64).min], np.maximum.accumulate(end_abs)[:-1]))
+    frame['group'] = np.cumsum(frame['start_abs'].to_numpy() >= previous_max_end)
+    group = frame['group'].to_numpy()
+    frame['is_overlap'] = np.bincount(group)[group] > 1
+    return frame
+
+def find_overlap_groups(df, frame=None):
+    """Lists of `df` index labels, in start order, for each group of mutually overlapping entries.
+
+    Pass `frame` when overlap_frame(df) was already computed, to skip a second sweep.
+    """
+    if frame is None:
+        frame = overlap_frame(df)
+    conflicts = frame[frame['is_overlap']]
+    # Rows are sorted by start, so each group is a contiguous run.
+    boundaries = np.flatnonzero(np.diff(conflicts['group'].to_numpy())) + 1
+    return [labels.tolist() for labels in np.split(conflicts.index.to_numpy(), boundaries)] if len(conflicts) else []
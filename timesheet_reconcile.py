@@ -0,0 +1,152 @@
+# Reconciliation between the Excel entries and what the webtime timesheet already contains.
+# The web rows are read in one script call and diffed per date, so a re-run only adds
+# missing rows and patches rows whose values changed instead of retyping the whole month.
+
+# Reads every row of tableDyn1: date, row_no, start/end HH:MM, notes and job id.
+WEB_ROWS_SCRIPT = """
+var result = {};
+var dayInputs = document.querySelectorAll("#tableDyn1 input[id^='day_']");
+function value(el) { return el ? (el.value || '') : ''; }
+function byName(name) {
+    var els = document.getElementsByName(name);
+    return els.length ? els[0] : null;
+}
+var seen = {};
+for (var i = 0; i < dayInputs.length; i++) {
+    var tr = dayInputs[i].closest('tr[row_no]');
+    if (!tr) { continue; }
+    var row = tr.getAttribute('row_no');
+    if (seen[row]) { continue; }
+    seen[row] = true;
+    var popup = document.getElementById('detailsDiv_CMMPAN_' + row + '_1');
+    var notes = popup ? popup.querySelector('textarea') : null;
+    if (!notes) { notes = document.getElementById('work_comments_' + row + '_1'); }
+    var date = dayInputs[i].value;
+    (result[date] = result[date] || []).push({
+        row: row,
+        start_hh: value(document.getElementById('time_start_HH_' + row)),
+        start_mm: value(document.getElementById('time_start_MM_' + row)),
+        end_hh: value(document.getElementById('time_end_HH_' + row)),
+        end_mm: value(document.getElementById('time_end_MM_' + row)),
+        notes: value(notes),
+        jid: value(byName('jid_' + row))
+    });
+}
+return result;
+"""
+
+PLAN_ACTIONS = ('unchanged', 'fill', 'patch', 'add', 'stale')
+
+def normalize_hhmm(hour, minute):
+    """'9', '0' -> '09:00'. Returns None when either part is empty or not a number."""
+    try:
+        return f"{int(str(hour).strip()):02d}:{int(str(minute).strip()):02d}"
+    except (TypeError, ValueError):
+        return None
+
+def normalize_notes(notes):
+    if notes is None or notes != notes: # NaN from an empty Excel cell
+        return ''
+    return str(notes).strip()
+
+def read_web_rows(driver):
+    """Current web rows per date, sorted by row_no, with normalized start/end/notes/jid."""
+    raw = driver.execute_script(WEB_ROWS_SCRIPT) or {}
+    web_rows = {}
+    for date, rows in raw.items():
+        web_rows[date] = sorted(({
+            'row': row['row'],
+            'start_time': normalize_hhmm(row['start_hh'], row['start_mm']),
+            'end_time': normalize_hhmm(row['end_hh'], row['end_mm']),
+            'notes': normalize_notes(row['notes']),
+            'jid': row['jid'],
+        } for row in rows), key=lambda r: int(r['row']))
+    return web_rows
+
+def is_empty_web_row(web_row):
+    return not web_row['start_time'] and not web_row['end_time'] and not web_row['notes']
+
+def web_row_matches(entry, web_row, job_value=None):
+    if (entry['start_time'], entry['end_time'], entry['notes']) != (web_row['start_time'], web_row['end_time'], web_row['notes']):
+        return False
+    return not job_value or web_row['jid'] == str(job_value)
+
+def build_plan(entries_by_date, web_rows_by_date, job_value=None, incremental=True):
+    """Diff Excel entries against the web rows and return a list of plan actions.
+
+    Each action is a dict with 'date', 'action' (one of PLAN_ACTIONS), 'entry' (the Excel entry,
+    None for stale rows), 'row' (target row_no, None until an added row exists) and 'web'
+    (the current web row, if any). Without `incremental` every entry is written to the date's
+    rows in order, matching the non-reconciling behaviour.
+    """
+    plan = []
+    for date, entries in entries_by_date.items():
+        web_rows = list(web_rows_by_date.get(date, []))
+        remaining_entries = list(entries)
+        if incremental:
+            # 1. Entries already on the page exactly as in Excel are left alone.
+            unmatched_entries = []
+            for entry in remaining_entries:
+                match = next((w for w in web_rows if web_row_matches(entry, w, job_value)), None)
+                if match:
+                    web_rows.remove(match)
+                    plan.append({'date': date, 'action': 'unchanged', 'entry': entry, 'row': match['row'], 'web': match})
+                else:
+                    unmatched_entries.append(entry)
+            # 2. An edited entry keeps its row: same start time or same notes means it was changed, not added.
+            remaining_entries = []
+            for entry in unmatched_entries:
+                match = next((w for w in web_rows if not is_empty_web_row(w) and
+                              (w['start_time'] == entry['start_time'] or (entry['notes'] and w['notes'] == entry['notes']))), None)
+                if match:
+                    web_rows.remove(match)
+                    plan.append({'date': date, 'action': 'patch', 'entry': entry, 'row': match['row'], 'web': match})
+                else:
+                    remaining_entries.append(entry)
+            # 3. Other entries go to empty rows first, then overwrite leftover rows.
+            web_rows.sort(key=lambda w: (not is_empty_web_row(w), int(w['row'])))
+        for entry in remaining_entries:
+            if web_rows:
+                web_row = web_rows.pop(0)
+                action = 'fill' if not incremental or is_empty_web_row(web_row) else 'patch'
+                plan.append({'date': date, 'action': action, 'entry': entry, 'row': web_row['row'], 'web': web_row})
+            else:
+                plan.append({'date': date, 'action': 'add', 'entry': entry, 'row': None, 'web': None})
+        # 4. Filled rows with no matching Excel entry are reported, never deleted.
+        for web_row in web_rows:
+            if incremental and not is_empty_web_row(web_row):
+                plan.append({'date': date, 'action': 'stale', 'entry': None, 'row': web_row['row'], 'web': web_row})
+    return plan
+
+def plan_counts(plan):
+    counts = {action: 0 for action in PLAN_ACTIONS}
+    for item in plan:
+        counts[item['action']] += 1
+    return counts
+
+def _describe(values):
+    if not values:
+        return '-'
+    return f"{values['start_time'] or '--:--'}-{values['end_time'] or '--:--'} {values['notes']}".rstrip()
+
+def format_plan(plan, include_unchanged=False):
+    """Human-readable diff lines, grouped by date."""
+    lines = []
+    current_date = None
+    for item in sorted(plan, key=lambda i: (i['date'], int(i['row']) if i['row'] else float('inf'))):
+        if item['action'] == 'unchanged' and not include_unchanged:
+            continue
+        if item['date'] != current_date:
+            current_date = item['date']
+            lines.append(f"{current_date}:")
+        row_label = f"row {item['row']}" if item['row'] else "new row"
+        if item['action'] == 'patch':
+            lines.append(f"  ~ patch {row_label}: {_describe(item['web'])}  ->  {_describe(item['entry'])}")
+        elif item['action'] == 'stale':
+            lines.append(f"  ! {row_label} is on the page but not in Excel: {_describe(item['web'])}")
+        else:
+            symbol = {'fill': '+', 'add': '+', 'unchanged': '='}[item['action']]
+            lines.append(f"  {symbol} {item['action']} {row_label}: {_describe(item['entry'])}")
+    counts = plan_counts(plan)
+    lines.append("Plan: " + ", ".join(f"{counts[action]} {action}" for action in PLAN_ACTIONS))
+    return lines
@@ -0,0 +1,287 @@
+# Storage backends for the timesheet entries.
+# The GUI, the filler and the calendar import read and write entries through a store picked
+# by the file extension of the configured path:
+#   .xlsx / .xlsm / .xls      Excel workbook (the original format)
+#   .sqlite / .sqlite3 / .db  SQLite database, one row per entry
+#   .parquet                  Parquet dataset directory with one file per month (needs pyarrow)
+# In SQLite and Parquet an append or a one-month read touches only the rows involved,
+# not the whole file. Excel stays available for import and export:
+#   python timesheet_store.py timesheet.xlsx timesheet.sqlite    # import
+#   python timesheet_store.py timesheet.sqlite export.xlsx       # export
+
+import os
+import copy
+import glob
+import itertools
+import sqlite3
+import argparse
+import openpyxl
+import numpy as np
+import pandas as pd
+from timesheet_times import MINUTES_PER_DAY, time_to_hhmm, time_to_minutes, hours_to_float, total_hours
+
+SHEET_COLUMNS = ["שנה", "חודש", "יום", "זמן התחלה", "זמן סיום", "שעות", "מה"]
+YEAR, MONTH, DAY, START, END, HOURS, NOTES = SHEET_COLUMNS
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm', '.xls')
+SQLITE_EXTENSIONS = ('.sqlite', '.sqlite3', '.db')
+PARQUET_EXTENSION = '.parquet'
+
+def empty_entries():
+    return pd.DataFrame(columns=SHEET_COLUMNS)
+
+def normalize_entries(df):
+    """Entries with the sheet columns, whole-number dates, 'HH:MM' times and float hours.
+
+    Time cells that are not valid times are kept as text so no data is lost, and notes are
+    always text.
+    """
+    df = df.copy()
+    df.columns = SHEET_COLUMNS
+    for column in (YEAR, MONTH, DAY):
+        df[column] = pd.to_numeric(df[column], errors='coerce').astype('Int64')
+    for column in (START, END):
+        normalized = pd.Series(time_to_hhmm(df[column]), index=df.index, dtype=object)
+        raw = df[column].astype(object).where(df[column].notna(), None)
+        df[column] = normalized.where(normalized.notna(), raw.map(lambda value: None if value is None else str(value)))
+    df[HOURS] = hours_to_float(df[HOURS])
+    # Notes are text: a number typed in the column would otherwise give it a mixed type Parquet can't store
+    df[NOTES] = pd.Series([None if pd.isna(value) else str(value) for value in df[NOTES]], index=df.index, dtype=object)
+    return df.reset_index(drop=True)
+
+def sort_entries(df):
+    """Sort by date, then start time (the order the sheet is kept in)."""
+    return df.sort_values(by=[YEAR, MONTH, DAY, START], kind='stable').reset_index(drop=True)
+
+def _sort_keys(years, months, days, starts):
+    """One comparable number per row for (year, month, day, start minutes); NaN when any part is invalid."""
+    years, months, days = (pd.to_numeric(pd.Series(list(values), dtype=object), errors='coerce').to_numpy(dtype=float)
+                           for values in (years, months, days))
+    return ((years * 13 + months) * 32 + days) * MINUTES_PER_DAY + time_to_minutes(list(starts))
+
+def _filter_month(df, year=None, month=None):
+    if year is not None:
+        df = df[pd.to_numeric(df[YEAR], errors='coerce') == year]
+    if month is not None:
+        df = df[pd.to_numeric(df[MONTH], errors='coerce') == month]
+    return df
+
+class TimesheetStore:
+    """Common interface of the backends. Subclasses implement read() and replace()."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def read(self, year=None, month=None):
+        """Entries as a DataFrame with SHEET_COLUMNS, optionally only one year and/or month."""
+        raise NotImplementedError
+
+    def replace(self, df):
+        """Overwrite all entries with df."""
+        raise NotImplementedError
+
+    def append(self, rows):
+        """Add entries, keeping the store sorted."""
+        self.replace(sort_entries(pd.concat([self.read(), normalize_entries(rows)], ignore_index=True)))
+
+    def clear(self):
+        self.replace(empty_entries())
+
+    def total_hours(self):
+        return total_hours(self.read()[HOURS])
+
+class ExcelStore(TimesheetStore):
+    def read(self, year=None, month=None):
+        if not self.exists():
+            return empty_entries()
+        df = pd.read_excel(self.path)
+        df.columns = SHEET_COLUMNS
+        return _filter_month(df, year, month)
+
+    def replace(self, df):
+        df.to_excel(self.path, index=False)
+
+    def append(self, rows):
+        """Insert rows at their sorted positions with openpyxl and save once.
+
+        The workbook is opened a single time for any number of rows, and existing cells
+        (values and formatting) are left untouched instead of being rewritten by pandas.
+        """
+        rows = sort_entries(normalize_entries(rows))
+        if not self.exists():
+            self.replace(rows)
+            return
+        workbook = openpyxl.load_workbook(self.path)
+        sheet = workbook.active
+        keys = _sort_keys(*zip(*sheet.iter_rows(min_row=2, max_col=4, values_only=True))) if sheet.max_row > 1 else np.array([])
+        new_keys = _sort_keys(rows[YEAR], rows[MONTH], rows[DAY], rows[START])
+        # Data rows before each new row: everything up to the last existing row that sorts at or before it.
+        positions = [int(np.flatnonzero(keys <= key)[-1]) + 1 if (keys <= key).any() else 0 for key in new_keys]
+        values = list(rows.itertuples(index=False, name=None))
+        groups = [(position, [row for _, row in group])
+                  for position, group in itertools.groupby(zip(positions, values), key=lambda pair: pair[0])]
+        # Insert from the bottom so earlier positions stay valid; each run of rows sharing a position
+        # is inserted in one go, in sorted order.
+        for position, group in reversed(groups):
+            first_row = position + 2 # Header is row 1
+            sheet.insert_rows(first_row, amount=len(group))
+            # New cells take the formatting of the row above (or below, at the top of the sheet).
+            template_row = first_row - 1 if first_row > 2 else first_row + len(group)
+            for offset, row_values in enumerate(group):
+                for column, value in enumerate(row_values, start=1):
+                    cell = sheet.cell(row=first_row + offset, column=column, value=None if pd.isna(value) else value)
+                    if template_row <= sheet.max_row: # Don't create cells below an empty sheet
+                        template = sheet.cell(row=template_row, column=column)
+                        if template.has_style:
+                            cell._style = copy.copy(template._style)
+        workbook.save(self.path)
+
+class SQLiteStore(TimesheetStore):
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        year INTEGER,
+        month INTEGER,
+        day INTEGER,
+        start_time TEXT,
+        end_time TEXT,
+        hours REAL,
+        notes TEXT
+    );
+    CREATE INDEX IF NOT EXISTS entries_by_date ON entries (year, month, day, start_time);
+    """
+    FIELDS = ('year', 'month', 'day', 'start_time', 'end_time', 'hours', 'notes')
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.executescript(self.SCHEMA)
+        return connection
+
+    def _rows(self, df):
+        df = normalize_entries(df)
+        return [tuple(None if pd.isna(value) else (int(value) if i < 3 else value) for i, value in enumerate(row))
+                for row in df.itertuples(index=False, name=None)]
+
+    def read(self, year=None, month=None):
+        conditions, params = [], []
+        if year is not None:
+            conditions.append("year = ?")
+            params.append(int(year))
+        if month is not None:
+            conditions.append("month = ?")
+            params.append(int(month))
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        connection = self._connect()
+        try:
+            df = pd.read_sql_query(f"SELECT {', '.join(self.FIELDS)} FROM entries{where} "
+                                   "ORDER BY year, month, day, start_time, id", connection, params=params)
+        finally:
+            connection.close()
+        df.columns = SHEET_COLUMNS
+        return df
+
+    def replace(self, df):
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute("DELETE FROM entries")
+                connection.executemany(f"INSERT INTO entries ({', '.join(self.FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?)", self._rows(df))
+        finally:
+            connection.close()
+
+    def append(self, rows):
+        # Rows come back ordered by the index on read, so an append is a plain insert.
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executemany(f"INSERT INTO entries ({', '.join(self.FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?)", self._rows(rows))
+        finally:
+            connection.close()
+
+    def clear(self):
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute("DELETE FROM entries")
+        finally:
+            connection.close()
+
+    def total_hours(self):
+        connection = self._connect()
+        try:
+            return float(connection.execute("SELECT COALESCE(SUM(hours), 0) FROM entries").fetchone()[0])
+        finally:
+            connection.close()
+
+class ParquetStore(TimesheetStore):
+    """A directory of YYYY-MM.parquet files; entries without a valid date go to undated.parquet."""
+
+    UNDATED = 'undated'
+
+    def _partition_path(self, key):
+        return os.path.join(self.path, f"{key}.parquet")
+
+    @staticmethod
+    def _partition_key(year, month):
+        if pd.isna(year) or pd.isna(month):
+            return ParquetStore.UNDATED
+        return f"{int(year):04d}-{int(month):02d}"
+
+    def _partitions(self, df):
+        keys = [self._partition_key(year, month) for year, month in zip(df[YEAR], df[MONTH])]
+        return df.groupby(pd.Series(keys, index=df.index), sort=True)
+
+    def _read_partition(self, key):
+        path = self._partition_path(key)
+        return pd.read_parquet(path) if os.path.exists(path) else empty_entries()
+
+    def _write_partition(self, key, df):
+        os.makedirs(self.path, exist_ok=True)
+        sort_entries(df).to_parquet(self._partition_path(key), index=False)
+
+    def read(self, year=None, month=None):
+        if year is not None and month is not None:
+            return self._read_partition(self._partition_key(year, month))
+        pattern = f"{int(year):04d}-*.parquet" if year is not None else "*.parquet"
+        frames = [pd.read_parquet(path) for path in sorted(glob.glob(os.path.join(self.path, pattern)))]
+        df = pd.concat(frames, ignore_index=True) if frames else empty_entries()
+        return _filter_month(df, year, month)
+
+    def replace(self, df):
+        for path in glob.glob(os.path.join(self.path, "*.parquet")):
+            os.remove(path)
+        df = normalize_entries(df)
+        for key, partition in self._partitions(df):
+            self._write_partition(key, partition)
+
+    def append(self, rows):
+        # Only the months that receive entries are rewritten.
+        rows = normalize_entries(rows)
+        for key, partition in self._partitions(rows):
+            self._write_partition(key, pd.concat([self._read_partition(key), partition], ignore_index=True))
+
+def open_store(path):
+    """The store for a timesheet path, chosen by its extension (Excel if unknown)."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in SQLITE_EXTENSIONS:
+        return SQLiteStore(path)
+    if extension == PARQUET_EXTENSION:
+        return ParquetStore(path)
+    return ExcelStore(path)
+
+def copy_entries(source_path, destination_path):
+    """Copy every entry from one store to another (e.g. import Excel into SQLite, or export back)."""
+    df = open_store(source_path).read()
+    open_store(destination_path).replace(sort_entries(normalize_entries(df)))
+    return len(df)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Copy timesheet entries between Excel, SQLite and Parquet stores.')
+    parser.add_argument('source', type=str, help='Existing timesheet (.xlsx, .sqlite/.db or .parquet directory).')
+    parser.add_argument('destination', type=str, help='Timesheet to create or overwrite.')
+    args = parser.parse_args()
+    count = copy_entries(args.source, args.destination)
+    print(f"Copied {count} entries from {args.source} to {args.destination}.")
@@ -0,0 +1,87 @@
+# Shared time and hours parsing for the Excel timesheet.
+# Time cells can hold 'HH:MM' / 'HH:MM:SS' strings, datetime.time values (how pandas and
+# openpyxl return time-formatted cells) or floats (Excel fractions of a day). Whole columns
+# are converted at once to minutes since midnight, so the GUI, the calendar merge and the
+# filler parse a sheet in one pass and agree on every value. An end time earlier than the
+# start time means the entry runs past midnight.
+
+import re
+import datetime
+import numpy as np
+import pandas as pd
+
+MINUTES_PER_DAY = 24 * 60
+
+# 'HH:MM' text for every minute of the day, so formatting a column is a single take().
+HHMM_BY_MINUTE = np.array([f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(MINUTES_PER_DAY)], dtype=object)
+
+_TIME_PATTERN = re.compile(r'^\s*(\d{1,2}):(\d{2})(?::\d{2}(?:\.\d+)?)?\s*$')
+
+def _value_to_minutes(value):
+    """Minutes since midnight for a single cell value, NaN if it is not a time of day."""
+    if isinstance(value, datetime.datetime): # Includes pandas Timestamps
+        value = value.time()
+    if isinstance(value, datetime.time):
+        return value.hour * 60 + value.minute
+    if isinstance(value, datetime.timedelta):
+        minutes = int(value.total_seconds() // 60)
+        return minutes if 0 <= minutes < MINUTES_PER_DAY else np.nan
+    if isinstance(value, str):
+        match = _TIME_PATTERN.match(value)
+        if not match:
+            return np.nan
+        hours, minutes = int(match.group(1)), int(match.group(2))
+        return hours * 60 + minutes if hours < 24 and minutes < 60 else np.nan
+    if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool):
+        # Excel stores times as a fraction of a day
+        minutes = round(float(value) * MINUTES_PER_DAY) if 0 <= value < 1 else np.nan
+        return minutes if minutes < MINUTES_PER_DAY else np.nan
+    return np.nan
+
+def time_to_minutes(values):
+    """Float array of minutes since midnight for a column of mixed time values (NaN where invalid)."""
+    # A timesheet has few distinct times, so each unique value is parsed once.
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+    unique_minutes = np.array([_value_to_minutes(value) for value in uniques] + [np.nan], dtype=float)
+    return unique_minutes[codes] # The sentinel -1 picks the trailing NaN
+
+def minutes_to_hhmm(minutes):
+    """'HH:MM' strings for an array of minutes since midnight (None where the minutes are NaN)."""
+    minutes = np.asarray(minutes, dtype=float)
+    valid = ~np.isnan(minutes)
+    result = np.full(minutes.shape, None, dtype=object)
+    result[valid] = HHMM_BY_MINUTE[minutes[valid].astype(np.int64) % MINUTES_PER_DAY]
+    return result
+
+def time_to_hhmm(values):
+    """Normalize a column of mixed time values to 'HH:MM' strings (None where invalid)."""
+    return minutes_to_hhmm(time_to_minutes(values))
+
+def duration_minutes(start_minutes, end_minutes):
+    """Minutes from start to end, wrapping past midnight when the end is earlier than the start."""
+    return np.mod(np.asarray(end_minutes, dtype=float) - np.asarray(start_minutes, dtype=float), MINUTES_PER_DAY)
+
+def hours_between(start_values, end_values):
+    """Hours (rounded to 2 decimals) between two columns of time values; NaN where either is invalid."""
+    return np.round(duration_minutes(time_to_minutes(start_values), time_to_minutes(end_values)) / 60, 2)
+
+def hours_to_float(values):
+    """Float hours for the 'שעות' column: numbers, numeric strings or datetime.time durations (NaN otherwise)."""
+    def convert(value):
+        if isinstance(value, datetime.time):
+            return value.hour + value.minute / 60.0 + value.second / 3600.0
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return np.nan
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+    unique_hours = np.array([convert(value) for value in uniques] + [np.nan], dtype=float)
+    return unique_hours[codes]
+
+def total_hours(values):
+    """Sum of the 'שעות' column, ignoring empty and invalid cells."""
+    return float(np.nansum(hours_to_float(values)))
+
+def normalize_time(value):
+    """Single-value form of time_to_hhmm: 'HH:MM' or None."""
+    return time_to_hhmm([value])[0]
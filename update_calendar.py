@@ -5,14 +5,13 @@ import os
 import sys
 sys.path.append('C:/Users/Golan-New_PC/timesheet')
 
-from google_calendar_integration import get_calendar_service, get_calendar_events, update_excel_with_calendar_events
 import config
 
-def conflict_resolution_callback_default(new_event, existing_event):
+def review_conflicts_default(conflicts):
     """
-    Default conflict resolution: always keep the existing event.
+    Default review of the conflicts left open by the conflict policy: always keep the existing event.
     """
-    return ('existing',)
+    return [('existing',)] * len(conflicts)
 
 def main():
     """
@@ -34,20 +33,30 @@ def main():
             print("Error: credentials.json not found. Please follow the setup instructions in README.md.")
             return
 
+        # The Google API client and pandas load only once there is something to import
+        from google_calendar_integration import get_calendar_service, import_calendar_events
+        from timesheet_store import open_store
+        from conflict_policy import policy_from_config
         service = get_calendar_service()
-        events = get_calendar_events(service, start_date, end_date)
+        print(f"Updating Excel file: {config.excel_file_path}")
+        # config.calendar_ids: the calendars to import (None = every calendar shown in Google Calendar).
+        # The sheet is read while the events download.
+        change_log, received = import_calendar_events(
+            service,
+            open_store(config.excel_file_path),
+            start_date,
+            end_date,
+            review_conflicts_default,
+            calendar_ids=getattr(config, 'calendar_ids', ['primary']),
+            local_recurrence=getattr(config, 'local_recurrence', False),
+            conflict_policy=policy_from_config(config)
+        )
 
-        if not events:
+        if not received:
             print("No events found in Google Calendar for the specified date range.")
             return
 
-        print(f"Found {len(events)} events. Updating Excel file: {config.excel_file_path}")
-
-        change_log = update_excel_with_calendar_events(
-            config.excel_file_path,
-            events,
-            conflict_resolution_callback_default
-        )
+        print(f"Merged {received} events.")
 
         print("\n--- Excel Update Summary ---")
         if change_log: